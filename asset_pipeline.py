@@ -0,0 +1,138 @@
+import os
+import struct
+import threading
+
+import pygame
+
+DESIGN_SIZE = (1920, 1080)  # Resolution the artwork and layout were made for
+MAGIC = b"DMUIAST1"
+HEADER = struct.Struct("<8sII?")  # magic, width, height, has alpha
+
+
+def display_resolution():
+    """Size to run full screen at: DEMOUI_RESOLUTION (WxH) if set, else the primary desktop's size.
+
+    Call after pygame.display.init(). Falls back to DESIGN_SIZE when the
+    video driver cannot tell (e.g. the dummy driver).
+    """
+    override = os.environ.get("DEMOUI_RESOLUTION")
+    if override:
+        width, height = override.lower().split("x")
+        return int(width), int(height)
+    try:
+        sizes = pygame.display.get_desktop_sizes()
+    except (AttributeError, pygame.error):
+        sizes = []
+    if sizes and sizes[0][0] > 0 and sizes[0][1] > 0:
+        return tuple(sizes[0])
+    return DESIGN_SIZE
+
+
+class AssetPipeline:
+    """Menu artwork scaled once for one display resolution and kept on disk as raw pixels.
+
+    Backgrounds are scaled to cover the screen (cropped, not stretched, when
+    the aspect ratio differs from DESIGN_SIZE) and other images by the
+    screen's height relative to DESIGN_SIZE. The scaled pixels are stored
+    under a directory per resolution, keyed by the source file's size and
+    mtime, so later starts read them back without decoding or scaling; the
+    surfaces returned are convert()ed for the display.
+    """
+
+    def __init__(self, cache_directory, size):
+        self.size = tuple(size)
+        self.scale = self.size[1] / DESIGN_SIZE[1]
+        self.directory = os.path.join(cache_directory, f"{self.size[0]}x{self.size[1]}")
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def background(self, path):
+        """path scaled and centre-cropped to fill the screen."""
+        return self._prepared(path, "fill", self._fill, alpha=False)
+
+    def image(self, path, alpha=False):
+        """path scaled by the screen's height relative to DESIGN_SIZE."""
+        return self._prepared(path, "scaled", self._scale, alpha)
+
+    def report(self):
+        return f"Assets at {self.size[0]}x{self.size[1]} (scale {self.scale:.2f}): {self.hits} from cache, {self.builds} scaled"
+
+    def _fill(self, image):
+        width, height = image.get_size()
+        factor = max(self.size[0] / width, self.size[1] / height)
+        scaled = _smoothscale(image, (max(self.size[0], round(width * factor)), max(self.size[1], round(height * factor))))
+        crop = pygame.Rect((0, 0), self.size)
+        crop.center = scaled.get_rect().center
+        return scaled.subsurface(crop).copy()
+
+    def _scale(self, image):
+        width, height = image.get_size()
+        return _smoothscale(image, (max(1, round(width * self.scale)), max(1, round(height * self.scale))))
+
+    def _prepared(self, path, kind, make, alpha):
+        try:
+            st = os.stat(path)
+        except OSError:
+            # Leave it to the image loader to find the file or report it missing; nothing to key a cache entry on
+            return self._convert(make(pygame.image.load(path)), alpha)
+        name = os.path.splitext(os.path.basename(path))[0]
+        prefix = f"{name}_{kind}_"
+        cached_path = os.path.join(self.directory, f"{prefix}{st.st_size}_{st.st_mtime_ns}.pixels")
+        surface = _read_pixels(cached_path)
+        if surface is not None:
+            with self._lock:
+                self.hits += 1
+        else:
+            surface = make(pygame.image.load(path))
+            try:
+                _write_pixels(cached_path, surface, alpha)
+            except OSError as e:
+                print(f"Cannot cache scaled {path}: {e}")  # Scaled again on the next start
+            with self._lock:
+                self.builds += 1
+            # A changed source leaves its old scaled copy behind; drop it
+            for stale in os.listdir(self.directory):
+                if stale.startswith(prefix) and os.path.join(self.directory, stale) != cached_path:
+                    try:
+                        os.remove(os.path.join(self.directory, stale))
+                    except OSError:
+                        pass
+        return self._convert(surface, alpha)
+
+    def _convert(self, surface, alpha):
+        return surface.convert_alpha() if alpha else surface.convert()
+
+
+def _smoothscale(image, size):
+    if image.get_size() == tuple(size):
+        return image
+    if image.get_bitsize() < 24:
+        image = image.convert(24, 0)  # smoothscale only takes 24 and 32 bit surfaces
+    return pygame.transform.smoothscale(image, size)
+
+
+def _read_pixels(path):
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            pixels = f.read()
+    except OSError:
+        return None
+    if len(header) < HEADER.size:
+        return None
+    magic, width, height, alpha = HEADER.unpack(header)
+    if magic != MAGIC or len(pixels) != width * height * (4 if alpha else 3):
+        return None
+    return pygame.image.frombuffer(pixels, (width, height), "RGBA" if alpha else "RGB")
+
+
+def _write_pixels(path, surface, alpha):
+    """Write atomically, so a crash never leaves a truncated file that looks valid."""
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    width, height = surface.get_size()
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, width, height, alpha))
+        f.write(pygame.image.tostring(surface, "RGBA" if alpha else "RGB"))
+    os.replace(temp_path, path)
@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+import threading
+
+from video_player import find_ffmpeg
+
+
+class AudioCache:
+    """Soundtracks extracted once to WAV, keyed by the video's content digest.
+
+    WAV needs no decoding, so pygame.mixer.music starts it instantly. Files
+    live under cache_dir and survive restarts; warm() extracts missing ones
+    in the background, and cleanup() deletes files no current video maps to.
+    """
+
+    def __init__(self, cache_dir, digest_func):
+        self.cache_dir = cache_dir
+        self._digest = digest_func
+        self._locks = {}  # wav path -> Lock, so warm() and get() never extract the same file twice
+        self._lock = threading.Lock()
+
+    def audio_path(self, video_path):
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        return os.path.join(self.cache_dir, f"{name}_{self._digest(video_path)}.wav")
+
+    def get(self, video_path):
+        """Path of the cached WAV for video_path, extracting it now if needed; None if it has no audio."""
+        path = self.audio_path(video_path)
+        with self._lock:
+            lock = self._locks.setdefault(path, threading.Lock())
+        with lock:
+            if not os.path.exists(path):
+                try:
+                    extract_audio(video_path, path)
+                except (OSError, RuntimeError) as e:
+                    print(f"Failed to extract audio from {video_path}: {e}")
+                    return None
+        return path
+
+    def warm(self, video_paths):
+        """Extract audio for every video in the background, then drop stale files."""
+        video_paths = list(video_paths)
+
+        def run():
+            for video_path in video_paths:
+                self.get(video_path)
+            self.cleanup(video_paths)
+
+        thread = threading.Thread(target=run, name="audio-cache", daemon=True)
+        thread.start()
+        return thread
+
+    def cleanup(self, video_paths):
+        """Delete cached WAVs (and interrupted extractions) that no video in video_paths uses."""
+        keep = set()
+        for video_path in video_paths:
+            try:
+                keep.add(os.path.basename(self.audio_path(video_path)))
+            except OSError:
+                pass  # Missing video; its audio goes too
+        for name in os.listdir(self.cache_dir):
+            if name not in keep:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass  # In use by the mixer (Windows); removed on a later run
+
+
+def extract_audio(video_path, out_path):
+    """Write the soundtrack of video_path to out_path as 16-bit 44.1 kHz stereo WAV, atomically."""
+    temp_path = out_path + ".tmp.wav"
+    command = [
+        find_ffmpeg() or "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+        "-i", video_path, "-vn", "-acodec", "pcm_s16le", "-ar", "44100", "-ac", "2", temp_path,
+    ]
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, creationflags=creationflags)
+    if result.returncode != 0 or not os.path.exists(temp_path):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise RuntimeError(result.stderr.decode(errors="replace").strip() or "ffmpeg failed")
+    os.replace(temp_path, out_path)
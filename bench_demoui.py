@@ -0,0 +1,460 @@
+"""Headless benchmark of demoui.py: frame times per state, loading time per deck count, video decode speed.
+
+    python bench_demoui.py --decks 10,100,500 --output bench.json
+    python bench_demoui.py --compare before.json after.json
+
+Each run starts demoui.py in a fresh process under SDL's dummy video and
+audio drivers, against a synthetic deck folder and an empty (cold) or
+reused (warm) cache. PowerPoint, pyautogui and the gamepad are replaced by
+stand-ins, and a driver thread feeds scripted input through the event
+queue. Frame time is the main-thread time from the last event fetch to the
+end of the frame's display update, so idle waits are not counted.
+"""
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import defaultdict
+
+REPO_DIR = os.path.dirname(os.path.realpath(__file__))
+RESULT_PREFIX = "BENCH_RESULT "
+EVENT_INTERVAL = 1.0 / 30  # Scripted input rate
+PPT_MENU_PAGES = 5  # Pages flipped through in the PPT menu scenario
+SEARCH_TEXT = "deck 1"
+WORDS = (
+    "robot autonomous sensor vision strategy budget roadmap partner playbook review outreach "
+    "sponsor drivetrain shooter intake climber pathfinding telemetry simulation season"
+).split()
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+
+    return {"count": len(ordered), "p50": rank(50), "p90": rank(90), "p99": rank(99), "max": round(ordered[-1], 3)}
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process, or None where it cannot be read."""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 1048576
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1048576 if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KB elsewhere
+
+
+def generate_decks(directory, count, seed=0):
+    """Write count small .pptx decks with a title slide and two text slides each."""
+    from pptx import Presentation
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    for i in range(count):
+        presentation = Presentation()
+        slide = presentation.slides.add_slide(presentation.slide_layouts[0])
+        slide.shapes.title.text = f"Benchmark deck {i}"
+        slide.placeholders[1].text = " ".join(rng.choices(WORDS, k=6))
+        for _ in range(2):
+            slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+            slide.shapes.title.text = " ".join(rng.choices(WORDS, k=3)).title()
+            slide.placeholders[1].text = "\n".join(" ".join(rng.choices(WORDS, k=8)) for _ in range(4))
+        presentation.save(os.path.join(directory, f"deck {i:05d}.pptx"))
+
+
+def measure_decode_fps(video_path, size, fps, seconds=5.0):
+    """Frames per second the ffmpeg decoder delivers at size when nothing paces it, or None without ffmpeg."""
+    import pygame
+    from video_player import FrameRing, PlaybackStats, VideoDecoder, find_ffmpeg
+    if not find_ffmpeg():
+        return None
+    ring = FrameRing(size, 8)
+    decoder = VideoDecoder(video_path, ring, fps, PlaybackStats())
+    start = time.perf_counter()
+    decoder.start()
+    frames = 0
+    while time.perf_counter() - start < seconds:
+        item = ring.filled.get()
+        if item is None:
+            break
+        ring.free.put(item[0])
+        frames += 1
+    elapsed = time.perf_counter() - start
+    decoder.stop()
+    decoder.join(timeout=2)
+    pygame.quit()
+    return round(frames / elapsed, 1) if elapsed else None
+
+
+# Stand-ins, installed in the child process before demoui.py runs
+
+class StubRenderer:
+    """Writes a flat-coloured thumbnail per deck instead of asking PowerPoint, so renderer cost is near zero."""
+
+    name = "stub"
+    batch_size = 8
+
+    def render_many(self, jobs):
+        import pygame
+        from slide_renderer import THUMBNAIL_SIZE
+        errors = {}
+        for pptx_path, output_image in jobs:
+            surface = pygame.Surface(THUMBNAIL_SIZE)
+            surface.fill(random.Random(pptx_path).choices(range(256), k=3))
+            pygame.image.save(surface, output_image)
+            errors[output_image] = None
+        return errors
+
+    def thread_init(self):
+        pass
+
+    def thread_exit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def install_stand_ins(renderer):
+    import pygame
+    import slide_renderer
+
+    # Slideshow keys are sent with pyautogui and the gamepad is read with inputs; neither exists headless
+    pyautogui = types.ModuleType("pyautogui")
+    pyautogui.press = pyautogui.keyDown = pyautogui.keyUp = lambda *args, **kwargs: None
+    sys.modules["pyautogui"] = pyautogui
+    inputs = types.ModuleType("inputs")
+    inputs.UnpluggedError = type("UnpluggedError", (RuntimeError,), {})
+    inputs.get_gamepad = lambda: threading.Event().wait()  # A gamepad that never sends anything
+    sys.modules["inputs"] = inputs
+    if renderer == "stub":
+        slide_renderer.create_renderer = lambda name=None: StubRenderer()
+
+    # The UI names its Windows font and its images case-insensitively
+    font_class = pygame.font.Font
+
+    def font(name, size):
+        return font_class(name if name is None or os.path.exists(name) else None, size)
+
+    pygame.font.Font = font
+    load_image = pygame.image.load
+
+    def load(path, *args):
+        if isinstance(path, str) and not os.path.exists(path):
+            folder = os.path.dirname(path) or "."
+            for name in os.listdir(folder):
+                if name.lower() == os.path.basename(path).lower():
+                    path = os.path.join(folder, name)
+                    break
+        return load_image(path, *args)
+
+    pygame.image.load = load
+
+
+class FrameRecorder:
+    """Hooks the event fetch and display update calls to time each frame against the state it showed."""
+
+    def __init__(self, namespace):
+        import pygame
+        self.namespace = namespace
+        self.frames = defaultdict(list)  # state name -> frame times (ms)
+        self.video_intervals = []
+        self.video_stats = []
+        self.in_video = False
+        self.first_menu_frame = None
+        self._last_fetch = time.perf_counter()
+        self._last_video_flip = None
+        for module, name, hook in (
+            (pygame.event, "get", self._fetched),
+            (pygame.event, "wait", self._fetched),
+            (pygame.display, "flip", self._presented),
+            (pygame.display, "update", self._presented),
+        ):
+            setattr(module, name, self._wrap(getattr(module, name), hook))
+        import video_player
+        play_video = video_player.play_video
+
+        def timed_play_video(*args, **kwargs):
+            self.in_video = True
+            self._last_video_flip = None
+            try:
+                stats, interrupted = play_video(*args, **kwargs)
+            finally:
+                self.in_video = False
+            self.video_stats.append({
+                "decoded": stats.decoded, "shown": stats.shown, "dropped": stats.dropped,
+                "first_frame_ms": round(stats.first_frame_latency * 1000, 2) if stats.first_frame_latency else None,
+            })
+            return stats, interrupted
+
+        video_player.play_video = timed_play_video
+
+    @staticmethod
+    def _wrap(function, hook):
+        def wrapper(*args, **kwargs):
+            result = function(*args, **kwargs)
+            hook()
+            return result
+        return wrapper
+
+    def state_name(self):
+        if self.in_video:
+            return "video"
+        state = self.namespace.get("last_drawn_state")
+        for name, value in self.namespace.items():
+            if name.startswith("STATE_") and value == state:
+                return name[len("STATE_"):].lower()
+        return "unknown"
+
+    def _fetched(self):
+        self._last_fetch = time.perf_counter()
+
+    def _presented(self):
+        now = time.perf_counter()
+        state = self.state_name()
+        self.frames[state].append((now - self._last_fetch) * 1000)
+        if state == "video":
+            if self._last_video_flip is not None:
+                self.video_intervals.append((now - self._last_video_flip) * 1000)
+            self._last_video_flip = now
+        elif state == "main_menu" and self.first_menu_frame is None:
+            self.first_menu_frame = now
+
+
+class ScriptDriver(threading.Thread):
+    """Feeds the scripted session into demoui's event queue and notes when milestones are reached."""
+
+    def __init__(self, namespace, recorder, config, started):
+        super().__init__(name="bench-driver", daemon=True)
+        self.namespace = namespace
+        self.recorder = recorder
+        self.config = config
+        self.started = started
+        self.result = {}
+
+    def wait_for(self, predicate, timeout):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            try:
+                if predicate():
+                    return True
+            except Exception:
+                pass  # The namespace is still being built
+            time.sleep(0.01)
+        return False
+
+    def post(self, *events):
+        import pygame
+        for event_type, attributes in events:
+            pygame.event.post(pygame.event.Event(event_type, attributes))
+            time.sleep(EVENT_INTERVAL)
+
+    def key(self, name, count=1):
+        import pygame
+        self.post(*[(pygame.KEYDOWN, {"key": getattr(pygame, "K_" + name), "unicode": "", "mod": 0})] * count)
+
+    def thumbnails_idle(self):
+        pool = self.namespace["thumbnail_pool"]
+        return pool is not None and pool.pending() == 0 and not self.namespace["thumbnail_loads"]
+
+    def run(self):
+        import pygame
+        ns = self.namespace
+        # Keep the attract video from starting in the middle of the script
+        self.wait_for(lambda: "INACTIVITY_TIMEOUT" in ns, 30)
+        ns["INACTIVITY_TIMEOUT"] = float("inf")
+        if self.wait_for(lambda: self.recorder.first_menu_frame, self.config["timeout"]):
+            self.result["loading_seconds"] = round(self.recorder.first_menu_frame - self.started, 3)
+        if self.wait_for(self.thumbnails_idle, self.config["timeout"]):
+            self.result["thumbnails_seconds"] = round(time.perf_counter() - self.started, 3)
+        if self.config["scenario"] == "full":
+            self.run_session()
+        self.post((pygame.QUIT, {}))
+
+    def run_session(self):
+        import pygame
+        ns = self.namespace
+        # Main menu: walk the buttons back and forth
+        for value in [(1, 0)] * 3 + [(-1, 0)] * 3:
+            self.post(*[(pygame.JOYHATMOTION, {"value": value, "joy": 0, "hat": 0})] * 5)
+        # PPT menu: move around each page, then next page through the toolbar
+        self.key("RIGHT", 3)
+        self.key("RETURN")
+        self.wait_for(lambda: ns["current_state"] == ns["STATE_PPT_MENU"], 10)
+        for _ in range(PPT_MENU_PAGES):
+            self.key("RIGHT", 3)
+            self.key("DOWN", 2)
+            self.key("LEFT", 3)
+            self.key("DOWN", 4)  # Ends on the toolbar's first button
+            self.key("RIGHT", 2)
+            self.key("RETURN")  # Next Page
+            self.key("UP")
+        # Search: type a query, take part of it back, then Esc clears it and a second Esc leaves the menu
+        self.post(*[(pygame.TEXTINPUT, {"text": c}) for c in SEARCH_TEXT])
+        self.key("BACKSPACE", 2)
+        self.key("ESCAPE", 2)
+        self.wait_for(lambda: ns["current_state"] == ns["STATE_MAIN_MENU"], 10)
+        # Video: the second button plays vid2 until interrupted
+        self.key("LEFT", 2)
+        self.key("RETURN")
+        if self.wait_for(lambda: self.recorder.in_video, 10):
+            self.wait_for(lambda: not self.recorder.in_video, self.config["video_seconds"])
+            if self.recorder.in_video:
+                self.key("SPACE")
+            self.wait_for(lambda: not self.recorder.in_video, 10)
+
+
+def run_child(config):
+    """Run demoui.py in this process with the stand-ins and print one result line."""
+    started = time.perf_counter()
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(REPO_DIR)
+    install_stand_ins(config["renderer"])
+    namespace = {"__name__": "__main__", "__file__": os.path.join(REPO_DIR, "demoui.py")}
+    recorder = FrameRecorder(namespace)
+    driver = ScriptDriver(namespace, recorder, config, started)
+    driver.start()
+    sys.argv = ["demoui.py"]
+    with open(namespace["__file__"], encoding="utf-8") as f:
+        code = compile(f.read(), namespace["__file__"], "exec")
+    exec(code, namespace)
+    result = dict(driver.result)
+    result["frames"] = {state: percentiles(times) for state, times in recorder.frames.items()}
+    result["video_interval_ms"] = percentiles(recorder.video_intervals)
+    result["video_playback"] = recorder.video_stats
+    peak = peak_memory_mb()
+    result["peak_memory_mb"] = round(peak, 1) if peak is not None else None
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+def run_demoui(deck_dir, cache_dir, scenario, args):
+    config = {"scenario": scenario, "renderer": args.renderer, "timeout": args.timeout, "video_seconds": args.video_seconds}
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", DEMOUI_DECK_DIR=deck_dir, DEMOUI_CACHE_DIR=cache_dir)
+    if args.renderer != "stub":
+        env["DEMOUI_RENDERER"] = args.renderer
+    process = subprocess.run(
+        [sys.executable, os.path.realpath(__file__), "--child", json.dumps(config)],
+        env=env, capture_output=True, text=True, timeout=args.timeout * 3,
+    )
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"demoui.py exited with {process.returncode} and no result:\n{process.stdout[-2000:]}\n{process.stderr[-2000:]}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results):
+    """{metric name: number} for every run, so two result files can be diffed key by key."""
+    metrics = {}
+    for run in results["runs"]:
+        prefix = f"{run['decks']} decks {run['cache']}"
+        for key in ("loading_seconds", "thumbnails_seconds", "peak_memory_mb"):
+            if run.get(key) is not None:
+                metrics[f"{prefix} {key}"] = run[key]
+        for state, stats in run.get("frames", {}).items():
+            if stats:
+                for p in ("p50", "p90", "p99"):
+                    metrics[f"{prefix} {state} frame {p} ms"] = stats[p]
+        if run.get("video_interval_ms"):
+            metrics[f"{prefix} video interval p99 ms"] = run["video_interval_ms"]["p99"]
+    if results.get("video_decode_fps") is not None:
+        metrics["video decode fps"] = results["video_decode_fps"]
+    return metrics
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = flatten(json.load(f))
+    with open(after_path) as f:
+        after = flatten(json.load(f))
+    for name in sorted(set(before) | set(after)):
+        old, new = before.get(name), after.get(name)
+        if old is None or new is None:
+            print(f"{name:55} {old!s:>10} {new!s:>10}")
+        else:
+            change = f"{(new - old) / old * 100:+.1f}%" if old else ""
+            print(f"{name:55} {old:>10} {new:>10} {change:>8}")
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless benchmark of demoui.py")
+    parser.add_argument("--decks", default="10,100,500", help="comma-separated deck counts")
+    parser.add_argument("--renderer", default="stub", help="stub (no rendering cost) or a slide_renderer name, e.g. pptx")
+    parser.add_argument("--video", default="vid2.mp4", help="video whose decode speed is measured")
+    parser.add_argument("--video-seconds", type=float, default=5.0, help="how long to play the video in the session")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds to wait for loading and thumbnails")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="print the change between two result files")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        run_child(json.loads(args.child))
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "renderer": args.renderer,
+        "runs": [],
+    }
+    work_dir = tempfile.mkdtemp(prefix="demoui-bench-")
+    try:
+        for count in (int(n) for n in args.decks.split(",")):
+            deck_dir = os.path.join(work_dir, f"decks-{count}")
+            cache_dir = os.path.join(work_dir, f"cache-{count}")
+            generate_decks(deck_dir, count)
+            for cache, scenario in (("cold", "loading"), ("warm", "full")):
+                run = run_demoui(deck_dir, cache_dir, scenario, args)
+                run.update(decks=count, cache=cache)
+                results["runs"].append(run)
+                print(
+                    f"{count} decks, {cache} cache: menu after {run.get('loading_seconds')}s, "
+                    f"thumbnails after {run.get('thumbnails_seconds')}s, peak {run.get('peak_memory_mb')} MB"
+                )
+                for state, stats in sorted(run["frames"].items()):
+                    if stats:
+                        print(f"  {state}: {stats['count']} frames, p50 {stats['p50']} ms, p90 {stats['p90']} ms, p99 {stats['p99']} ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    pygame.display.init()
+    size = pygame.display.set_mode((0, 0), pygame.FULLSCREEN).get_size()
+    sys.path.insert(0, REPO_DIR)
+    results["video_decode_fps"] = measure_decode_fps(os.path.join(REPO_DIR, args.video), size, 30)
+    print(f"Video decode: {results['video_decode_fps']} fps at {size[0]}x{size[1]}")
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+
+def cache_root():
+    """Per-user cache directory for demoui, kept out of the deck folder.
+
+    DEMOUI_CACHE_DIR overrides the location (useful for benchmarks and shared kiosks).
+    """
+    root = os.environ.get("DEMOUI_CACHE_DIR")
+    if not root:
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+            root = os.path.join(base, "ms-demoui", "cache")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            root = os.path.join(base, "ms-demoui")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def cache_dir(name):
+    """Create (if needed) and return a named subdirectory of the cache root."""
+    path = os.path.join(cache_root(), name)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,463 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from cache_paths import cache_dir, cache_root
+
+DEFAULT_TCP_ADDRESS = "127.0.0.1:47651"  # Used where Unix sockets are not available
+CONNECT_TIMEOUT = 10.0  # Seconds to wait for a daemon this process started
+SPAWNED_IDLE_EXIT = 600.0  # A daemon started by a UI exits after this long without clients
+CLOSE_RENDERER = "close-renderer"  # Render queue marker: release the renderer on a render thread if nothing is rendering
+RENDER_RETRIES = 2  # Times a render cut off by the renderer going away (PowerPoint closed mid-export) is queued again
+
+
+class CacheServiceError(OSError):
+    """A request the cache service could not carry out (the message comes from the service).
+
+    An OSError, like the file and socket errors of doing the same work
+    locally, so callers handle both the same way.
+    """
+
+
+def default_address():
+    """Unix socket in the cache root where supported, otherwise a localhost TCP port."""
+    if hasattr(socket, "AF_UNIX") and sys.platform != "win32":
+        return os.path.join(cache_root(), "cache-service.sock")
+    return DEFAULT_TCP_ADDRESS
+
+
+def _is_unix_address(address):
+    return os.sep in address or address.endswith(".sock")
+
+
+def _split_tcp_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class CacheService:
+    """Deck hashing, thumbnail rendering, deck text indexing and media transcoding for every demoui on a host.
+
+    Each UI instance asks over a local socket instead of hashing decks,
+    driving PowerPoint and running ffmpeg itself. Work is deduplicated: a
+    deck that several clients ask for at once is rendered once and all of
+    them get the result; audio and frame stores are built once per video.
+    The stores are the same ones a standalone demoui uses, so switching
+    between the two modes keeps the cache.
+    """
+
+    REQUESTS = ("digest", "video_digest", "prefetch", "thumbnails", "rename", "prune", "warm_media", "audio", "report")
+
+    def __init__(self, renderer=None, workers=2):
+        import pygame
+        from audio_cache import AudioCache
+        from deck_hasher import DeckHasher
+        from deck_search import DeckIndex
+        from slide_renderer import create_renderer
+        from thumbnail_store import ThumbnailStore
+        pygame.font.init()  # The python-pptx stand-in renderer draws text
+        self.hasher = DeckHasher(os.path.join(cache_root(), "deck_digests.sqlite"))
+        self.video_digests = DeckHasher(os.path.join(cache_root(), "video_digests.sqlite"), workers=1)
+        self.store = ThumbnailStore(cache_dir("thumbnails"))
+        self.deck_index = DeckIndex(os.path.join(cache_dir("thumbnails"), "search.sqlite"))
+        self.audio_cache = AudioCache(cache_dir("audio"), self.video_digests.digest)
+        self.renderer = create_renderer(renderer)
+        self._lock = threading.Lock()
+        self._rendering = {}  # (deck path, digest) -> Future of the stored thumbnail path
+        self._frame_caches = {}  # (width, height, fps) -> VideoFrameCache
+        self._render_queue = queue.Queue()
+        self.clients = 0
+        self.last_client_seen = time.monotonic()
+        self.rendered = 0
+        self.shared = 0  # Thumbnail requests answered by a render another request had started
+        for i in range(workers):
+            threading.Thread(target=self._render_worker, name=f"service-render-{i}", daemon=True).start()
+
+    # Requests; each takes and returns plain JSON values
+
+    def digest(self, path):
+        return self.hasher.digest(path)
+
+    def video_digest(self, path):
+        return self.video_digests.digest(path)
+
+    def prefetch(self, paths):
+        self.hasher.prefetch(paths)
+
+    def thumbnails(self, jobs):
+        """Return [filename, digest, image path, error] for each [filename, deck path] in jobs.
+
+        Stored thumbnails are looked up; the rest are queued for the render
+        workers, joining a render already in flight for the same deck. The
+        store and search index key decks by path, as clients show different
+        folders.
+        """
+        waiting = []
+        for filename, path in jobs:
+            try:
+                digest = self.hasher.digest(path)
+            except OSError as e:
+                waiting.append((filename, None, e))
+                continue
+            self.deck_index.index_deck(path, digest, path)
+            cached = self.store.lookup(path, digest)
+            if cached:
+                waiting.append((filename, digest, cached))
+                continue
+            with self._lock:
+                future = self._rendering.get((path, digest))
+                if future is None:
+                    future = self._rendering[(path, digest)] = Future()
+                    self._render_queue.put((path, digest, future, 0))
+                else:
+                    self.shared += 1
+            waiting.append((filename, digest, future))
+        results = []
+        for filename, digest, outcome in waiting:
+            if isinstance(outcome, Future):
+                try:
+                    outcome = outcome.result()
+                except Exception as e:
+                    outcome = e
+            if isinstance(outcome, Exception):
+                results.append([filename, digest, None, str(outcome)])
+            else:
+                results.append([filename, digest, outcome, None])
+        return results
+
+    def rename(self, old_path, new_path):
+        self.store.rename(old_path, new_path)
+        self.deck_index.rename(old_path, new_path)
+
+    def prune(self, directory, filenames):
+        """Drop cache entries for decks in directory that are no longer among its filenames.
+
+        Called whenever one client goes idle, so the decks of other folders
+        and renders queued or running for other clients must survive it:
+        orphaned files are only swept and the renderer only released while
+        nothing is rendering.
+        """
+        paths = [os.path.join(directory, f) for f in filenames]
+        with self._lock:
+            idle = not self._rendering  # Holds every render from queueing until its thumbnail is committed
+        self.store.prune(paths, sweep=idle, folder=directory)
+        self.deck_index.prune(filenames, folder=directory)
+        self.hasher.forget(paths, folder=directory)
+        if idle:
+            self._render_queue.put(CLOSE_RENDERER)  # Release PowerPoint until the next deck needs rendering
+
+    def warm_media(self, video_paths, frame_videos, size, fps):
+        """Extract soundtracks and build frame stores at size/fps in the background; returns at once."""
+        self.audio_cache.warm(video_paths)
+        if frame_videos:
+            self._frame_cache(size, fps).warm(frame_videos)
+
+    def audio(self, video_path):
+        """Path of the cached WAV, waiting for an extraction in progress; None if the video has no audio."""
+        return self.audio_cache.get(video_path)
+
+    def report(self):
+        return (
+            f"Cache service: {self.clients} clients, {self.rendered} thumbnails rendered, "
+            f"{self.shared} shared between requests, {self._render_queue.qsize()} queued; {self.hasher.report()}"
+        )
+
+    def close(self):
+        self._render_queue.put(None)
+        self.renderer.close()
+        with self._lock:
+            for frame_cache in self._frame_caches.values():
+                frame_cache.close()
+        self.store.close()
+        self.deck_index.close()
+        self.hasher.close()
+        self.video_digests.close()
+
+    def _frame_cache(self, size, fps):
+        from video_cache import VideoFrameCache
+        key = (size[0], size[1], fps)
+        with self._lock:
+            if key not in self._frame_caches:
+                self._frame_caches[key] = VideoFrameCache(cache_dir("video"), tuple(size), fps, self.video_digests.digest)
+            return self._frame_caches[key]
+
+    def _render_worker(self):
+        self.renderer.thread_init()
+        try:
+            while True:
+                job = self._render_queue.get()
+                if job is None:
+                    self._render_queue.put(None)  # Let the other workers see it too
+                    return
+                if job == CLOSE_RENDERER:
+                    # On a render thread, which has COM set up; the lock keeps new renders out until it is done
+                    with self._lock:
+                        if not self._rendering:
+                            self.renderer.close()
+                    continue
+                batch = [job]
+                while len(batch) < self.renderer.batch_size:
+                    try:
+                        job = self._render_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        self._render_queue.put(None)
+                        break
+                    if job != CLOSE_RENDERER:  # Something is rendering, so the renderer stays open
+                        batch.append(job)
+                self._render_batch(batch)
+        finally:
+            self.renderer.thread_exit()
+
+    def _render_batch(self, batch):
+        from slide_renderer import RenderInterrupted
+        staged = [(path, digest, future, retries, self.store.staging_path(digest)) for path, digest, future, retries in batch]
+        try:
+            errors = self.renderer.render_many([(path, staged_image) for path, *_, staged_image in staged])
+        except Exception as e:
+            errors = {staged_image: e for *_, staged_image in staged}
+        for path, digest, future, retries, staged_image in staged:
+            if isinstance(errors.get(staged_image), RenderInterrupted) and retries < RENDER_RETRIES:
+                self._render_queue.put((path, digest, future, retries + 1))  # Still in _rendering
+                continue
+            try:
+                if errors.get(staged_image):
+                    raise errors[staged_image]
+                future.set_result(self.store.commit(path, digest, staged_image))
+                self.rendered += 1
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._rendering.pop((path, digest), None)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One client connection: newline-delimited JSON requests, answered in order."""
+
+    def handle(self):
+        service = self.server.service
+        with service._lock:
+            service.clients += 1
+        try:
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                    if request["op"] not in CacheService.REQUESTS:
+                        raise ValueError(f"unknown request {request['op']!r}")
+                    reply = {"result": getattr(service, request["op"])(*request.get("args", []))}
+                except Exception as e:
+                    reply = {"error": f"{type(e).__name__}: {e}"}
+                self.wfile.write(json.dumps(reply).encode() + b"\n")
+        except (ConnectionError, OSError):
+            pass  # Client went away mid-request
+        finally:
+            with service._lock:
+                service.clients -= 1
+                service.last_client_seen = time.monotonic()
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(address=None, idle_exit=None, renderer=None, workers=2):
+    """Run the cache service on address until interrupted, or until idle_exit seconds pass without clients."""
+    address = address or default_address()
+    if _reachable(address):
+        print(f"A cache service is already listening on {address}")
+        return
+    try:
+        if _is_unix_address(address):
+            if os.path.exists(address):
+                os.remove(address)  # Left behind by a service that did not shut down
+            server = _UnixServer(address, _RequestHandler)
+        else:
+            server = _TcpServer(_split_tcp_address(address), _RequestHandler)
+    except OSError as e:
+        print(f"Cannot listen on {address}: {e}")  # Most likely another service started at the same moment
+        return
+    server.service = CacheService(renderer, workers)
+    thread = threading.Thread(target=server.serve_forever, name="cache-service", daemon=True)
+    thread.start()
+    print(f"Cache service listening on {address}")
+    try:
+        while True:
+            time.sleep(1.0)
+            service = server.service
+            if idle_exit and service.clients == 0 and time.monotonic() - service.last_client_seen > idle_exit:
+                print(f"No clients for {idle_exit:.0f}s, exiting")
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        print(server.service.report())
+        server.service.close()
+        if _is_unix_address(address) and os.path.exists(address):
+            os.remove(address)
+
+
+def _reachable(address):
+    try:
+        _connect(address).close()
+        return True
+    except OSError:
+        return False
+
+
+def _connect(address):
+    if _is_unix_address(address):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        target = address
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        target = _split_tcp_address(address)
+    try:
+        sock.connect(target)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class CacheClient:
+    """Talks to a CacheService; safe to call from several threads (each gets its own connection).
+
+    Paths are sent absolute: the service resolves them against its own working directory.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self._local = threading.local()
+        self._sockets = []
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.request_seconds = 0.0
+
+    def call(self, op, *args):
+        start = time.perf_counter()
+        try:
+            stream = self._stream()
+            stream.write(json.dumps({"op": op, "args": args}).encode() + b"\n")
+            stream.flush()
+            line = stream.readline()
+            if not line:
+                raise ConnectionError("cache service closed the connection")
+        except OSError:
+            self._local.stream = None  # Reconnect on the next call (the service may have been restarted)
+            raise
+        reply = json.loads(line)
+        with self._lock:
+            self.requests += 1
+            self.request_seconds += time.perf_counter() - start
+        if "error" in reply:
+            raise CacheServiceError(reply["error"])
+        return reply["result"]
+
+    def digest(self, path):
+        return self.call("digest", os.path.abspath(path))
+
+    def video_digest(self, path):
+        return self.call("video_digest", os.path.abspath(path))
+
+    def prefetch(self, paths):
+        self._notify("prefetch", [os.path.abspath(path) for path in paths])
+
+    def thumbnails(self, jobs):
+        """[(filename, digest or None, image path or None, error message or None)] for [(filename, deck path)]."""
+        return self.call("thumbnails", [[filename, os.path.abspath(path)] for filename, path in jobs])
+
+    def rename(self, old_path, new_path):
+        self._notify("rename", os.path.abspath(old_path), os.path.abspath(new_path))
+
+    def prune(self, directory, filenames):
+        self._notify("prune", os.path.abspath(directory), list(filenames))
+
+    def warm_media(self, video_paths, frame_videos, size, fps):
+        self._notify(
+            "warm_media", [os.path.abspath(p) for p in video_paths], [os.path.abspath(p) for p in frame_videos], list(size), fps
+        )
+
+    def audio(self, video_path):
+        return self.call("audio", os.path.abspath(video_path))
+
+    def report(self):
+        mean_ms = self.request_seconds / self.requests * 1000 if self.requests else 0.0
+        return f"Cache service client ({self.address}): {self.requests} requests, {mean_ms:.1f} ms mean round trip"
+
+    def close(self):
+        with self._lock:
+            for sock in self._sockets:
+                sock.close()
+            self._sockets.clear()
+
+    def _notify(self, op, *args):
+        # For requests whose failure only costs cache work later: report it and carry on
+        try:
+            self.call(op, *args)
+        except OSError as e:
+            print(f"Cache service request {op} failed: {e}")
+
+    def _stream(self):
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            sock = _connect(self.address)
+            with self._lock:
+                self._sockets.append(sock)
+            stream = self._local.stream = sock.makefile("rwb")
+        return stream
+
+
+def connect(address=None, spawn=True):
+    """CacheClient for the service at address, starting a service first if none answers and spawn is set.
+
+    Returns None when no service can be reached, so the caller can do the
+    work itself.
+    """
+    address = address or default_address()
+    if not _reachable(address):
+        if not spawn:
+            return None
+        command = [sys.executable, os.path.abspath(__file__), "--address", address, "--idle-exit", str(SPAWNED_IDLE_EXIT)]
+        if sys.platform == "win32":
+            subprocess.Popen(command, creationflags=subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP)
+        else:
+            subprocess.Popen(command, start_new_session=True, stdout=subprocess.DEVNULL)
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while not _reachable(address):
+            if time.monotonic() > deadline:
+                return None
+            time.sleep(0.05)
+    return CacheClient(address)
+
+
+def main(argv=None):
+    """Run the shared cache service: python cache_service.py [--address PATH|HOST:PORT] [--idle-exit SECONDS]"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Shared thumbnail, digest and media cache for demoui instances")
+    parser.add_argument("--address", help=f"Unix socket path or host:port (default: {default_address()})")
+    parser.add_argument("--idle-exit", type=float, help="exit after this many seconds without clients")
+    parser.add_argument("--renderer", help="slide renderer to use (default: DEMOUI_RENDERER or the best available)")
+    parser.add_argument("--workers", type=int, default=2, help="render threads")
+    args = parser.parse_args(argv)
+    serve(args.address, args.idle_exit, args.renderer, args.workers)
+
+
+if __name__ == "__main__":
+    main()
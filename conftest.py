@@ -0,0 +1,16 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import pytest
+
+
+@pytest.fixture
+def pygame_events():
+    """A dummy display, so worker threads can post events; the event queue starts empty."""
+    pygame.display.init()
+    pygame.event.clear()
+    yield
+    pygame.display.quit()
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import xxhash  # Optional, several times faster than blake2 on large decks
+except ImportError:
+    xxhash = None
+
+BUFFER_SIZE = 1024 * 1024
+
+
+def _new_hasher():
+    if xxhash:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+DIGEST_ALGORITHM = "xxh3_128" if xxhash else "blake2b_128"
+
+
+def hash_file(path):
+    """Content digest of a file as 32 hex characters, read in large buffers."""
+    hasher = _new_hasher()
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            hasher.update(view[:n])
+    return hasher.hexdigest()
+
+
+class DeckHasher:
+    """Content digests for deck files that skip hashing when (inode, size, mtime_ns) is unchanged.
+
+    Stat signatures and digests are persisted in SQLite, so a warm start only
+    stats each file. prefetch() hashes changed files on a thread pool ahead of
+    time; digest() returns the stored value, waits for a prefetch in flight,
+    or hashes inline as a last resort.
+    """
+
+    def __init__(self, db_path, workers=4):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS digests ("
+            "path TEXT PRIMARY KEY, inode INTEGER, size INTEGER, mtime_ns INTEGER, algorithm TEXT, digest TEXT)"
+        )
+        self._db.commit()
+        # path -> ((inode, size, mtime_ns), digest), only for the current algorithm
+        self._known = {
+            path: ((inode, size, mtime_ns), digest)
+            for path, inode, size, mtime_ns, digest in self._db.execute(
+                "SELECT path, inode, size, mtime_ns, digest FROM digests WHERE algorithm = ?", (DIGEST_ALGORITHM,)
+            )
+        }
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deck-hasher")
+        self._pending = {}  # path -> Future
+        self._stat_hit_paths = set()
+        self._hashed_paths = set()
+        self.stat_seconds = 0.0
+        self.hashed_bytes = 0
+        self.hash_seconds = 0.0
+
+    def prefetch(self, paths):
+        """Start hashing, in the background, every path whose stat changed since the last run."""
+        for path in paths:
+            with self._lock:
+                if path in self._pending:
+                    continue
+            try:
+                changed = self._cached(path) is None
+            except OSError:
+                continue  # Vanished or unreadable; digest() will raise for the caller
+            if changed:
+                with self._lock:
+                    self._pending[path] = self._executor.submit(self._hash_and_store, path)
+
+    def digest(self, path):
+        """Digest of path, hashing it only if it changed since it was last recorded."""
+        with self._lock:
+            future = self._pending.get(path)
+        if future:
+            return future.result()
+        cached = self._cached(path)
+        if cached is not None:
+            return cached
+        return self._hash_and_store(path)
+
+    def forget(self, keep_paths, folder=None):
+        """Drop records for files that are no longer in keep_paths; with folder, only of files directly in it."""
+        keep_paths = set(keep_paths)
+        with self._lock:
+            gone = [
+                path for path in self._known
+                if path not in keep_paths and (folder is None or os.path.dirname(path) == folder)
+            ]
+            for path in gone:
+                del self._known[path]
+            with self._db:
+                self._db.executemany("DELETE FROM digests WHERE path = ?", [(path,) for path in gone])
+
+    @property
+    def stat_hits(self):
+        return len(self._stat_hit_paths)
+
+    @property
+    def hashed_files(self):
+        return len(self._hashed_paths)
+
+    def report(self):
+        """One-line summary of what startup change detection cost."""
+        return (
+            f"Deck change detection ({DIGEST_ALGORITHM}): "
+            f"{self.stat_hits} unchanged via stat in {self.stat_seconds * 1000:.1f} ms, "
+            f"{self.hashed_files} hashed ({self.hashed_bytes / 1048576:.1f} MB) in {self.hash_seconds:.2f} s of hashing time"
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._db.close()
+
+    def _cached(self, path):
+        start = time.perf_counter()
+        st = os.stat(path)
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            known = self._known.get(path)
+            self.stat_seconds += time.perf_counter() - start
+            if known and known[0] == signature:
+                if path not in self._hashed_paths:
+                    self._stat_hit_paths.add(path)
+                return known[1]
+        return None
+
+    def _hash_and_store(self, path):
+        try:
+            start = time.perf_counter()
+            st = os.stat(path)
+            digest = hash_file(path)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._known[path] = ((st.st_ino, st.st_size, st.st_mtime_ns), digest)
+                self._hashed_paths.add(path)
+                self.hashed_bytes += st.st_size
+                self.hash_seconds += elapsed
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO digests (path, inode, size, mtime_ns, algorithm, digest) VALUES (?, ?, ?, ?, ?, ?)",
+                        (path, st.st_ino, st.st_size, st.st_mtime_ns, DIGEST_ALGORITHM, digest),
+                    )
+            return digest
+        finally:
+            with self._lock:
+                self._pending.pop(path, None)
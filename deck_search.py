@@ -0,0 +1,188 @@
+import importlib.util
+import os
+import sqlite3
+import threading
+
+SHORT_QUERY = 3  # Terms shorter than this match file names and slide titles only
+
+
+def extract_text(pptx_path):
+    """Return (titles, body) text of a deck, one slide title or text frame per line.
+
+    Only .pptx files can be read (with python-pptx); returns None for other
+    formats or when python-pptx is not installed, so the deck is searchable
+    by file name only.
+    """
+    if not pptx_path.lower().endswith(".pptx") or importlib.util.find_spec("pptx") is None:
+        return None
+    from pptx import Presentation
+    titles, body = [], []
+    for slide in Presentation(pptx_path).slides:
+        title = slide.shapes.title
+        if title is not None and title.text_frame.text.strip():
+            titles.append(title.text_frame.text.strip())
+        for shape in slide.shapes:
+            if not shape.has_text_frame or title is not None and shape.shape_id == title.shape_id:
+                continue
+            text = shape.text_frame.text.strip()
+            if text:
+                body.append(text)
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame
+            if notes is not None and notes.text.strip():
+                body.append(notes.text.strip())
+    return "\n".join(titles), "\n".join(body)
+
+
+class DeckIndex:
+    """Full-text index of deck file names, slide titles and slide text, persisted in SQLite.
+
+    Text is stored in an FTS5 table with the trigram tokenizer, which finds
+    any substring of three or more characters (CJK included) through the
+    index; without FTS5 a plain table is scanned instead. Entries are keyed
+    by filename and content digest, so only new or changed decks are read.
+    Where decks of several folders share the index (the cache service) the
+    key is the deck's path, and digests(), prune() and search() take the
+    folder to look in ("" for bare filenames).
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS indexed (filename TEXT PRIMARY KEY, digest TEXT NOT NULL)")
+        try:
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS deck_text USING fts5(filename UNINDEXED, titles, body, tokenize='trigram')"
+            )
+            self.full_text = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 or older than 3.34
+            self._db.execute("CREATE TABLE IF NOT EXISTS deck_text (filename TEXT, titles TEXT, body TEXT)")
+            self.full_text = False
+        self._db.commit()
+        self._digests = dict(self._db.execute("SELECT filename, digest FROM indexed"))
+
+    def digests(self, folder=""):
+        """{filename: digest} of the decks in folder whose text is in the index."""
+        with self._lock:
+            return {os.path.basename(key): digest for key, digest in self._digests.items() if os.path.dirname(key) == folder}
+
+    def needs(self, filename, digest):
+        with self._lock:
+            return self._digests.get(filename) != digest
+
+    def update(self, filename, digest, titles, body):
+        with self._lock:
+            with self._db:
+                self._db.execute("DELETE FROM deck_text WHERE filename = ?", (filename,))
+                self._db.execute("INSERT INTO deck_text (filename, titles, body) VALUES (?, ?, ?)", (filename, titles, body))
+                self._db.execute("INSERT OR REPLACE INTO indexed (filename, digest) VALUES (?, ?)", (filename, digest))
+            self._digests[filename] = digest
+
+    def index_deck(self, filename, digest, pptx_path):
+        """Read and index the deck's text if its digest changed; errors only cost the deck its text entry."""
+        if not self.needs(filename, digest):
+            return
+        try:
+            text = extract_text(pptx_path)
+        except Exception as e:
+            print(f"Cannot read text of {filename} for search: {e}")
+            text = ("", "")
+        if text is not None:
+            self.update(filename, digest, *text)
+
+    def rename(self, old_filename, new_filename):
+        with self._lock:
+            with self._db:
+                self._db.execute("DELETE FROM deck_text WHERE filename = ?", (new_filename,))
+                self._db.execute("DELETE FROM indexed WHERE filename = ?", (new_filename,))
+                self._db.execute("UPDATE deck_text SET filename = ? WHERE filename = ?", (new_filename, old_filename))
+                self._db.execute("UPDATE indexed SET filename = ? WHERE filename = ?", (new_filename, old_filename))
+            self._digests.pop(new_filename, None)
+            if old_filename in self._digests:
+                self._digests[new_filename] = self._digests.pop(old_filename)
+
+    def prune(self, live_filenames, folder=""):
+        """Drop entries for decks in folder that are gone."""
+        live_filenames = {os.path.join(folder, name) for name in live_filenames}
+        with self._lock:
+            removed = [(key,) for key in self._digests if os.path.dirname(key) == folder and key not in live_filenames]
+            with self._db:
+                self._db.executemany("DELETE FROM deck_text WHERE filename = ?", removed)
+                self._db.executemany("DELETE FROM indexed WHERE filename = ?", removed)
+            for (name,) in removed:
+                del self._digests[name]
+        return len(removed)
+
+    def search(self, query, filenames, folder=""):
+        """Return the filenames of folder (in the given order) matching every whitespace-separated term of query.
+
+        A term matches a deck whose file name (without its extension), slide
+        titles or slide text contain it, ignoring case. Terms shorter than
+        SHORT_QUERY skip the slide text, which would match nearly every deck
+        anyway.
+        """
+        stems = {name: os.path.splitext(name)[0].lower() for name in filenames}
+        matches = None
+        for term in query.lower().split():
+            found = {name for name, stem in stems.items() if term in stem}
+            found |= {os.path.basename(key) for key in self._match(term) if os.path.dirname(key) == folder}
+            matches = found if matches is None else matches & found
+        if matches is None:
+            return list(filenames)
+        return [name for name in filenames if name in matches]
+
+    def _match(self, term):
+        pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self._lock:
+            if len(term) < SHORT_QUERY:
+                rows = self._db.execute("SELECT filename FROM deck_text WHERE titles LIKE ? ESCAPE '\\'", (pattern,))
+            elif self.full_text:
+                phrase = '"' + term.replace('"', '""') + '"'
+                rows = self._db.execute("SELECT filename FROM deck_text WHERE deck_text MATCH ?", ("{titles body} : " + phrase,))
+            else:
+                rows = self._db.execute(
+                    "SELECT filename FROM deck_text WHERE titles LIKE ? ESCAPE '\\' OR body LIKE ? ESCAPE '\\'",
+                    (pattern, pattern),
+                )
+            return {filename for filename, in rows}
+
+    def report(self):
+        return f"Deck search index: {len(self._digests)} decks ({'FTS5 trigram' if self.full_text else 'plain scan'})"
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def main(argv=None):
+    """Search decks from the command line: python deck_search.py QUERY [--dir DIR]"""
+    import argparse
+    import time
+    from cache_paths import cache_dir, cache_root
+    from deck_hasher import DeckHasher
+    from deck_watcher import is_deck
+    parser = argparse.ArgumentParser(description="Index a deck folder and search it")
+    parser.add_argument("query")
+    parser.add_argument("--dir", default=os.path.dirname(os.path.realpath(__file__)))
+    args = parser.parse_args(argv)
+    filenames = sorted((name for name in os.listdir(args.dir) if is_deck(name)), key=str.lower)
+    index = DeckIndex(os.path.join(cache_dir("thumbnails"), "search.sqlite"))
+    hasher = DeckHasher(os.path.join(cache_root(), "deck_digests.sqlite"))
+    for name in filenames:
+        path = os.path.join(args.dir, name)
+        index.index_deck(name, hasher.digest(path), path)
+    start = time.perf_counter()
+    results = index.search(args.query, filenames)
+    elapsed = time.perf_counter() - start
+    for name in results:
+        print(name)
+    print(f"{len(results)} of {len(filenames)} decks in {elapsed * 1000:.1f} ms; {index.report()}")
+    hasher.close()
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+import pygame
+
+# Posted with added, removed and changed (lists of file names) and renamed (list of (old, new) pairs)
+DECKS_CHANGED = pygame.USEREVENT + 3
+
+DECK_EXTENSIONS = (".ppt", ".pptx")
+POLL_SECONDS = 2.0  # Scan interval of the polling fallback
+COALESCE_SECONDS = 0.3  # inotify events closer together than this are reported as one change
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def is_deck(filename):
+    """True for presentations, but not PowerPoint's ~$ lock files that sit next to an open deck."""
+    return filename.endswith(DECK_EXTENSIONS) and not filename.startswith("~$")
+
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch  # Missing on very old C libraries
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class DeckWatcher:
+    """Keeps track of the decks in a folder and posts DECKS_CHANGED when they change.
+
+    On Linux the folder is watched with inotify, so only the files named in
+    kernel events are looked at. Elsewhere the folder is scanned every
+    POLL_SECONDS with os.scandir(), whose entries carry size and mtime
+    without extra stat calls, and a new or modified file is only reported
+    once two scans agree on it (so half-copied decks are not rendered).
+    Renames keep the file's size and mtime and are reported as such, so
+    callers can keep the thumbnail.
+    """
+
+    def __init__(self, directory, poll_interval=POLL_SECONDS):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._inotify_fd = None
+        self._wake_fds = None
+        libc = _load_inotify()
+        if libc:
+            # Watch before the first scan so nothing that changes in between is missed
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+            if fd >= 0 and libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) >= 0:
+                self._inotify_fd = fd
+                self._wake_fds = os.pipe()
+            elif fd >= 0:
+                os.close(fd)
+        self._known = self._scan()  # filename -> (size, mtime_ns)
+        self._unsettled = {}  # Polling only: filename -> signature seen once, awaiting a second scan
+        target = self._run_inotify if self._inotify_fd is not None else self._run_polling
+        self._thread = threading.Thread(target=target, name="deck-watcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def backend(self):
+        return "inotify" if self._inotify_fd is not None else "polling"
+
+    def snapshot(self):
+        """Deck file names as of the initial scan, sorted case-insensitively."""
+        return sorted(self._known, key=str.lower)
+
+    def close(self):
+        self._stop_event.set()
+        if self._wake_fds:
+            os.write(self._wake_fds[1], b"x")
+        self._thread.join(timeout=2)
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            for fd in self._wake_fds:
+                os.close(fd)
+
+    def _scan(self):
+        decks = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if is_deck(entry.name):
+                        try:
+                            if entry.is_file():
+                                st = entry.stat()
+                                decks[entry.name] = (st.st_size, st.st_mtime_ns)
+                        except OSError:
+                            pass  # Removed while scanning
+        except OSError as e:
+            print(f"Cannot scan deck folder {self.directory}: {e}")
+        return decks
+
+    def _signature(self, filename):
+        try:
+            st = os.stat(os.path.join(self.directory, filename))
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _post(self, added, removed, renamed, changed):
+        if added or removed or renamed or changed:
+            pygame.event.post(pygame.event.Event(
+                DECKS_CHANGED, added=added, removed=removed, renamed=renamed, changed=changed,
+            ))
+
+    def _run_polling(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self._apply_scan(self._scan())
+
+    def _apply_scan(self, current):
+        """Diff a full scan against the known decks."""
+        removed = [name for name in self._known if name not in current]
+        candidates = [name for name, signature in current.items() if self._known.get(name) != signature]
+        # A rename keeps size and mtime, so it is settled already
+        renamed = []
+        by_signature = {self._known[name]: name for name in removed}
+        for name in candidates:
+            old = by_signature.pop(current[name], None) if name not in self._known else None
+            if old:
+                renamed.append((old, name))
+        renamed_old = {old for old, _ in renamed}
+        renamed_new = {new for _, new in renamed}
+        removed = [name for name in removed if name not in renamed_old]
+        added, changed = [], []
+        for name in candidates:
+            if name in renamed_new:
+                continue
+            if self._unsettled.get(name) != current[name]:
+                self._unsettled[name] = current[name]  # Still being written, or seen for the first time
+                continue
+            del self._unsettled[name]
+            (changed if name in self._known else added).append(name)
+        for name in list(self._unsettled):
+            if name not in current:
+                del self._unsettled[name]
+        for name in removed:
+            del self._known[name]
+        for old, new in renamed:
+            del self._known[old]
+            self._known[new] = current[new]
+        for name in added + changed:
+            self._known[name] = current[name]
+        self._post(added, removed, renamed, changed)
+
+    def _run_inotify(self):
+        wake = self._wake_fds[0]
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([self._inotify_fd, wake], [], [])
+            if wake in ready:
+                break
+            events = self._read_events()
+            # Gather the rest of a burst (a copy, a save, a rename) into one change
+            deadline = time.monotonic() + COALESCE_SECONDS
+            while not self._stop_event.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                ready, _, _ = select.select([self._inotify_fd, wake], [], [], remaining)
+                if not ready or wake in ready:
+                    break
+                events += self._read_events()
+            if any(mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED) for mask, _, _ in events):
+                print(f"Deck folder {self.directory} went away; no longer watching it")
+                return
+            self._apply_events(events)
+
+    def _read_events(self):
+        data = os.read(self._inotify_fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset < len(data):
+            _, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((mask, cookie, name))
+        return events
+
+    def _apply_events(self, events):
+        """Re-check only the files named in a burst of inotify events."""
+        if any(mask & IN_Q_OVERFLOW for mask, _, _ in events):
+            # Events were lost; fall back to one full diff, trusting what is on disk now
+            current = self._scan()
+            self._unsettled = dict(current)
+            self._apply_scan(current)
+            return
+        moved_from, moved_to, touched = {}, {}, []
+        for mask, cookie, name in events:
+            if mask & IN_ISDIR or not is_deck(name):
+                continue
+            if mask & IN_MOVED_FROM:
+                moved_from[cookie] = name
+            elif mask & IN_MOVED_TO:
+                moved_to[cookie] = name
+            if name not in touched:
+                touched.append(name)
+        renamed = []
+        for cookie, old in moved_from.items():
+            new = moved_to.get(cookie)
+            signature = self._signature(new) if new else None
+            if new and old in self._known and new not in self._known and signature:
+                del self._known[old]
+                self._known[new] = signature
+                renamed.append((old, new))
+                touched.remove(old)
+                touched.remove(new)
+        added, removed, changed = [], [], []
+        for name in touched:
+            signature = self._signature(name)
+            known = self._known.get(name)
+            if signature is None:
+                if known:
+                    del self._known[name]
+                    removed.append(name)
+            elif known is None:
+                self._known[name] = signature
+                added.append(name)
+            elif known != signature:
+                self._known[name] = signature
+                changed.append(name)
+        self._post(added, removed, renamed, changed)
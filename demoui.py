@@ -1,26 +1,50 @@
-import pygame
-import moviepy.editor as mp
 import time
+startup_started = time.perf_counter()  # Taken first so --profile-startup also covers the imports
+import pygame
+import hashlib
 import os
-import tempfile
+import sys
 import ctypes
 import subprocess
-import psutil
-import hashlib
-import json
-import win32com.client  # For PowerPoint thumbnail generation
-import pyautogui  # For sending keyboard commands to PowerPoint
-import sys
+from startup_profile import StartupTimer
+from thumbnail_worker import ThumbnailWorkerPool, THUMBNAIL_READY
+from cache_paths import cache_dir, cache_root
+from tile_renderer import GridLayout, TileCache
+from text_cache import TextCache
+from thumbnail_lru import ThumbnailLRU
+from slideshow_watcher import SlideshowWatcher, SLIDESHOW_ENDED
+from deck_watcher import DeckWatcher, DECKS_CHANGED
+from telemetry import Telemetry
+from asset_pipeline import AssetPipeline, DESIGN_SIZE, display_resolution
+from session_snapshot import SessionSnapshot
+# The stores, renderers, video/audio caches and the gamepad bridge are imported in STATE_LOADING,
+# once the loading screen is visible
+
+# Per-phase startup timings, printed once the main menu is on screen
+startup_timer = StartupTimer(startup_started) if "--profile-startup" in sys.argv else None
+
+def startup_phase(name):
+    """End the current --profile-startup phase (does nothing without the flag)."""
+    if startup_timer:
+        startup_timer.mark(name)
 
-# Initialize pygame and mixer
-pygame.init()
+startup_phase("imports")
+
+# Initialize only what the loading screen needs; the mixer is opened in STATE_LOADING
+pygame.display.init()
+pygame.font.init()
 pygame.joystick.init()
-pygame.mixer.init()  # Initialize pygame mixer for audio
+startup_phase("pygame init")
 
 # Constants
-SCREEN_WIDTH, SCREEN_HEIGHT = 1920, 1080
+# Full screen at the display's own resolution (DEMOUI_RESOLUTION=WxH overrides); layout, fonts and artwork
+# are scaled from DESIGN_SIZE by the screen height
+SCREEN_WIDTH, SCREEN_HEIGHT = display_resolution()
 MINIMIZED_WIDTH, MINIMIZED_HEIGHT = 560, 50  # Dimensions of the minimized window
 FPS = 30
+IDLE_WAIT_MAX = 0.5  # Longest sleep between checks on a static screen
+LOADING_SLICE_SECONDS = 1.0 / FPS  # Loading work done per frame before input is read again
+STATE_CPU_REPORT_INTERVAL = 600  # Seconds between CPU-per-state summaries
 INACTIVITY_TIMEOUT = 5  # 5 seconds for inactivity
 BGM_PATH = "bgm.mp3"
 
@@ -31,35 +55,130 @@ STATE_PPT_MENU = 'ppt_menu'
 STATE_MINIMIZED = 'minimized'
 STATE_SHOW_BG2 = 'show_bg2'
 
+# States whose screen only changes in response to input or background results
+STATIC_STATES = (STATE_MAIN_MENU, STATE_PPT_MENU, STATE_MINIMIZED, STATE_SHOW_BG2)
+
 # Set the initial state
 current_state = STATE_LOADING    # Start with the loading state
 
+# Dirty-rectangle rendering: draw functions record changed regions, present_frame() pushes them
+full_redraw = True
+dirty_rects = []
+last_drawn_state = None
+main_menu_drawn_button = None
+ppt_menu_drawn = None  # (page, selected slot, toolbar index, page files) as last drawn
+stale_tiles = set()  # Decks whose tile must be repainted (thumbnail arrived)
+
+# Process CPU and wall seconds per state, for spotting states that spin
+state_cpu = {}
+state_cpu_reported = time.time()
+
+# Decks sit next to this script; DEMOUI_DECK_DIR points elsewhere (e.g. the synthetic folders of bench_demoui.py)
+ppt_directory = os.environ.get("DEMOUI_DECK_DIR") or os.path.dirname(os.path.realpath(__file__))
+
+# Several instances can share a cache root (see CACHE_SERVICE), so the files of one instance carry its name:
+# DEMOUI_INSTANCE, or else a short hash of the deck folder (instances showing the same folder must set it)
+INSTANCE_NAME = os.environ.get("DEMOUI_INSTANCE") or hashlib.blake2b(
+    os.path.realpath(ppt_directory).encode(), digest_size=4
+).hexdigest()
+
+# Frame times, input latency, video and cache counters. DEMOUI_TELEMETRY picks the output:
+# jsonl (default), prometheus (a textfile for node_exporter) or off; DEMOUI_TELEMETRY_PATH moves the file
+TELEMETRY_FORMAT = os.environ.get("DEMOUI_TELEMETRY", "jsonl")
+TELEMETRY_FILES = {"jsonl": "telemetry-{}.jsonl", "prometheus": "demoui-{}.prom"}
+if TELEMETRY_FORMAT == "off":
+    telemetry = Telemetry(None)
+else:
+    telemetry = Telemetry(
+        os.environ.get("DEMOUI_TELEMETRY_PATH")
+        or os.path.join(cache_root(), TELEMETRY_FILES[TELEMETRY_FORMAT].format(INSTANCE_NAME)),
+        TELEMETRY_FORMAT,
+    )
+INPUT_EVENT_TYPES = (pygame.KEYDOWN, pygame.JOYBUTTONDOWN, pygame.JOYHATMOTION, pygame.MOUSEBUTTONDOWN, pygame.TEXTINPUT)
+input_pending_since = None  # When the oldest input not yet answered by a displayed frame was read
+events_read_at = time.perf_counter()  # Start of the current frame: when its events were fetched
+next_frame_due = events_read_at  # When an animating state draws its next frame
+held_buttons = set()  # Controller buttons currently down
+
+# Crash-safe resume: the UI state and the validated thumbnails are snapshotted while running and the snapshot is
+# deleted on a clean exit, so finding one at startup means the last run died and its screen is restored.
+# DEMOUI_SESSION_PATH moves the file
+session = SessionSnapshot(
+    os.environ.get("DEMOUI_SESSION_PATH") or os.path.join(cache_root(), f"session-{INSTANCE_NAME}.json")
+)
+resumed = session.load()  # Snapshot of the run that died, or None
+resume_target = None  # Screen the resumed run returns to, until it is on screen
+if resumed and resumed.get("ui", {}).get("state") in STATIC_STATES:
+    resume_target = resumed["ui"]["state"]
+
+# Hidden telemetry overlay: hold LB and RB together to toggle it
+OVERLAY_COMBO = {4, 5}
+OVERLAY_REFRESH_SECONDS = 1.0
+OVERLAY_FONT_SIZE = 22
+OVERLAY_COLOR = (0, 0, 0)
+show_overlay = False
+overlay_rect = None  # Area the overlay has covered since it was shown
+overlay_drawn_at = 0.0
+
 # Screen setup
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.FULLSCREEN)
+SCREEN_WIDTH, SCREEN_HEIGHT = screen.get_size()  # What the driver actually gave us
+UI_SCALE = SCREEN_HEIGHT / DESIGN_SIZE[1]
 pygame.display.set_caption("Pygame Controller UI")
-clock = pygame.time.Clock()
+startup_phase("display")
+
+def ui(pixels):
+    """A size in DESIGN_SIZE pixels, scaled to this screen."""
+    return max(1, round(pixels * UI_SCALE))
 
-# Load images
-bg_image = pygame.image.load("bg.jpg").convert()
-bg2_image = pygame.image.load("bg2.jpg").convert()
-btn1_image = pygame.image.load("btn1.jpg").convert_alpha()
-btn2_image = pygame.image.load("btn2.jpg").convert_alpha()
-btn3_image = pygame.image.load("btn3.jpg").convert_alpha()
-btn4_image = pygame.image.load("btn4.jpg").convert_alpha()  # New button for PPT menu
+# Images are loaded by load_menu_assets() in STATE_LOADING, already scaled for this screen; bg2 on first use
+asset_pipeline = None  # AssetPipeline for the screen's resolution, keeping scaled artwork on disk
+bg_image = None
+bg2_image = None
+btn1_image = btn2_image = btn3_image = btn4_image = None
+btn1_rect = btn2_rect = btn3_rect = btn4_rect = None
 
 # Button positioning and size
 button_y = SCREEN_HEIGHT - int(SCREEN_HEIGHT / 5)  # Position buttons at 1/5 of the screen height from the bottom
-btn1_rect = btn1_image.get_rect(center=(SCREEN_WIDTH // 5, button_y))
-btn2_rect = btn2_image.get_rect(center=(2 * SCREEN_WIDTH // 5, button_y))
-btn3_rect = btn3_image.get_rect(center=(3 * SCREEN_WIDTH // 5, button_y))
-btn4_rect = btn4_image.get_rect(center=(4 * SCREEN_WIDTH // 5, button_y))
+
+def load_menu_assets():
+    """Load the main menu background and buttons at screen resolution, and place the buttons."""
+    global asset_pipeline, bg_image, btn1_image, btn2_image, btn3_image, btn4_image, btn1_rect, btn2_rect, btn3_rect, btn4_rect
+    asset_pipeline = AssetPipeline(cache_dir("assets"), (SCREEN_WIDTH, SCREEN_HEIGHT))
+    bg_image = asset_pipeline.background("bg.jpg")
+    btn1_image = asset_pipeline.image("btn1.jpg", alpha=True)
+    btn2_image = asset_pipeline.image("btn2.jpg", alpha=True)
+    btn3_image = asset_pipeline.image("btn3.jpg", alpha=True)
+    btn4_image = asset_pipeline.image("btn4.jpg", alpha=True)  # New button for PPT menu
+    btn1_rect = btn1_image.get_rect(center=(SCREEN_WIDTH // 5, button_y))
+    btn2_rect = btn2_image.get_rect(center=(2 * SCREEN_WIDTH // 5, button_y))
+    btn3_rect = btn3_image.get_rect(center=(3 * SCREEN_WIDTH // 5, button_y))
+    btn4_rect = btn4_image.get_rect(center=(4 * SCREEN_WIDTH // 5, button_y))
+
+def get_bg2_image():
+    """bg2.jpg, loaded the first time it is shown."""
+    global bg2_image
+    if bg2_image is None:
+        bg2_image = asset_pipeline.background("bg2.jpg")
+    return bg2_image
 
 # Video files
 vid1_path = "vid1.mp4"
 vid2_path = "vid2.mp4"
 
-# Cached audio file paths
-audio_cache = {}
+# Attract-loop videos kept as pre-transcoded, display-size frame stores (empty list disables the cache)
+CACHED_VIDEOS = [vid1_path]
+HOT_VIDEO_SCORE = 3.0  # Recent plays (see usage_stats) past which a chosen video gets a frame store too
+cached_videos = []  # CACHED_VIDEOS plus the videos visitors play most, decided in STATE_LOADING
+video_frame_cache = None
+
+# Extracted soundtracks (WAV, persisted across runs), created in STATE_LOADING
+audio_cache = None
+
+# vid1/vid2 are kept open at frame zero with this much video already decoded, so playback starts at once
+# (held for the life of the process, so only a few frames; DecoderPool also caps it in bytes)
+PREBUFFER_SECONDS = 0.1
+decoder_pool = None
 
 # Controller setup
 controller = None
@@ -74,37 +193,356 @@ last_activity_time = time.time()
 bgm_playing = False
 
 # For PPT menu
-ppt_directory = os.path.dirname(os.path.realpath(__file__))
-cache_file = os.path.join(ppt_directory, "thumbnail_cache.json")
-ppt_files = []
-thumbnails = {}
-thumbnail_cache = {}
+legacy_cache_file = os.path.join(ppt_directory, "thumbnail_cache.json")  # Pre-ThumbnailStore cache, imported once
+ppt_files = []  # Sorted case-insensitively; kept up to date by deck_watcher
+menu_files = []  # What the PPT menu grid shows: ppt_files, narrowed by search_query if one is set
+search_query = ""  # Typed on the keyboard or picked letter by letter with the controller
+search_picker = None  # Index into SEARCH_LETTERS while the controller letter picker is open
+deck_index = None  # Full-text search index of deck names and slide text, opened in STATE_LOADING
+deck_index_folder = ""  # Folder deck_index keys this UI's decks under: the deck folder when the cache service writes it
+searched_digests = {}  # Deck -> digest whose text the current search results already reflect
+thumbnails = None  # ThumbnailLRU of decoded thumbnails around the current page, created in STATE_LOADING
+thumbnails_on_disk = {}  # Deck -> digest of its current thumbnail in the store; the session snapshot's manifest
+thumbnail_loads = set()  # Decks with a load into memory requested from the workers
+THUMBNAIL_RETRIES = 2  # Times a render cut off by PowerPoint going away (e.g. closed after a slideshow) is queued again
+thumbnail_retries = {}  # Deck -> renders of it cut off so far
+deck_watcher = None  # Reports decks added, removed, renamed or changed while running
+pending_deck_changes = []  # DECKS_CHANGED events that arrived during loading, before the thumbnail workers existed
+thumbnail_store = None  # SQLite-indexed thumbnail cache, opened in STATE_LOADING
+deck_hasher = None  # Stat-checked deck digests, opened in STATE_LOADING
+thumbnail_pool = None  # Background thumbnail workers, created in STATE_LOADING
+slide_renderer = None  # Backend the workers export thumbnails with
+thumbnail_focus_page = None  # Page the thumbnail workers are currently prioritising
+# Deck opens, video plays and page visits by time of day, opened in STATE_LOADING. They order the thumbnail work,
+# pick the decks read ahead into the OS file cache for PowerPoint and the videos kept transcoded
+usage = None
+deck_popularity = {}  # Deck -> usage score, refreshed at startup and after each slideshow
+page_popularity = {}  # PPT menu page (unfiltered) -> usage score
+PREWARM_DECKS = 5  # Most opened decks kept in the OS file cache
+PREWARM_BYTES = 512 * 1024 * 1024
+deck_prewarmer = None  # PageCacheWarmer, created in STATE_LOADING
+slideshow_launched_at = None  # Set until PowerPoint's slideshow takes the focus from this window
+slideshow_launch_warm = False  # Whether the deck being launched had been read ahead
+# Thumbnails packed at tile size into one memory-mapped file, so loading one skips the JPEG decode and scale
+USE_THUMBNAIL_ATLAS = True
+thumbnail_atlas = None  # ThumbnailAtlas at the grid's thumbnail size, opened in STATE_LOADING
+THUMBNAIL_WORKERS = 2
+# Screens on one PC can share a cache service (cache_service.py) that hashes decks, renders thumbnails and
+# transcodes media once for all of them. DEMOUI_CACHE_SERVICE: off (default), on (default socket, started if
+# not running) or a socket path / host:port
+CACHE_SERVICE = os.environ.get("DEMOUI_CACHE_SERVICE", "off")
+SERVICE_BATCH_SIZE = 4  # Decks per thumbnail request to the service, which batches renders across clients itself
+cache_service = None  # CacheClient when the service is in use, connected in STATE_LOADING
 tiles_per_row = 4
 rows_per_page = 3
 tiles_per_page = tiles_per_row * rows_per_page
+THUMBNAIL_NEIGHBOUR_PAGES = 1  # Pages either side of the current one whose thumbnails are kept in memory
+# Enough for the resident pages of 640x360 thumbnails at 4 bytes per pixel
+THUMBNAIL_MEMORY_BYTES = (2 * THUMBNAIL_NEIGHBOUR_PAGES + 1) * tiles_per_page * 640 * 360 * 4
 current_page = 0
 ppt_selected_index = 0
 toolbar_index = 0  # 0: No toolbar focus, 1: Prev Page, 2: Return to Main Menu, 3: Next Page
 in_slideshow = False  # Flag for slideshow mode
+slideshow_processes = []  # Popen handles of the running slideshow
+slideshow_input = None  # Maps the gamepad to slideshow keys while in_slideshow is set; started in STATE_LOADING
 
 # Colors and fonts for PPT menu and loading screen
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 SELECTED_COLOR = (200, 0, 0)  # Red for selected background
 NON_SELECTED_COLOR = (0, 0, 150)  # Blue for non-selected background
+PLACEHOLDER_COLOR = (30, 30, 60)  # Shown until a thumbnail arrives from the workers
 HIGHLIGHT_COLOR = (255, 215, 0)  # Highlight color for toolbar
 TOOLBAR_COLOR = (50, 50, 50)
+TOOLBAR_HEIGHT = ui(40)
+SEARCH_BAR_HEIGHT = ui(36)  # Shown above the toolbar while a search is set or being picked
+SEARCH_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 "
+SEARCH_PICKER_SPAN = 4  # Letters shown either side of the picked one
 TEXT_COLOR = WHITE
-font = pygame.font.Font("c:\Windows\Fonts\simhei.ttf", 24)
-loading_font = pygame.font.Font(None, 60)  # Larger font for loading screen
+MENU_FONT = r"c:\Windows\Fonts\simhei.ttf"  # PPT menu font (a large CJK font), opened in STATE_LOADING
+MENU_FONT_SIZE = ui(24)
+LOADING_FONT_SIZE = ui(60)  # Larger font for loading screen
+MESSAGE_FONT_SIZE = ui(60)  # Prompts over videos and bg2
+MINIMIZED_FONT_SIZE = 40  # The minimized bar is a fixed-size window
+
+# Every screen renders text through this cache, so a static label is rasterised once
+text_cache = TextCache()
+text_cache.font(None, LOADING_FONT_SIZE)
+startup_phase("loading font")
+
+# Pre-composed PPT menu tiles (created with the PPT menu font) and the grid geometry they are laid out on
+tile_cache = None
+grid_layout = None
+
+def generate_thumbnails(batch):
+    """Worker job: return (filename, (digest, surface or None), error) for each deck in the batch.
+
+    The thumbnail is decoded into a surface only for jobs submitted with load set.
+    """
+    if cache_service:
+        results = request_thumbnails(batch)
+    else:
+        results = render_thumbnails(batch)
+    loads = {filename: load for filename, (_, load) in batch}
+    batch_results = []
+    for filename, _ in batch:
+        result, error = results[filename]
+        if result:
+            file_digest, output_image = result
+            load_started = time.perf_counter()
+            try:
+                if thumbnail_atlas is not None:
+                    result = (file_digest, atlas_thumbnail(filename, file_digest, output_image, loads[filename]))
+                else:
+                    result = (file_digest, pygame.image.load(output_image) if loads[filename] else None)
+            except pygame.error as e:
+                result, error = None, e
+            if loads[filename]:
+                telemetry.timing("thumbnail_load", time.perf_counter() - load_started)
+        batch_results.append((filename, result, error))
+    return batch_results
+
+def render_thumbnails(batch):
+    """Return {filename: ((digest, image path) or None, error)}, rendering what the store does not have.
+
+    Decks whose cached thumbnail is still valid are only looked up; the rest
+    are handed to the slide renderer in a single render_many() call.
+    """
+    results = {}
+    to_render = []
+    for filename, (pptx_path, _) in batch:
+        try:
+            file_digest = deck_hasher.digest(pptx_path)
+        except OSError as e:
+            results[filename] = (None, e)
+            continue
+        deck_index.index_deck(filename, file_digest, pptx_path)
+        # Reuse the stored thumbnail if the deck's digest still matches
+        cached_image = thumbnail_store.lookup(filename, file_digest)
+        if cached_image:
+            results[filename] = ((file_digest, cached_image), None)
+        else:
+            to_render.append((filename, pptx_path, file_digest, thumbnail_store.staging_path(file_digest)))
+    if to_render:
+        render_started = time.perf_counter()
+        errors = slide_renderer.render_many([(pptx_path, staged_image) for _, pptx_path, _, staged_image in to_render])
+        telemetry.timing("thumbnail_render", (time.perf_counter() - render_started) / len(to_render))
+        for filename, _, file_digest, staged_image in to_render:
+            try:
+                if errors.get(staged_image):
+                    raise errors[staged_image]
+                results[filename] = ((file_digest, thumbnail_store.commit(filename, file_digest, staged_image)), None)
+            except Exception as e:
+                results[filename] = (None, e)
+    return results
+
+def request_thumbnails(batch):
+    """Like render_thumbnails(), but the cache service hashes, indexes and renders the decks."""
+    from cache_service import CacheServiceError
+    request_started = time.perf_counter()
+    results = {}
+    jobs = [(filename, pptx_path) for filename, (pptx_path, _) in batch]
+    for filename, file_digest, output_image, error in cache_service.thumbnails(jobs):
+        results[filename] = ((file_digest, output_image), None) if output_image else (None, CacheServiceError(error))
+    telemetry.timing("thumbnail_service_request", (time.perf_counter() - request_started) / len(batch))
+    return results
+
+def atlas_thumbnail(filename, file_digest, image_path, load):
+    """Slice a thumbnail from the atlas, packing it in from the stored JPEG first if the atlas lacks it.
+
+    Decks not being loaded are still packed, so the next start finds every thumbnail in the atlas.
+    """
+    surface = thumbnail_atlas.get(filename, file_digest) if load else None
+    if surface is None and (load or not thumbnail_atlas.has(filename, file_digest)):
+        surface = thumbnail_atlas.put(filename, file_digest, pygame.image.load(image_path))
+    return surface if load else None
+
+def handle_thumbnail_ready(event):
+    """Swap a finished thumbnail into the PPT menu and prune the store once all jobs are done."""
+    from slide_renderer import RenderInterrupted
+    thumbnail_loads.discard(event.filename)
+    if event.filename not in ppt_files:
+        pass  # Deck was removed or renamed while its thumbnail was being made
+    elif isinstance(event.error, RenderInterrupted) and thumbnail_retries.get(event.filename, 0) < THUMBNAIL_RETRIES:
+        thumbnail_retries[event.filename] = thumbnail_retries.get(event.filename, 0) + 1
+        submit_thumbnail_job(event.filename)  # The deck is fine; the renderer attaches to a new PowerPoint
+    elif event.error:
+        print(f"Failed to create thumbnail for {event.filename}: {event.error}")
+    else:
+        file_digest, thumbnail_image = event.result
+        thumbnails_on_disk[event.filename] = file_digest
+        tile_cache.invalidate(event.filename)
+        stale_tiles.add(event.filename)
+        if thumbnail_image is not None:
+            thumbnails.put(event.filename, thumbnail_image)
+        else:
+            # Stored but not loaded; only decks near the current page are brought into memory
+            thumbnails.discard(event.filename)
+            if event.filename in resident_window():
+                request_thumbnail(event.filename)
+        if searched_digests.get(event.filename) != file_digest:
+            searched_digests[event.filename] = file_digest
+            if search_query:
+                apply_search_filter()  # The deck's text has just been (re)indexed
+    if event.pending == 0 and thumbnail_pool.pending() == 0:  # Not idle if the job was just queued again
+        thumbnails_idle()
+
+def thumbnails_idle():
+    """All thumbnail jobs are done: release the renderer and drop cache entries for decks that are gone."""
+    if thumbnail_atlas is not None:
+        thumbnail_atlas.prune(ppt_files)
+        print(thumbnail_atlas.report())
+    if cache_service:
+        cache_service.prune(ppt_directory, ppt_files)  # The service releases its renderer when it has nothing queued
+        print(deck_index.report())
+        print(cache_service.report())
+        return
+    if not in_slideshow:
+        slide_renderer.close()  # Otherwise once the slideshow ends; the renderer may share its PowerPoint
+    thumbnail_store.prune(ppt_files)
+    deck_index.prune(ppt_files)
+    print(deck_index.report())
+    deck_hasher.forget((os.path.join(ppt_directory, f) for f in ppt_files), folder=ppt_directory)
+    print(deck_hasher.report())
+
+def handle_decks_changed(event):
+    """Apply deck folder changes to the PPT menu, regenerating only the affected thumbnails."""
+    if thumbnail_pool is None:
+        pending_deck_changes.append(event)  # The watcher starts before the workers; applied at the end of loading
+        return
+    selected = menu_files[ppt_selected_index] if ppt_selected_index < len(menu_files) else None
+    renamed_pending = []  # Renamed decks whose thumbnail had not been made yet
+    for filename in event.removed:
+        if filename in ppt_files:
+            ppt_files.remove(filename)
+        thumbnails.discard(filename)
+        thumbnails_on_disk.pop(filename, None)
+        thumbnail_loads.discard(filename)
+        tile_cache.invalidate(filename)
+        thumbnail_pool.cancel(filename)
+    for old, new in event.renamed:
+        if old in ppt_files:
+            ppt_files.remove(old)
+        ppt_files.append(new)
+        if cache_service:
+            cache_service.rename(os.path.join(ppt_directory, old), os.path.join(ppt_directory, new))
+        else:
+            thumbnail_store.rename(old, new)
+            deck_index.rename(old, new)
+        usage.rename("deck", old, new)
+        if thumbnail_atlas is not None:
+            thumbnail_atlas.rename(old, new)
+        tile_cache.invalidate(old)
+        thumbnail_pool.cancel(old)
+        thumbnail_loads.discard(old)
+        thumbnails.rename(old, new)  # Same content, same thumbnail
+        if old in thumbnails_on_disk:
+            thumbnails_on_disk[new] = thumbnails_on_disk.pop(old)
+        else:
+            renamed_pending.append(new)
+        if selected == old:
+            selected = new
+    for filename in event.added:
+        if filename not in ppt_files:
+            ppt_files.append(filename)
+    ppt_files.sort(key=str.lower)
+    # New and modified decks keep their old tile until the fresh thumbnail arrives
+    if cache_service:
+        cache_service.prefetch(os.path.join(ppt_directory, f) for f in event.added + event.changed)
+    else:
+        deck_hasher.prefetch(os.path.join(ppt_directory, f) for f in event.added + event.changed)
+    for filename in event.changed:
+        thumbnails_on_disk.pop(filename, None)
+    for filename in event.added + event.changed + renamed_pending:
+        submit_thumbnail_job(filename)
+    print(
+        f"Deck folder changed: {len(event.added)} added, {len(event.removed)} removed, "
+        f"{len(event.renamed)} renamed, {len(event.changed)} changed"
+    )
+    apply_search_filter(selected)
+    if thumbnail_pool.pending() == 0:
+        thumbnails_idle()  # Nothing to render (e.g. only removals); prune right away
+
+def resident_window():
+    """Decks on the current page and on THUMBNAIL_NEIGHBOUR_PAGES pages either side of it."""
+    first = max(0, current_page - THUMBNAIL_NEIGHBOUR_PAGES) * tiles_per_page
+    return menu_files[first:(current_page + THUMBNAIL_NEIGHBOUR_PAGES + 1) * tiles_per_page]
+
+def submit_thumbnail_job(filename):
+    """Queue a thumbnail job, loading the result into memory if the deck is near the current page."""
+    load = filename in resident_window()
+    if load:
+        thumbnail_loads.add(filename)
+    thumbnail_pool.submit(filename, os.path.join(ppt_directory, filename), load)
+
+def request_thumbnail(filename):
+    """Ask the workers to load filename's thumbnail into memory (rendering it first if needed)."""
+    if filename not in thumbnail_loads:
+        thumbnail_loads.add(filename)
+        thumbnail_pool.submit(filename, os.path.join(ppt_directory, filename), True)
+
+def prefetch_thumbnails():
+    """Load thumbnails for the resident pages in the background, so flipping to them is instant."""
+    for filename in resident_window():
+        if filename not in thumbnails:
+            request_thumbnail(filename)
+
+def focus_thumbnail_jobs():
+    """Generate thumbnails for the page on screen and its neighbours first, then for the most visited pages.
+
+    Within a page, and among decks the search hides, the most opened decks go first.
+    """
+    global thumbnail_focus_page
+    if thumbnail_pool is None:
+        return  # Still loading; the workers are focused once they start
+    thumbnail_focus_page = current_page
+    prefetch_thumbnails()
+    filtered = bool(search_query.strip())  # Page numbers of a filtered grid are not the ones visits were counted on
+
+    def priority(i):
+        page = i // tiles_per_page
+        distance = abs(page - current_page)
+        far = distance > THUMBNAIL_NEIGHBOUR_PAGES
+        visits = page_popularity.get(page, 0.0) if far and not filtered else 0.0
+        return far, -visits, distance, -deck_popularity.get(menu_files[i], 0.0)
 
-# Function to calculate MD5 hash of a file
-def calculate_md5(file_path):
-    hasher = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hasher.update(chunk)
-    return hasher.hexdigest()
+    order = sorted(range(len(menu_files)), key=priority)
+    shown = set(menu_files)
+    hidden = sorted((f for f in ppt_files if f not in shown), key=lambda f: -deck_popularity.get(f, 0.0))
+    thumbnail_pool.focus([menu_files[i] for i in order] + hidden)
+
+def refresh_popularity():
+    """Re-read the usage rankings, which shift with new uses and the time of day."""
+    global deck_popularity, page_popularity
+    deck_popularity = usage.rank("deck")
+    page_popularity = {int(page): score for page, score in usage.rank("page").items()}
+
+def prewarm_decks():
+    """Read the most opened decks into the OS file cache, so PowerPoint opens them without waiting on the disk."""
+    top = sorted((f for f in ppt_files if f in deck_popularity), key=deck_popularity.get, reverse=True)
+    deck_prewarmer.warm(os.path.join(ppt_directory, f) for f in top[:PREWARM_DECKS])
+
+def record_page_visit():
+    if usage and not search_query.strip():
+        usage.record("page", str(current_page))
+
+def apply_search_filter(selected=None):
+    """Narrow the grid to the decks matching search_query, keeping the selected deck (or the nearest one) in view."""
+    global menu_files, ppt_selected_index, current_page
+    if selected is None and ppt_selected_index < len(menu_files):
+        selected = menu_files[ppt_selected_index]
+    menu_files = deck_index.search(search_query, ppt_files, deck_index_folder) if search_query.strip() else ppt_files
+    if selected in menu_files:
+        ppt_selected_index = menu_files.index(selected)
+    else:
+        ppt_selected_index = max(0, min(ppt_selected_index, len(menu_files) - 1))
+    current_page = ppt_selected_index // tiles_per_page
+    focus_thumbnail_jobs()
+
+def set_search_query(query):
+    global search_query
+    search_query = query
+    apply_search_filter()
 
 # Define the path to PowerPoint executable
 def get_powerpoint_path():
@@ -128,21 +566,47 @@ powerpoint_path = get_powerpoint_path()
 
 # Function to start PowerPoint slideshow
 def start_ppt_slideshow(file_path):
-    global in_slideshow
+    global in_slideshow, slideshow_processes, slideshow_launched_at, slideshow_launch_warm
     if powerpoint_path and os.path.exists(file_path):
+        usage.record("deck", os.path.basename(file_path))
+        slideshow_launch_warm = deck_prewarmer.opened(file_path)
+        slideshow_launched_at = time.perf_counter()
         # Start PowerPoint slideshow
-        subprocess.Popen([powerpoint_path, "/s", file_path])
+        powerpoint = subprocess.Popen([powerpoint_path, "/s", file_path])
         in_slideshow = True
 
-        # Start the controller mapping script
-        script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ppt_controller.py")
-        subprocess.Popen([sys.executable, script_path])
+        # Gamepad presses now go to this PowerPoint process as keystrokes
+        slideshow_input.start_slideshow(powerpoint.pid)
+        slideshow_processes = [powerpoint]
+        telemetry.count("slideshows")
+
+        # SLIDESHOW_ENDED arrives once this PowerPoint process and its children have exited (or, if it handed the
+        # deck to a PowerPoint already running, once that one has)
+        SlideshowWatcher([powerpoint.pid], on_handoff=slideshow_input.follow)
     else:
         print("PowerPoint executable not found. Please install PowerPoint or specify its path.")
 
-# Function to monitor if PowerPoint is running
-def is_ppt_running():
-    return any("powerpnt" in process.name().lower() for process in psutil.process_iter(['name']))
+def handle_slideshow_ended(event):
+    """Return to the PPT menu once the slideshow processes have exited."""
+    global in_slideshow, slideshow_processes, slideshow_launched_at
+    slideshow_input.stop_slideshow()
+    print(f"Slideshow input: {slideshow_input.latency}")
+    slideshow_processes = []
+    in_slideshow = False
+    slideshow_launched_at = None  # The slideshow never took the focus (e.g. PowerPoint failed to open the deck)
+    bring_window_to_front()
+    if slide_renderer and thumbnail_pool.pending() == 0:
+        slide_renderer.close()  # Held back by thumbnails_idle() while the slideshow ran
+    # The deck just shown counts now; PowerPoint may also have pushed the other decks out of the file cache
+    refresh_popularity()
+    prewarm_decks()
+
+def report_slideshow_launch():
+    """PowerPoint's slideshow took the focus: time the launch, split by whether the deck had been read ahead."""
+    global slideshow_launched_at
+    name = "slideshow_launch_warm" if slideshow_launch_warm else "slideshow_launch_cold"
+    telemetry.timing(name, time.perf_counter() - slideshow_launched_at)
+    slideshow_launched_at = None
 
 # Function to bring Pygame window to the front
 def bring_window_to_front():
@@ -191,89 +655,93 @@ def stop_bgm():
         bgm_playing = False
 
 def get_audio_path_for_video(video_path):
-    """Generate and cache audio for the given video, if not already cached."""
-    if video_path not in audio_cache:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp_audio_file:
-            audio_cache[video_path] = tmp_audio_file.name
-        clip = mp.VideoFileClip(video_path)
-        clip.audio.write_audiofile(audio_cache[video_path])  # Write audio once
-    return audio_cache[video_path]
-
-def play_video_with_audio(video_path, return_message=None):
+    """Return the cached WAV soundtrack for the given video (None if it has no audio)."""
+    if cache_service:
+        try:
+            return cache_service.audio(video_path)
+        except OSError as e:
+            print(f"Cache service has no audio for {video_path}: {e}")
+            return None
+    return audio_cache.get(video_path)
+
+def get_frame_store(video_path):
+    """Pre-transcoded frames for video_path, or None if it is not cached (yet)."""
+    if video_frame_cache and video_path in cached_videos:
+        return video_frame_cache.lookup(video_path)
+    return None
+
+def play_video_with_audio(video_path, return_message=None, interrupt_types=(pygame.JOYBUTTONDOWN, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN)):
     """Play video with audio using pygame mixer for audio, and show a return message if specified."""
-    clip = mp.VideoFileClip(video_path).resize((SCREEN_WIDTH, SCREEN_HEIGHT))
-    
-    # Load and play audio from the cached file path
+    global input_pending_since, events_read_at
+    requested_at = time.perf_counter()
+    mark_dirty()  # The video covers the whole screen; repaint everything afterwards
+    overlay = None
+    if return_message:
+        text_surface = text_cache.render(return_message, MESSAGE_FONT_SIZE, WHITE)
+        overlay = (text_surface, text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - ui(100))))
+
+    from video_player import play_video
+
+    # Audio comes from the cached file path; frames are decoded and scaled on a background thread
     audio_path = get_audio_path_for_video(video_path)
-    pygame.mixer.music.load(audio_path)
-    pygame.mixer.music.play()
-    
-    for frame in clip.iter_frames(fps=FPS, dtype="uint8"):
-        frame_surface = pygame.surfarray.make_surface(frame.swapaxes(0, 1))
-        screen.blit(pygame.transform.scale(frame_surface, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0))
-    
-        # Show return message if specified
-        if return_message:
-            font = pygame.font.SysFont(None, 60)
-            text_surface = font.render(return_message, True, (255, 255, 255))  # White color
-            text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100))
-            screen.blit(text_surface, text_rect)
-    
-        pygame.display.flip()
-        clock.tick(FPS)
-    
-        # Check for return to main screen
-        for event in pygame.event.get():
-            if event.type in (pygame.JOYBUTTONDOWN, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
-                pygame.mixer.music.stop()  # Stop audio playback
-                clip.close()  # Close the video clip
-                return
-    
-    pygame.mixer.music.stop()
-    clip.close()
+    prepared = decoder_pool.take(video_path) if decoder_pool else None
+    frame_store = get_frame_store(video_path)
+    telemetry.count("video_frame_store_hits" if frame_store else "video_frame_store_misses")
+    stats, interrupted = play_video(
+        screen, video_path, FPS, audio_path, overlay, interrupt_types,
+        frame_store=frame_store, prepared=prepared, requested_at=requested_at,
+    )
+    print(f"Video {os.path.basename(video_path)}: {stats}")
+    telemetry.count("video_frames_decoded", stats.decoded)
+    telemetry.count("video_frames_shown", stats.shown)
+    telemetry.count("video_frames_dropped", stats.dropped)
+    if stats.first_frame_latency is not None:
+        telemetry.timing("video_first_frame", stats.first_frame_latency)
+        if input_pending_since is not None:
+            # The press that started the video was answered by its first frame
+            telemetry.input_latency("video", requested_at - input_pending_since + stats.first_frame_latency)
+    # A press that stopped the video is answered by the menu frame drawn next
+    input_pending_since = stats.interrupted_at
+    events_read_at = time.perf_counter()  # Time the menu frame after playback from here, not from the press
+    held_buttons.clear()  # Button releases during playback went to the video loop
+    if decoder_pool:
+        # Re-open at frame zero for the next time while the menu is idle
+        decoder_pool.prepare(video_path, get_frame_store(video_path))
+
+def prepare_videos():
+    """Open vid1/vid2 at frame zero with their opening frames buffered.
+
+    Allocating the frame buffers takes a noticeable moment, so this runs once
+    the main menu is on screen rather than during loading.
+    """
+    global decoder_pool
+    from video_player import DecoderPool
+    decoder_pool = DecoderPool(screen.get_size(), FPS, PREBUFFER_SECONDS)
+    for video_path in (vid1_path, vid2_path):
+        decoder_pool.prepare(video_path, get_frame_store(video_path))
 
 def play_vid1_with_message():
     """Play vid1 with 'Press anything on the joystick or click to continue' message."""
-    clip = mp.VideoFileClip(vid1_path).resize((SCREEN_WIDTH, SCREEN_HEIGHT))
-    
-    # Load and play audio from the cached file path
-    audio_path = get_audio_path_for_video(vid1_path)
-    pygame.mixer.music.load(audio_path)
-    pygame.mixer.music.play()
-    
-    for frame in clip.iter_frames(fps=FPS, dtype="uint8"):
-        frame_surface = pygame.surfarray.make_surface(frame.swapaxes(0, 1))
-        screen.blit(pygame.transform.scale(frame_surface, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0))
-    
-        # Show message
-        font = pygame.font.SysFont(None, 60)
-        text_surface = font.render("Press anything on the joystick or click to continue", True, (255, 255, 255))
-        text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100))
-        screen.blit(text_surface, text_rect)
-    
-        pygame.display.flip()
-        clock.tick(FPS)
-    
-        # Check for interruption to exit video
-        for event in pygame.event.get():
-            if event.type in (pygame.JOYBUTTONDOWN, pygame.JOYHATMOTION, pygame.JOYAXISMOTION, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
-                pygame.mixer.music.stop()
-                clip.close()
-                return
-    
-    pygame.mixer.music.stop()
-    clip.close()
+    play_video_with_audio(
+        vid1_path,
+        "Press anything on the joystick or click to continue",
+        (pygame.JOYBUTTONDOWN, pygame.JOYHATMOTION, pygame.JOYAXISMOTION, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN),
+    )
+
+def play_vid2_with_message():
+    """Play vid2, chosen from the main menu (counted as a play, unlike the attract loop)."""
+    usage.record("video", vid2_path)
+    play_video_with_audio(vid2_path, "Press A Button to return to home")
 
 def show_bg2_screen():
     """Displays bg2.jpg and waits for the A button to return to the main screen."""
     global current_state
     current_state = STATE_SHOW_BG2
-    screen.blit(bg2_image, (0, 0))
+    screen.blit(get_bg2_image(), (0, 0))
 
     # Render "Press A button to return to home" text in white
-    font = pygame.font.SysFont(None, 60)
-    text_surface = font.render("Press A button to return to home", True, (255, 255, 255))
-    text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100))
+    text_surface = text_cache.render("Press A button to return to home", MESSAGE_FONT_SIZE, WHITE)
+    text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - ui(100)))
     screen.blit(text_surface, text_rect)
     pygame.display.flip()
 
@@ -294,7 +762,7 @@ def move_selection_right():
     global ppt_selected_index, toolbar_index
     if toolbar_index == 0:
         # Calculate the end index of the current page
-        end_index = min((current_page + 1) * tiles_per_page, len(ppt_files))
+        end_index = min((current_page + 1) * tiles_per_page, len(menu_files))
         if ppt_selected_index + 1 < end_index:
             ppt_selected_index += 1
     elif toolbar_index < 3:
@@ -316,7 +784,7 @@ def move_selection_down():
     if toolbar_index == 0:
         # Calculate the bounds of the current page
         start_index = current_page * tiles_per_page
-        end_index = min(start_index + tiles_per_page, len(ppt_files))
+        end_index = min(start_index + tiles_per_page, len(menu_files))
         max_index = end_index - 1
         if ppt_selected_index + tiles_per_row <= max_index:
             ppt_selected_index += tiles_per_row
@@ -333,17 +801,18 @@ def select_current_item():
         current_state = STATE_MAIN_MENU  # Return to Main Menu
     elif toolbar_index == 3:
         next_page()
-    else:
-        ppt_path = os.path.join(ppt_directory, ppt_files[ppt_selected_index])
+    elif menu_files:
+        ppt_path = os.path.join(ppt_directory, menu_files[ppt_selected_index])
         start_ppt_slideshow(ppt_path)
 
 # Navigation between pages in PPT menu
 def next_page():
     global current_page, ppt_selected_index
-    if (current_page + 1) * tiles_per_page < len(ppt_files):
+    if (current_page + 1) * tiles_per_page < len(menu_files):
         current_page += 1
         # Reset selection to first tile on the new page
         ppt_selected_index = current_page * tiles_per_page
+        record_page_visit()
 
 def prev_page():
     global current_page, ppt_selected_index
@@ -351,12 +820,16 @@ def prev_page():
         current_page -= 1
         # Reset selection to first tile on the previous page
         ppt_selected_index = current_page * tiles_per_page
+        record_page_visit()
 
 # Helper function to draw toolbar at the bottom in PPT menu
+def get_toolbar_rect():
+    return pygame.Rect(0, screen.get_height() - TOOLBAR_HEIGHT, screen.get_width(), TOOLBAR_HEIGHT)
+
 def draw_toolbar():
-    toolbar_height = 40
+    toolbar_height = TOOLBAR_HEIGHT
     toolbar_y = screen.get_height() - toolbar_height  # Position toolbar at the bottom
-    pygame.draw.rect(screen, TOOLBAR_COLOR, (0, toolbar_y, screen.get_width(), toolbar_height))
+    pygame.draw.rect(screen, TOOLBAR_COLOR, get_toolbar_rect())
 
     # Positions for toolbar buttons
     button_positions = [
@@ -367,327 +840,743 @@ def draw_toolbar():
 
     # Draw "Previous Page" button
     prev_color = HIGHLIGHT_COLOR if toolbar_index == 1 else WHITE
-    prev_button = font.render("Previous Page", True, prev_color)
+    prev_button = text_cache.render("Previous Page", MENU_FONT_SIZE, prev_color, MENU_FONT)
     prev_rect = prev_button.get_rect(center=button_positions[0])
     screen.blit(prev_button, prev_rect)
 
     # Draw "Return to Main Menu" button
     return_color = HIGHLIGHT_COLOR if toolbar_index == 2 else WHITE
-    return_button = font.render("Return to Main Menu", True, return_color)
+    return_button = text_cache.render("Return to Main Menu", MENU_FONT_SIZE, return_color, MENU_FONT)
     return_rect = return_button.get_rect(center=button_positions[1])
     screen.blit(return_button, return_rect)
 
     # Draw "Next Page" button
     next_color = HIGHLIGHT_COLOR if toolbar_index == 3 else WHITE
-    next_button = font.render("Next Page", True, next_color)
+    next_button = text_cache.render("Next Page", MENU_FONT_SIZE, next_color, MENU_FONT)
     next_rect = next_button.get_rect(center=button_positions[2])
     screen.blit(next_button, next_rect)
 
     return prev_rect, return_rect, next_rect
 
-def draw_ppt_menu():
-    screen.fill(BLACK)
-    prev_rect, return_rect, next_rect = draw_toolbar()
+def get_search_bar_rect():
+    return pygame.Rect(0, screen.get_height() - TOOLBAR_HEIGHT - SEARCH_BAR_HEIGHT, screen.get_width(), SEARCH_BAR_HEIGHT)
+
+def draw_search_bar():
+    """Draw the search query, the match count and (while picking with the controller) the letter strip."""
+    rect = get_search_bar_rect()
+    screen.fill(BLACK, rect)
+    if not search_query and search_picker is None:
+        return
+    query_text = text_cache.render(f"Search: {search_query}_", MENU_FONT_SIZE, WHITE, MENU_FONT)
+    screen.blit(query_text, query_text.get_rect(midleft=(10, rect.centery)))
+    count_text = text_cache.render(f"{len(menu_files)} of {len(ppt_files)} decks", MENU_FONT_SIZE, WHITE, MENU_FONT)
+    screen.blit(count_text, count_text.get_rect(midright=(rect.right - 10, rect.centery)))
+    if search_picker is not None:
+        # A window of letters around the picked one: D-pad left/right to move, A to add, X to delete, B to close
+        x = rect.width // 3
+        for offset in range(-SEARCH_PICKER_SPAN, SEARCH_PICKER_SPAN + 1):
+            index = (search_picker + offset) % len(SEARCH_LETTERS)
+            letter = SEARCH_LETTERS[index] if SEARCH_LETTERS[index] != " " else "Space"
+            color = HIGHLIGHT_COLOR if offset == 0 else WHITE
+            letter_text = text_cache.render(letter, MENU_FONT_SIZE, color, MENU_FONT)
+            screen.blit(letter_text, letter_text.get_rect(midleft=(x, rect.centery)))
+            x += letter_text.get_width() + ui(16)
 
-    # Calculate tile and thumbnail sizes dynamically
-    tile_width = screen.get_width() // tiles_per_row - 20
-    tile_height = tile_width * 9 // 16 + 40  # 16:9 aspect ratio for thumbnail + space for text
-    thumbnail_width = tile_width
-    thumbnail_height = tile_width * 9 // 16  # Maintain 16:9 aspect ratio
+def get_grid_layout():
+    """Return the PPT menu grid layout, recomputing it only when the screen size changes."""
+    global grid_layout
+    if grid_layout is None or grid_layout.screen_size != screen.get_size():
+        grid_layout = GridLayout(screen.get_size(), tiles_per_row, rows_per_page, UI_SCALE)
+    return grid_layout
 
-    # Display tiles on the current page
+def draw_main_menu():
+    """Draw the main menu, repainting only the buttons whose selection border changed."""
+    global main_menu_drawn_button
+    buttons = [btn1_rect, btn2_rect, btn3_rect, btn4_rect]
+    images = [btn1_image, btn2_image, btn3_image, btn4_image]
+    if full_redraw or main_menu_drawn_button is None:
+        screen.blit(bg_image, (0, 0))
+        changed = range(1, 5)
+        mark_dirty()
+    elif main_menu_drawn_button != selected_button:
+        changed = (main_menu_drawn_button, selected_button)
+    else:
+        return
+    # Draw buttons with a green border around the selected button
+    for idx in changed:
+        btn_rect = buttons[idx - 1]
+        area = btn_rect.inflate(ui(10), ui(10))
+        screen.blit(bg_image, area, area)  # Restore the background under a removed border
+        if selected_button == idx:
+            pygame.draw.rect(screen, (0, 255, 0), area, ui(3))
+        screen.blit(images[idx - 1], btn_rect.topleft)
+        mark_dirty(area)
+    main_menu_drawn_button = selected_button
+
+def draw_ppt_menu():
+    """Draw the PPT menu, repainting only tiles and toolbar parts that changed since the last frame."""
+    global ppt_menu_drawn
+    if thumbnail_focus_page != current_page:
+        focus_thumbnail_jobs()
+
+    # Tile geometry only changes with the screen size
+    layout = get_grid_layout()
     start_index = current_page * tiles_per_page
-    end_index = min(start_index + tiles_per_page, len(ppt_files))
-    visible_tiles = end_index - start_index  # Number of visible tiles
-
-    for i, file in enumerate(ppt_files[start_index:end_index]):
-        actual_index = start_index + i
-        tile_x = (i % tiles_per_row) * (tile_width + 20) + 10
-        tile_y = (i // tiles_per_row) * (tile_height + 20) + 10  # Space above tiles
-        tile_rect = pygame.Rect(tile_x, tile_y, tile_width, tile_height)
-
-        color = SELECTED_COLOR if actual_index == ppt_selected_index and toolbar_index == 0 else NON_SELECTED_COLOR
-        pygame.draw.rect(screen, color, tile_rect)
-
-        # Draw thumbnail if available
-        thumbnail = thumbnails.get(file)
-        if thumbnail:
-            # Scale the thumbnail to fit within the tile dynamically
-            thumbnail_resized = pygame.transform.scale(thumbnail, (thumbnail_width, thumbnail_height))
-            thumbnail_rect = thumbnail_resized.get_rect(center=(tile_rect.centerx, tile_rect.y + thumbnail_height // 2))
-            screen.blit(thumbnail_resized, thumbnail_rect.topleft)
-
-        display_name = os.path.splitext(file)[0]  # Remove extension for display
-        text_surface = font.render(display_name, True, TEXT_COLOR)
-
-        # Display filename below thumbnail
-        text_y = tile_rect.y + thumbnail_height + 10
-        clipped_text = text_surface.subsurface(0, 0, min(tile_rect.width - 20, text_surface.get_width()), text_surface.get_height())
-        screen.blit(clipped_text, (tile_rect.x + 10, text_y))
-
-# Initialize variables for loading screen
-loading_started = False
-loading_index = 0
+    page_files = menu_files[start_index:start_index + tiles_per_page]
+    selected_slot = ppt_selected_index - start_index if toolbar_index == 0 else None
+    search_state = (search_query, search_picker, len(menu_files), len(ppt_files))
 
-# Main loop
-running = True
-while running:
-    if current_state == STATE_LOADING:
-        if not loading_started:
-            # Initialize loading variables
-            loading_started = True
-            loading_index = 0
-            # Load or initialize the thumbnail cache
-            if os.path.exists(cache_file):
-                with open(cache_file, "r") as f:
-                    thumbnail_cache = json.load(f)
+    drawn = ppt_menu_drawn
+    if full_redraw or drawn is None or drawn[0] != current_page or drawn[3] != page_files:
+        screen.fill(BLACK)
+        draw_toolbar()
+        draw_search_bar()
+        slots = set(range(len(page_files)))
+        mark_dirty()
+    else:
+        slots = {slot for slot, file in enumerate(page_files) if file in stale_tiles}
+        if drawn[1] != selected_slot:
+            slots |= {slot for slot in (drawn[1], selected_slot) if slot is not None}
+        if drawn[2] != toolbar_index:
+            draw_toolbar()
+            mark_dirty(get_toolbar_rect())
+        if drawn[4] != search_state:
+            draw_search_bar()
+            mark_dirty(get_search_bar_rect())
+    stale_tiles.clear()
+
+    # Display tiles on the current page, each one a single cached surface
+    for slot in slots:
+        selected = slot == selected_slot
+        tile = tile_cache.cached(page_files[slot], layout, selected)
+        if tile is None:
+            tile = tile_cache.get(page_files[slot], thumbnails.get(page_files[slot]), layout, selected)
+        screen.blit(tile, layout.tile_rects[slot])
+        mark_dirty(layout.tile_rects[slot])
+    ppt_menu_drawn = (current_page, selected_slot, toolbar_index, page_files, search_state)
+
+def draw_minimized():
+    """Draw the minimized bar; its content never changes, so only on a full redraw."""
+    if not full_redraw:
+        return
+    # Display message in minimized mode
+    screen.fill((50, 50, 50))  # Dark background
+    text_surface = text_cache.render("Press D-pad Up to return to fullscreen", MINIMIZED_FONT_SIZE, WHITE)
+    screen.blit(text_surface, (10, 10))
+
+def toggle_overlay():
+    global show_overlay, overlay_rect
+    show_overlay = not show_overlay
+    if not show_overlay:
+        overlay_rect = None
+        mark_dirty()  # Repaint what the overlay covered
+        if current_state == STATE_SHOW_BG2:
+            show_bg2_screen()  # Drawn once on entry, not by the main loop
+
+def draw_overlay():
+    """Draw the live telemetry numbers in the top-left corner."""
+    global overlay_rect, overlay_drawn_at
+    font = text_cache.font(None, OVERLAY_FONT_SIZE)
+    # Rendered without text_cache: the numbers change on every refresh and would only churn it
+    lines = [font.render(line, True, WHITE) for line in telemetry.overlay_lines(last_drawn_state)]
+    rect = pygame.Rect(0, 0, max(line.get_width() for line in lines) + 20, len(lines) * font.get_linesize() + 20)
+    overlay_rect = rect if overlay_rect is None else overlay_rect.union(rect)  # Never leave stale numbers behind
+    screen.fill(OVERLAY_COLOR, overlay_rect)
+    for i, line in enumerate(lines):
+        screen.blit(line, (10, 10 + i * font.get_linesize()))
+    mark_dirty(overlay_rect)
+    overlay_drawn_at = time.time()
+
+def mark_dirty(rect=None):
+    """Queue a screen region for the next display update; no rect means the whole frame."""
+    global full_redraw
+    if rect is None:
+        full_redraw = True
+    else:
+        dirty_rects.append(pygame.Rect(rect))
+
+def present_frame():
+    """Push the dirty parts of the frame to the display. Returns False if nothing changed."""
+    global full_redraw
+    if full_redraw:
+        pygame.display.flip()
+    elif dirty_rects:
+        pygame.display.update(dirty_rects)
+    else:
+        return False
+    full_redraw = False
+    dirty_rects.clear()
+    return True
+
+def wait_for_events(frame_changed):
+    """Return pending events, sleeping until the next frame is due or, on a static frame, until a deadline.
+
+    The sleep is a pygame.event.wait(), so a press ends it at once instead of
+    waiting out the rest of a fixed frame interval.
+    """
+    if current_state == STATE_LOADING and last_drawn_state == STATE_LOADING:
+        return pygame.event.get()  # Loading work is time-sliced; only look at input between slices
+    if frame_changed or current_state not in STATIC_STATES:
+        timeout = next_frame_due - time.perf_counter()
+    else:
+        timeout = IDLE_WAIT_MAX
+        if current_state in (STATE_MAIN_MENU, STATE_MINIMIZED):
+            # Wake up in time for the inactivity video
+            timeout = min(timeout, max(0.0, last_activity_time + INACTIVITY_TIMEOUT - time.time()))
+    if timeout <= 0:
+        return pygame.event.get()
+    event = pygame.event.wait(max(1, int(timeout * 1000)))  # 0 would mean wait forever
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
+
+def record_state_cpu(state, cpu_seconds, wall_seconds):
+    """Accumulate process CPU and wall time spent in a state, printing a summary periodically."""
+    global state_cpu_reported
+    totals = state_cpu.setdefault(state, [0.0, 0.0])
+    totals[0] += cpu_seconds
+    totals[1] += wall_seconds
+    if time.time() - state_cpu_reported > STATE_CPU_REPORT_INTERVAL:
+        report_state_cpu()
+        report_input_latency()
+        print(text_cache.report())
+        if thumbnails is not None:
+            print(thumbnails.report())
+        state_cpu_reported = time.time()
+
+def report_state_cpu():
+    parts = [
+        f"{state} {cpu / wall * 100:.1f}% of {wall:.0f}s"
+        for state, (cpu, wall) in state_cpu.items() if wall > 0
+    ]
+    print("CPU per state: " + ", ".join(parts))
+
+def report_prefetch():
+    """Usage recorded, and how often the prefetching it drives was right."""
+    snapshot = telemetry.snapshot()
+    launches = [
+        f"{kind} p50 {stats['p50_ms']} ms ({stats['count']})"
+        for kind in ("warm", "cold")
+        for stats in [snapshot["histograms"].get("timing", {}).get(f"slideshow_launch_{kind}")] if stats
+    ]
+    counters = snapshot["counters"]
+    print(usage.report())
+    print(f"{deck_prewarmer.report()}; slideshow launch {', '.join(launches) if launches else 'not timed'}")
+    print(
+        f"Video frame stores: {', '.join(cached_videos) or 'none'}; {counters.get('video_frame_store_hits', 0)} of "
+        f"{counters.get('video_frame_store_hits', 0) + counters.get('video_frame_store_misses', 0)} plays served from one"
+    )
+
+def report_input_latency():
+    latency = telemetry.snapshot()["histograms"].get("input_latency", {})
+    parts = [f"{state} p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms ({stats['count']})" for state, stats in latency.items()]
+    print("Input to display per state: " + ("; ".join(parts) if parts else "no input"))
+
+# Per-state handlers. Each frame the main loop reads input first, then updates the current state, then renders it.
+
+def handle_event(event):
+    """Dispatch one event: application-wide events first, then the current state's handler."""
+    global running
+    if event.type == pygame.JOYBUTTONDOWN:
+        held_buttons.add(event.button)
+        if event.button in OVERLAY_COMBO and OVERLAY_COMBO <= held_buttons:
+            toggle_overlay()
+    elif event.type == pygame.JOYBUTTONUP:
+        held_buttons.discard(event.button)
+
+    if event.type == pygame.QUIT:
+        running = False
+    elif event.type == THUMBNAIL_READY:
+        handle_thumbnail_ready(event)
+    elif event.type == SLIDESHOW_ENDED:
+        handle_slideshow_ended(event)
+    elif event.type == DECKS_CHANGED:
+        handle_decks_changed(event)
+    elif event.type == pygame.WINDOWFOCUSLOST and slideshow_launched_at is not None:
+        report_slideshow_launch()
+    elif current_state in STATE_EVENT_HANDLERS:
+        STATE_EVENT_HANDLERS[current_state](event)
+
+def open_ppt_menu():
+    global ppt_selected_index, toolbar_index, current_state
+    # Reset variables for PPT menu
+    ppt_selected_index = current_page * tiles_per_page
+    toolbar_index = 0
+    current_state = STATE_PPT_MENU
+    record_page_visit()
+
+def open_minimized():
+    global current_state
+    set_minimized_mode()
+    play_bgm()
+    current_state = STATE_MINIMIZED
+
+def leave_minimized():
+    global current_state
+    stop_bgm()
+    set_fullscreen_mode()
+    current_state = STATE_MAIN_MENU
+
+def handle_main_menu_event(event):
+    global running, selected_button
+    if event.type == pygame.KEYDOWN:
+        if event.key == pygame.K_ESCAPE:
+            running = False
+        elif event.key == pygame.K_RIGHT:
+            selected_button = min(4, selected_button + 1)
+        elif event.key == pygame.K_LEFT:
+            selected_button = max(1, selected_button - 1)
+        elif event.key == pygame.K_RETURN:
+            # Simulate pressing the A button
+            event = pygame.event.Event(pygame.JOYBUTTONDOWN, {'button': 0})
+            pygame.event.post(event)
+    elif event.type == pygame.JOYHATMOTION:
+        if event.value == (-1, 0):  # Left on D-pad
+            selected_button = max(1, selected_button - 1)
+        elif event.value == (1, 0):  # Right on D-pad
+            selected_button = min(4, selected_button + 1)
+    elif event.type == pygame.JOYBUTTONDOWN:
+        if event.button == 0:  # A button (select)
+            if selected_button == 1:
+                open_minimized()
+            elif selected_button == 2:
+                play_vid2_with_message()
+            elif selected_button == 3:
+                show_bg2_screen()
+            elif selected_button == 4:
+                open_ppt_menu()
+            reset_inactivity_timer()
+    elif event.type == pygame.MOUSEBUTTONDOWN:
+        if btn1_rect.collidepoint(event.pos):
+            selected_button = 1
+            open_minimized()
+        elif btn2_rect.collidepoint(event.pos):
+            selected_button = 2
+            play_vid2_with_message()
+        elif btn3_rect.collidepoint(event.pos):
+            selected_button = 3
+            show_bg2_screen()
+        elif btn4_rect.collidepoint(event.pos):
+            selected_button = 4
+            open_ppt_menu()
+        reset_inactivity_timer()
+    elif event.type in (pygame.KEYDOWN, pygame.JOYBUTTONDOWN, pygame.MOUSEBUTTONDOWN):
+        reset_inactivity_timer()
+
+def handle_minimized_event(event):
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN, pygame.JOYBUTTONDOWN, pygame.JOYHATMOTION, pygame.JOYAXISMOTION):
+        reset_inactivity_timer()
+        # Check for events that return to fullscreen
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            leave_minimized()
+        elif event.type == pygame.JOYHATMOTION and event.value == (0, 1):  # Up on D-pad
+            leave_minimized()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            leave_minimized()
+
+def handle_bg2_event(event):
+    global current_state
+    # Handle events to return from bg2 screen
+    if (event.type == pygame.JOYBUTTONDOWN and event.button == 0
+            or event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
+            or event.type == pygame.MOUSEBUTTONDOWN):
+        current_state = STATE_MAIN_MENU
+        reset_inactivity_timer()
+
+def handle_ppt_menu_event(event):
+    global current_state, search_picker
+    if in_slideshow:
+        # Do not handle controller inputs here; slideshow_input forwards them to PowerPoint.
+        # The watcher posts SLIDESHOW_ENDED when PowerPoint exits.
+        return
+    if event.type == pygame.KEYDOWN:
+        if event.key == pygame.K_ESCAPE:
+            if search_query or search_picker is not None:
+                search_picker = None
+                set_search_query("")  # First Esc clears the search
             else:
-                thumbnail_cache = {}
-            # Initialize ppt_files as a list of PowerPoint files in the directory
-            ppt_files = [
-                f for f in os.listdir(ppt_directory)
-                if f.endswith(".ppt") or f.endswith(".pptx")
-            ]
-            # Initialize thumbnails dict
-            thumbnails = {}
-            total_files = len(ppt_files)
-            # Initialize PowerPoint application
-            ppt_app = win32com.client.Dispatch("PowerPoint.Application")
-            ppt_app.Visible = 1
-            # Clear the screen
-            screen.fill(BLACK)
-            # Display initial loading message
-            loading_text = loading_font.render("Loading DEMO UI... 0%", True, WHITE)
-            text_rect = loading_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-            screen.blit(loading_text, text_rect)
-            pygame.display.flip()
-        else:
-            # Handle events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-            # Process one thumbnail per iteration
-            if loading_index < len(ppt_files):
-                filename = ppt_files[loading_index]
-                pptx_path = os.path.join(ppt_directory, filename)
-                file_md5 = calculate_md5(pptx_path)
-                thumbnail_filename = f"{os.path.splitext(filename)[0]}_thumbnail_{file_md5}.jpg"
-                output_image = os.path.join(ppt_directory, thumbnail_filename)
-                # Check if a cached thumbnail with the correct MD5 already exists
-                if thumbnail_cache.get(filename) == file_md5 and os.path.exists(output_image):
-                    thumbnail_image = pygame.image.load(output_image)
-                    thumbnails[filename] = thumbnail_image
-                else:
-                    try:
-                        # Open the PowerPoint file and export the first slide as a thumbnail
-                        presentation = ppt_app.Presentations.Open(pptx_path, WithWindow=False)
-                        slide = presentation.Slides[1]
-                        slide.Export(output_image, "JPG", 640, 360)
-                        presentation.Close()
-                        # Load the new thumbnail into pygame
-                        thumbnail_image = pygame.image.load(output_image)
-                        thumbnails[filename] = thumbnail_image
-                        # Update cache with the new MD5
-                        thumbnail_cache[filename] = file_md5
-                    except Exception as e:
-                        print(f"Failed to create thumbnail for {filename}: {e}")
-                # Update loading_index
-                loading_index += 1
-                # Update the display to show progress
-                progress = int((loading_index / total_files) * 100)
-                screen.fill(BLACK)
-                loading_message = f"Loading DEMO UI... {progress}%"
-                loading_text = loading_font.render(loading_message, True, WHITE)
-                text_rect = loading_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-                screen.blit(loading_text, text_rect)
-                pygame.display.flip()
+                current_state = STATE_MAIN_MENU
+        elif event.key == pygame.K_BACKSPACE:
+            if search_query:
+                set_search_query(search_query[:-1])
+        elif event.key == pygame.K_RIGHT:
+            move_selection_right()
+        elif event.key == pygame.K_LEFT:
+            move_selection_left()
+        elif event.key == pygame.K_DOWN:
+            move_selection_down()
+        elif event.key == pygame.K_UP:
+            move_selection_up()
+        elif event.key == pygame.K_RETURN:
+            select_current_item()
+    elif event.type == pygame.TEXTINPUT:
+        # Typed text (IME input included) narrows the grid as it arrives
+        set_search_query(search_query + event.text)
+    elif event.type == pygame.JOYHATMOTION and search_picker is not None and event.value[0]:
+        # Left/right on the D-pad move through the letter picker
+        search_picker = (search_picker + event.value[0]) % len(SEARCH_LETTERS)
+    elif event.type == pygame.JOYHATMOTION:
+        if event.value == (-1, 0):  # Left
+            move_selection_left()
+        elif event.value == (1, 0):  # Right
+            move_selection_right()
+        elif event.value == (0, -1):  # Down
+            move_selection_down()
+        elif event.value == (0, 1):  # Up
+            move_selection_up()
+    elif event.type == pygame.JOYBUTTONDOWN:
+        if event.button == 0:  # A button
+            if search_picker is not None:
+                set_search_query(search_query + SEARCH_LETTERS[search_picker])
+            else:
+                select_current_item()
+        elif event.button == 1:  # B button
+            if search_picker is not None:
+                search_picker = None  # Close the picker, keep the filter
+            elif search_query:
+                set_search_query("")
             else:
-                # All thumbnails processed
-                ppt_app.Quit()
-                # Save the updated cache
-                with open(cache_file, "w") as f:
-                    json.dump(thumbnail_cache, f)
-                # Initialize variables for PPT menu
-                ppt_selected_index = 0
-                current_page = 0
-                in_slideshow = False
-                toolbar_index = 0
                 current_state = STATE_MAIN_MENU
-    elif current_state == STATE_MAIN_MENU:
-        screen.blit(bg_image, (0, 0))
-        # Draw buttons with a green border around the selected button
-        buttons = [btn1_rect, btn2_rect, btn3_rect, btn4_rect]
-        for idx, btn_rect in enumerate(buttons, 1):
-            if selected_button == idx:
-                pygame.draw.rect(screen, (0, 255, 0), btn_rect.inflate(10, 10), 3)
-            screen.blit([btn1_image, btn2_image, btn3_image, btn4_image][idx - 1], btn_rect.topleft)
-    elif current_state == STATE_MINIMIZED:
-        # Display message in minimized mode
-        screen.fill((50, 50, 50))  # Dark background
-        font = pygame.font.SysFont(None, 40)
-        text_surface = font.render("Press D-pad Up to return to fullscreen", True, (255, 255, 255))
-        screen.blit(text_surface, (10, 10))
-    elif current_state == STATE_SHOW_BG2:
-        # Already drawn in show_bg2_screen()
-        pass
-    elif current_state == STATE_PPT_MENU:
-        draw_ppt_menu()
-        if in_slideshow and not is_ppt_running():
-            in_slideshow = False  # Exit slideshow mode if PowerPoint closes
-            bring_window_to_front()
-
-    # Check inactivity (do not check inactivity while in PPT menu)
-    if current_state in (STATE_MAIN_MENU, STATE_MINIMIZED) and time.time() - last_activity_time > INACTIVITY_TIMEOUT:
+        elif event.button == 2:  # X button
+            if search_query:
+                set_search_query(search_query[:-1])
+        elif event.button == 3:  # Y button
+            search_picker = 0 if search_picker is None else None
+    elif event.type == pygame.MOUSEBUTTONDOWN:
+        # Optional: Add mouse interaction with toolbar buttons
+        mouse_pos = event.pos
+        toolbar_buttons = draw_toolbar()
+        for idx, button_rect in enumerate(toolbar_buttons, 1):
+            if button_rect.collidepoint(mouse_pos):
+                if idx == 1:
+                    prev_page()
+                elif idx == 2:
+                    current_state = STATE_MAIN_MENU
+                elif idx == 3:
+                    next_page()
+                break
+
+def loading_steps():
+    """Everything the menus need, in steps; update_loading() runs as many per frame as LOADING_SLICE_SECONDS allows."""
+    global tile_cache, thumbnail_store, thumbnail_atlas, deck_watcher, ppt_files, menu_files, deck_index, deck_index_folder
+    global thumbnails, deck_hasher, video_digests, audio_cache, video_frame_cache, slide_renderer, thumbnail_pool
+    global slideshow_input, cache_service, usage, deck_prewarmer, cached_videos
+    from thumbnail_store import ThumbnailStore
+    from deck_hasher import DeckHasher
+    from slide_renderer import create_renderer  # PowerPoint COM, LibreOffice or python-pptx thumbnails
+    from audio_cache import AudioCache
+    from video_cache import VideoFrameCache
+    from slideshow_input import SlideshowInputBridge
+    from deck_search import DeckIndex
+    from usage_stats import UsageStats, PageCacheWarmer
+    startup_phase("deferred imports")
+    yield
+    pygame.mixer.init()  # Initialize pygame mixer for audio
+    startup_phase("mixer init")
+    yield
+    load_menu_assets()
+    text_cache.font(MENU_FONT, MENU_FONT_SIZE)
+    tile_cache = TileCache(text_cache, MENU_FONT, MENU_FONT_SIZE, {
+        "selected": SELECTED_COLOR,
+        "normal": NON_SELECTED_COLOR,
+        "placeholder": PLACEHOLDER_COLOR,
+        "text": TEXT_COLOR,
+    }, max_tiles=tiles_per_page * 4)
+    startup_phase("menu assets")
+    yield
+    if CACHE_SERVICE != "off":
+        from cache_service import connect
+        cache_service = connect(None if CACHE_SERVICE == "on" else CACHE_SERVICE)
+        if cache_service is None:
+            print("Cache service not reachable; hashing and rendering decks in this process")
+        startup_phase("cache service")
+        yield
+    if cache_service is None:
+        # Open the thumbnail store (entries are committed one by one as workers finish)
+        thumbnail_store = ThumbnailStore(cache_dir("thumbnails"))
+    # The atlas file is written by one process only: each instance keeps its own under its INSTANCE_NAME,
+    # and screens sharing a cache service read the JPEGs instead
+    if USE_THUMBNAIL_ATLAS and cache_service is None:
+        from thumbnail_atlas import ThumbnailAtlas
+        thumbnail_atlas = ThumbnailAtlas(
+            os.path.join(cache_dir("thumbnail_atlas"), INSTANCE_NAME), get_grid_layout().thumbnail_size
+        )
+    # Initialize ppt_files as a list of PowerPoint files in the directory; later changes arrive as DECKS_CHANGED
+    deck_watcher = DeckWatcher(ppt_directory)
+    ppt_files = deck_watcher.snapshot()
+    menu_files = ppt_files
+    # Slide text is indexed by the thumbnail workers as they go, kept next to the thumbnail cache
+    deck_index = DeckIndex(os.path.join(cache_dir("thumbnails"), "search.sqlite"))
+    deck_index_folder = os.path.abspath(ppt_directory) if cache_service else ""
+    searched_digests.update(deck_index.digests(deck_index_folder))
+    # Tiles show a placeholder until their thumbnail arrives as a THUMBNAIL_READY event
+    thumbnails = ThumbnailLRU(THUMBNAIL_MEMORY_BYTES)
+    # Only decks whose (inode, size, mtime) changed are re-hashed, in parallel ahead of the thumbnail workers
+    if cache_service:
+        cache_service.prefetch(os.path.join(ppt_directory, f) for f in ppt_files)
+    else:
+        deck_hasher = DeckHasher(os.path.join(cache_root(), "deck_digests.sqlite"))
+        deck_hasher.prefetch(os.path.join(ppt_directory, f) for f in ppt_files)
+        # Re-keyed to the current digests, so the workers find the imported thumbnails (hashed once, then
+        # stat-checked); the decks are read off this thread while the loading screen keeps drawing
+        yield from thumbnail_store.import_legacy(legacy_cache_file, ppt_directory, deck_hasher.digest)
+    usage = UsageStats(os.path.join(cache_root(), "usage.sqlite"))
+    refresh_popularity()
+    deck_prewarmer = PageCacheWarmer(PREWARM_BYTES)
+    prewarm_decks()
+    if resume_target:
+        # Before any thumbnail job is queued, so the resumed page is the one loaded first
+        restore_session(resumed["ui"])
+        preload_resumed_thumbnails(resumed.get("manifest", {}))
+    startup_phase("thumbnail store and deck scan")
+    yield
+    if CACHED_VIDEOS:
+        # Videos visitors keep choosing get a frame store too, so they start and play as cheaply as the attract loop
+        video_popularity = usage.rank("video")
+        cached_videos = CACHED_VIDEOS + [
+            v for v in (vid1_path, vid2_path) if v not in CACHED_VIDEOS and video_popularity.get(v, 0.0) >= HOT_VIDEO_SCORE
+        ]
+    if cache_service:
+        # The service extracts soundtracks and transcodes frames; this process only opens the finished files
+        cache_service.warm_media([vid1_path, vid2_path], cached_videos, screen.get_size(), FPS)
+        if cached_videos:
+            video_frame_cache = VideoFrameCache(cache_dir("video"), screen.get_size(), FPS, cache_service.video_digest)
+    else:
+        # Soundtracks are extracted once per video content and kept as WAV for an instant start
+        video_digests = DeckHasher(os.path.join(cache_root(), "video_digests.sqlite"), workers=1)
+        audio_cache = AudioCache(cache_dir("audio"), video_digests.digest)
+        audio_cache.warm([vid1_path, vid2_path])
+        if cached_videos:
+            # Transcode attract videos once so replaying them skips the H.264 decode (frames still cost an LZ4 read)
+            video_frame_cache = VideoFrameCache(cache_dir("video"), screen.get_size(), FPS, video_digests.digest)
+            video_frame_cache.warm(cached_videos)
+    startup_phase("video and audio caches")
+    yield
+    if cache_service:
+        thumbnail_pool = ThumbnailWorkerPool(generate_thumbnails, workers=THUMBNAIL_WORKERS, batch_size=SERVICE_BATCH_SIZE)
+    else:
+        slide_renderer = create_renderer()
+        thumbnail_pool = ThumbnailWorkerPool(
+            generate_thumbnails,
+            workers=THUMBNAIL_WORKERS,
+            batch_size=slide_renderer.batch_size,
+            thread_init=slide_renderer.thread_init,
+            thread_exit=slide_renderer.thread_exit,
+        )
+    for filename in ppt_files:
+        submit_thumbnail_job(filename)
+    for event in pending_deck_changes:
+        handle_decks_changed(event)
+    pending_deck_changes.clear()
+    slideshow_input = SlideshowInputBridge()
+    telemetry.gauge("text_cache_hit_rate", lambda: text_cache.hit_rate)
+    telemetry.gauge("thumbnail_memory_hit_rate", lambda: thumbnails.hits / max(1, thumbnails.hits + thumbnails.misses))
+    telemetry.gauge("thumbnail_memory_bytes", lambda: thumbnails.bytes)
+    telemetry.gauge("thumbnail_jobs_pending", lambda: thumbnail_pool.pending())
+    telemetry.gauge("deck_hash_stat_hits", lambda: deck_hasher.stat_hits)
+    telemetry.gauge("slideshow_input_worst_ms", lambda: slideshow_input.latency.worst * 1000)
+    telemetry.gauge("deck_prewarm_hit_rate", lambda: deck_prewarmer.hit_rate)
+    startup_phase("renderer and workers")
+    focus_thumbnail_jobs()
+
+def update_loading():
+    """Run loading steps for up to LOADING_SLICE_SECONDS, then hand back to the loop so input is read."""
+    global loading, current_state
+    if last_drawn_state != STATE_LOADING:
+        return  # Put the loading screen up before any heavy work
+    if loading is None:
+        loading = loading_steps()
+    slice_end = time.perf_counter() + LOADING_SLICE_SECONDS
+    while time.perf_counter() < slice_end:
+        try:
+            next(loading)
+        except StopIteration:
+            loading = None
+            if resume_target:
+                enter_resumed_state()
+            else:
+                current_state = STATE_MAIN_MENU
+            return
+
+def session_ui():
+    """What a restarted run needs to put this screen back."""
+    return {
+        "state": current_state,
+        "selected_button": selected_button,
+        "selected_deck": menu_files[ppt_selected_index] if ppt_selected_index < len(menu_files) else None,
+        "toolbar_index": toolbar_index,
+        "search_query": search_query,
+    }
+
+def restore_session(ui):
+    """Put back the navigation of the run being resumed; the selected deck is found by name, as the folder may have changed."""
+    global selected_button, toolbar_index, search_query
+    selected_button = ui.get("selected_button", selected_button)
+    toolbar_index = ui.get("toolbar_index", 0)
+    search_query = ui.get("search_query", "")
+    apply_search_filter(ui.get("selected_deck"))
+
+def preload_resumed_thumbnails(manifest):
+    """Show the resumed page's thumbnails from the atlas straight away; the workers still re-check every deck."""
+    if thumbnail_atlas is None:
+        return
+    for filename in resident_window():
+        digest = manifest.get(filename)
+        surface = thumbnail_atlas.get(filename, digest) if digest else None
+        if surface is not None:
+            thumbnails.put(filename, surface)
+            thumbnails_on_disk[filename] = digest
+
+def enter_resumed_state():
+    global current_state
+    reset_inactivity_timer()
+    if resume_target == STATE_SHOW_BG2:
+        show_bg2_screen()
+    elif resume_target == STATE_MINIMIZED:
+        open_minimized()
+    else:
+        current_state = resume_target
+
+def report_resume():
+    """The resumed screen is up and taking input: report how long the restart took."""
+    global resume_target
+    interactive = time.perf_counter() - startup_started
+    telemetry.timing("restart_to_interactive", interactive)
+    print(
+        f"Resumed {resume_target} (last snapshot {resumed['age']:.1f}s before this start, resume {session.resumes} "
+        f"in a row): interactive {interactive:.2f}s after process start"
+    )
+    resume_target = None
+
+def update_idle_states():
+    """Main menu and minimized bar: play the attract video after INACTIVITY_TIMEOUT without input."""
+    global current_state
+    if time.time() - last_activity_time > INACTIVITY_TIMEOUT:
         if current_state == STATE_MINIMIZED:
             stop_bgm()
             set_fullscreen_mode()
             current_state = STATE_MAIN_MENU
         play_vid1_with_message()
         reset_inactivity_timer()
-    
-    pygame.display.flip()
-    clock.tick(FPS)
 
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
+def draw_loading():
+    """Show the loading message while the deck list is read; thumbnails follow in the background."""
+    if not full_redraw:
+        return
+    screen.fill(BLACK)
+    loading_text = text_cache.render("Resuming..." if resume_target else "Loading DEMO UI...", LOADING_FONT_SIZE, WHITE)
+    text_rect = loading_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
+    screen.blit(loading_text, text_rect)
 
-        elif current_state == STATE_MAIN_MENU:
-            # Handle main menu events
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    running = False
-                elif event.key == pygame.K_RIGHT:
-                    selected_button = min(4, selected_button + 1)
-                elif event.key == pygame.K_LEFT:
-                    selected_button = max(1, selected_button - 1)
-                elif event.key == pygame.K_RETURN:
-                    # Simulate pressing the A button
-                    event = pygame.event.Event(pygame.JOYBUTTONDOWN, {'button': 0})
-                    pygame.event.post(event)
-            elif event.type == pygame.JOYHATMOTION:
-                if event.value == (-1, 0):  # Left on D-pad
-                    selected_button = max(1, selected_button - 1)
-                elif event.value == (1, 0):  # Right on D-pad
-                    selected_button = min(4, selected_button + 1)
-            elif event.type == pygame.JOYBUTTONDOWN:
-                if event.button == 0:  # A button (select)
-                    if selected_button == 1:
-                        set_minimized_mode()
-                        play_bgm()
-                        current_state = STATE_MINIMIZED
-                    elif selected_button == 2:
-                        play_video_with_audio(vid2_path, "Press A Button to return to home")
-                    elif selected_button == 3:
-                        show_bg2_screen()
-                    elif selected_button == 4:
-                        # Reset variables for PPT menu
-                        ppt_selected_index = current_page * tiles_per_page
-                        toolbar_index = 0
-                        current_state = STATE_PPT_MENU
-                    reset_inactivity_timer()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if btn1_rect.collidepoint(event.pos):
-                    selected_button = 1
-                    set_minimized_mode()
-                    play_bgm()
-                    current_state = STATE_MINIMIZED
-                elif btn2_rect.collidepoint(event.pos):
-                    selected_button = 2
-                    play_video_with_audio(vid2_path, "Press A Button to return to home")
-                elif btn3_rect.collidepoint(event.pos):
-                    selected_button = 3
-                    show_bg2_screen()
-                elif btn4_rect.collidepoint(event.pos):
-                    selected_button = 4
-                    # Reset variables for PPT menu
-                    ppt_selected_index = current_page * tiles_per_page
-                    toolbar_index = 0
-                    current_state = STATE_PPT_MENU
-                reset_inactivity_timer()
-            elif event.type in (pygame.KEYDOWN, pygame.JOYBUTTONDOWN, pygame.MOUSEBUTTONDOWN):
-                reset_inactivity_timer()
-
-        elif current_state == STATE_MINIMIZED:
-            # Handle minimized mode events
-            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN, pygame.JOYBUTTONDOWN, pygame.JOYHATMOTION, pygame.JOYAXISMOTION):
-                reset_inactivity_timer()
-                # Check for events that return to fullscreen
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    stop_bgm()
-                    set_fullscreen_mode()
-                    current_state = STATE_MAIN_MENU
-                elif event.type == pygame.JOYHATMOTION and event.value == (0, 1):  # Up on D-pad
-                    stop_bgm()
-                    set_fullscreen_mode()
-                    current_state = STATE_MAIN_MENU
-                elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                    stop_bgm()
-                    set_fullscreen_mode()
-                    current_state = STATE_MAIN_MENU
+STATE_EVENT_HANDLERS = {
+    STATE_MAIN_MENU: handle_main_menu_event,
+    STATE_MINIMIZED: handle_minimized_event,
+    STATE_SHOW_BG2: handle_bg2_event,
+    STATE_PPT_MENU: handle_ppt_menu_event,
+}
+STATE_UPDATERS = {
+    STATE_LOADING: update_loading,
+    STATE_MAIN_MENU: update_idle_states,
+    STATE_MINIMIZED: update_idle_states,
+}
+STATE_RENDERERS = {
+    STATE_LOADING: draw_loading,
+    STATE_MAIN_MENU: draw_main_menu,
+    STATE_MINIMIZED: draw_minimized,
+    STATE_PPT_MENU: draw_ppt_menu,
+    # STATE_SHOW_BG2 is drawn once by show_bg2_screen()
+}
 
-        elif current_state == STATE_SHOW_BG2:
-            # Handle events to return from bg2 screen
-            if event.type == pygame.JOYBUTTONDOWN and event.button == 0:
-                current_state = STATE_MAIN_MENU
-                reset_inactivity_timer()
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                current_state = STATE_MAIN_MENU
-                reset_inactivity_timer()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                current_state = STATE_MAIN_MENU
-                reset_inactivity_timer()
-
-        elif current_state == STATE_PPT_MENU:
-            # Handle PPT menu events
-            if in_slideshow:
-                # Do not handle controller inputs here; the separate script does this
-                # Just check if PowerPoint has exited
-                if not is_ppt_running():
-                    in_slideshow = False
-                    bring_window_to_front()
-            else:
-                # Handle PPT menu navigation
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        current_state = STATE_MAIN_MENU
-                    elif event.key == pygame.K_RIGHT:
-                        move_selection_right()
-                    elif event.key == pygame.K_LEFT:
-                        move_selection_left()
-                    elif event.key == pygame.K_DOWN:
-                        move_selection_down()
-                    elif event.key == pygame.K_UP:
-                        move_selection_up()
-                    elif event.key == pygame.K_RETURN:
-                        select_current_item()
-                elif event.type == pygame.JOYHATMOTION:
-                    if event.value == (-1, 0):  # Left
-                        move_selection_left()
-                    elif event.value == (1, 0):  # Right
-                        move_selection_right()
-                    elif event.value == (0, -1):  # Down
-                        move_selection_down()
-                    elif event.value == (0, 1):  # Up
-                        move_selection_up()
-                elif event.type == pygame.JOYBUTTONDOWN:
-                    if event.button == 0:  # A button
-                        select_current_item()
-                    elif event.button == 1:  # B button
-                        current_state = STATE_MAIN_MENU
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    # Optional: Add mouse interaction with toolbar buttons
-                    mouse_pos = event.pos
-                    toolbar_buttons = draw_toolbar()
-                    for idx, button_rect in enumerate(toolbar_buttons, 1):
-                        if button_rect.collidepoint(mouse_pos):
-                            if idx == 1:
-                                prev_page()
-                            elif idx == 2:
-                                current_state = STATE_MAIN_MENU
-                            elif idx == 3:
-                                next_page()
-                            break
+# Main loop
+running = True
+loading = None  # loading_steps() generator while STATE_LOADING runs
+frame_state = None
+frame_changed = False
+while running:
+    # Charge the previous iteration (input, update, drawing and idle wait) to the state it ran in
+    frame_cpu_end, frame_wall_end = time.process_time(), time.time()
+    if frame_state is not None:
+        record_state_cpu(frame_state, frame_cpu_end - frame_cpu_start, frame_wall_end - frame_wall_start)
+    telemetry.maybe_write()
+    frame_cpu_start, frame_wall_start, frame_state = frame_cpu_end, frame_wall_end, current_state
+
+    # Input first, so a press is handled in the frame that follows it (waits on a static screen)
+    events = wait_for_events(frame_changed)
+    events_read_at = time.perf_counter()
+    next_frame_due = events_read_at + 1.0 / FPS
+    for event in events:
+        if event.type in INPUT_EVENT_TYPES and input_pending_since is None:
+            input_pending_since = events_read_at
+        handle_event(event)
+    if not running:
+        break
+
+    # Update: background results, then the state's own work
+    if thumbnail_pool:
+        thumbnail_pool.pump()
+    if current_state in STATE_UPDATERS:
+        STATE_UPDATERS[current_state]()
+
+    # Render
+    if current_state != last_drawn_state:
+        mark_dirty()  # Entering a state always repaints the whole screen
+        last_drawn_state = current_state
+    if current_state in STATE_RENDERERS:
+        STATE_RENDERERS[current_state]()
+    if show_overlay and current_state not in (STATE_LOADING, STATE_MINIMIZED) and (
+        full_redraw or dirty_rects or time.time() - overlay_drawn_at >= OVERLAY_REFRESH_SECONDS
+    ):
+        draw_overlay()
+    frame_changed = present_frame()
+    if frame_changed:
+        presented_at = time.perf_counter()
+        telemetry.frame(last_drawn_state, presented_at - events_read_at)
+        if input_pending_since is not None:
+            telemetry.input_latency(last_drawn_state, presented_at - input_pending_since)
+    input_pending_since = None  # Input that changed nothing on screen has no visible response to time
+    if startup_timer and frame_changed and last_drawn_state == STATE_LOADING:
+        startup_phase("first frame (loading screen)")
+    if startup_timer and frame_changed and last_drawn_state == STATE_MAIN_MENU:
+        startup_phase("first main menu frame")
+        print(startup_timer.report())
+        startup_timer = None
+    if resume_target and frame_changed and last_drawn_state == resume_target:
+        report_resume()
+    if decoder_pool is None and frame_changed and last_drawn_state == STATE_MAIN_MENU:
+        prepare_videos()
+    if current_state != STATE_LOADING:
+        session.maybe_write(session_ui(), thumbnails_on_disk)
 
+if deck_watcher:
+    deck_watcher.close()
+if thumbnail_pool:
+    thumbnail_pool.close()
+    deck_index.close()
+if cache_service:
+    cache_service.close()
+    print(cache_service.report())
+elif thumbnail_pool:
+    slide_renderer.close()
+    thumbnail_store.close()
+    deck_hasher.close()
+if thumbnail_atlas is not None:
+    thumbnail_atlas.close()
+if decoder_pool:
+    decoder_pool.close()
+if video_frame_cache:
+    video_frame_cache.close()
+if audio_cache:
+    video_digests.close()
+if usage:
+    report_prefetch()
+    usage.close()
+report_state_cpu()
+report_input_latency()
+print(text_cache.report())
+if thumbnails is not None:
+    print(thumbnails.report())
+if asset_pipeline is not None:
+    print(asset_pipeline.report())
+telemetry.write()
+session.clear()  # A clean exit: start normally next time
 pygame.quit()
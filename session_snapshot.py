@@ -0,0 +1,89 @@
+import json
+import os
+import time
+
+RESUME_MAX_AGE = 600.0  # An older snapshot is from an earlier session, not a crash a moment ago
+MAX_RESUMES = 3  # Resumes in a row without a stable run before starting fresh (the saved screen may be what crashes)
+STABLE_SECONDS = 30.0  # Uptime after which a run counts as stable again
+WRITE_INTERVAL = 1.0  # Least time between writes of a changed snapshot
+HEARTBEAT_INTERVAL = 30.0  # Rewrite an unchanged snapshot this often, so its age tells when the process died
+
+
+class SessionSnapshot:
+    """UI state and the cache entries already validated, kept on disk so a restarted process can resume.
+
+    The file is replaced atomically on every write and deleted on a clean
+    exit, so a snapshot found at startup means the last run died. load()
+    counts consecutive resumes and gives up after MAX_RESUMES, in case the
+    saved screen is itself what keeps crashing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.time()
+        self.resumes = 0
+        self.writes = 0
+        self._written_ui = None
+        self._written_manifest_size = None
+        self._written_at = 0.0
+
+    def load(self):
+        """The snapshot left by a run that died, or None to start normally."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            saved_at = data["saved_at"]
+            resumes = data.get("resumes", 0)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        age = self.started - saved_at
+        if age > RESUME_MAX_AGE or age < 0:
+            return None
+        if resumes >= MAX_RESUMES:
+            print(f"Not resuming: {resumes} resumes in a row did not run for {STABLE_SECONDS:.0f}s")
+            return None
+        data["age"] = age
+        self.resumes = resumes + 1
+        try:
+            # Count this resume now, in case it crashes before the first regular write
+            self._write(data.get("ui", {}), data.get("manifest", {}))
+        except OSError as e:
+            print(f"Cannot write session snapshot {self.path}: {e}")
+        return data
+
+    def maybe_write(self, ui, manifest):
+        """Write ui (a dict of plain values) and manifest (deck -> digest) if changed, at most every WRITE_INTERVAL.
+
+        Only the manifest's size is compared, so a deck whose thumbnail
+        changed in place is picked up by the next heartbeat.
+        """
+        now = time.time()
+        if now - self._written_at < WRITE_INTERVAL:
+            return
+        if ui == self._written_ui and len(manifest) == self._written_manifest_size and now - self._written_at < HEARTBEAT_INTERVAL:
+            return
+        if self.resumes and now - self.started > STABLE_SECONDS:
+            self.resumes = 0
+        try:
+            self._write(ui, manifest)
+        except OSError as e:
+            print(f"Cannot write session snapshot {self.path}: {e}")
+            self._written_at = now  # Try again after the interval, not every frame
+
+    def clear(self):
+        """Clean exit: nothing to resume next time."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, ui, manifest):
+        now = time.time()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": now, "resumes": self.resumes, "ui": ui, "manifest": manifest}, f)
+        os.replace(temp_path, self.path)
+        self._written_ui = dict(ui)
+        self._written_manifest_size = len(manifest)
+        self._written_at = now
+        self.writes += 1
@@ -0,0 +1,421 @@
+import importlib.util
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pygame
+
+THUMBNAIL_SIZE = (640, 360)
+# COM errors of a PowerPoint that went away mid-export: RPC_E_DISCONNECTED, RPC_E_SERVER_DIED,
+# RPC_E_SERVER_DIED_DNE, RPC_S_SERVER_UNAVAILABLE, CO_E_OBJNOTCONNECTED
+COM_DISCONNECTED = {-2147417848, -2147418105, -2147418094, -2147023174, -2147221251}
+
+
+class RenderInterrupted(RuntimeError):
+    """The renderer's application went away mid-render; the deck itself is fine and can be queued again."""
+
+
+def _require(module_name):
+    """Fail like an import would if module_name is missing, without paying for the import yet."""
+    if importlib.util.find_spec(module_name) is None:
+        raise ImportError(f"No module named '{module_name}'")
+
+
+class SlideRenderer:
+    """Exports the first slide of presentations as THUMBNAIL_SIZE JPGs.
+
+    render_many() takes a list of (pptx_path, output_image) jobs and returns a
+    dict mapping each output_image to None on success or the exception that
+    stopped it. batch_size tells the thumbnail workers how many jobs to hand
+    over per call.
+    """
+
+    name = "base"
+    batch_size = 1
+
+    def render_many(self, jobs):
+        errors = {}
+        for pptx_path, output_image in jobs:
+            try:
+                self.render(pptx_path, output_image)
+                errors[output_image] = None
+            except Exception as e:
+                errors[output_image] = e
+        return errors
+
+    def render(self, pptx_path, output_image):
+        raise NotImplementedError
+
+    def thread_init(self):
+        """Called once on each worker thread before it renders anything."""
+
+    def thread_exit(self):
+        """Called once on each worker thread when it stops."""
+
+    def close(self):
+        """Release whatever the renderer started (applications, temp files)."""
+
+
+class ComRenderer(SlideRenderer):
+    """Drives PowerPoint through COM. Windows only; exports are serialised on one instance.
+
+    PowerPoint runs as a single instance, so a slideshow started with
+    POWERPNT.EXE /s shares the process these exports attach to. close()
+    therefore quits PowerPoint only if this renderer started it and no
+    presentation is open in it.
+    """
+
+    name = "com"
+
+    def __init__(self):
+        # pywin32 is imported by the first worker thread, not on the UI thread at startup
+        _require("win32com")
+        self._client = None
+        self._pythoncom = None
+        self._lock = threading.Lock()
+        self._attached = False
+        self._started = False  # This renderer launched the PowerPoint it attached to
+
+    def render(self, pptx_path, output_image):
+        with self._lock:
+            if not self._attached:
+                self._started = not self._running()
+                self._attached = True
+            try:
+                # Dispatch attaches to the running PowerPoint instance after the first call
+                ppt_app = self._client.Dispatch("PowerPoint.Application")
+                ppt_app.Visible = 1
+                presentation = ppt_app.Presentations.Open(pptx_path, WithWindow=False)
+                try:
+                    slide = presentation.Slides[1]
+                    slide.Export(output_image, "JPG", *THUMBNAIL_SIZE)
+                finally:
+                    presentation.Close()
+            except self._pythoncom.com_error as e:
+                if e.hresult not in COM_DISCONNECTED:
+                    raise
+                self._attached = False  # Check again whether the next PowerPoint is one this renderer started
+                raise RenderInterrupted(f"PowerPoint went away while exporting {pptx_path}") from e
+
+    def thread_init(self):
+        with self._lock:
+            if self._client is None:
+                import win32com.client
+                import pythoncom
+                self._client = win32com.client
+                self._pythoncom = pythoncom
+        self._pythoncom.CoInitialize()
+
+    def thread_exit(self):
+        self._pythoncom.CoUninitialize()
+
+    def close(self):
+        """Quit PowerPoint if this renderer started it and nothing (e.g. a slideshow) is open in it."""
+        with self._lock:
+            if self._started:
+                # Called on the UI thread, where nothing else initialises COM
+                self._pythoncom.CoInitialize()
+                try:
+                    ppt_app = self._client.Dispatch("PowerPoint.Application")
+                    if ppt_app.Presentations.Count == 0:
+                        ppt_app.Quit()
+                finally:
+                    self._pythoncom.CoUninitialize()
+            self._attached = False
+            self._started = False
+
+    def _running(self):
+        try:
+            self._client.GetActiveObject("PowerPoint.Application")
+        except self._pythoncom.com_error:
+            return False
+        return True
+
+
+class LibreOfficeRenderer(SlideRenderer):
+    """Converts whole batches of decks with a single headless LibreOffice process.
+
+    Each worker thread runs its LibreOffice on a profile of its own: two
+    soffice processes on one -env:UserInstallation hand their work to
+    whichever started first, or fail on the profile lock.
+    """
+
+    name = "libreoffice"
+    batch_size = 16
+
+    def __init__(self, soffice_path=None, timeout=300):
+        self.soffice_path = soffice_path or find_soffice()
+        if not self.soffice_path:
+            raise RuntimeError("LibreOffice (soffice) not found")
+        self.timeout = timeout
+        # Private profiles also avoid clashing with a LibreOffice the user has open
+        self._local = threading.local()
+        self._profiles = set()
+        self._lock = threading.Lock()
+
+    def render(self, pptx_path, output_image):
+        error = self.render_many([(pptx_path, output_image)])[output_image]
+        if error:
+            raise error
+
+    def render_many(self, jobs):
+        """Convert jobs in as few LibreOffice runs as possible.
+
+        Each export is named after its deck's file stem, so decks sharing one
+        (foo.ppt and foo.pptx) go into separate runs.
+        """
+        errors = {}
+        while jobs:
+            batch, rest, stems = [], [], set()
+            for job in jobs:
+                stem = os.path.splitext(os.path.basename(job[0]))[0].lower()
+                (rest if stem in stems else batch).append(job)
+                stems.add(stem)
+            errors.update(self._convert(batch))
+            jobs = rest
+        return errors
+
+    def _convert(self, jobs):
+        errors = {}
+        with tempfile.TemporaryDirectory(prefix="demoui-convert-") as out_dir:
+            command = [
+                self.soffice_path,
+                "-env:UserInstallation=" + _file_uri(self._profile_dir()),
+                "--headless", "--convert-to", "png", "--outdir", out_dir,
+            ] + [pptx_path for pptx_path, _ in jobs]
+            try:
+                subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout, check=False)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                return {output_image: e for _, output_image in jobs}
+            for pptx_path, output_image in jobs:
+                # LibreOffice names each export after the deck and renders only the first slide
+                png_path = os.path.join(out_dir, os.path.splitext(os.path.basename(pptx_path))[0] + ".png")
+                try:
+                    if not os.path.exists(png_path):
+                        raise RuntimeError(f"LibreOffice produced no image for {pptx_path}")
+                    image = pygame.image.load(png_path)
+                    pygame.image.save(scale_image(image, THUMBNAIL_SIZE), output_image)
+                    errors[output_image] = None
+                except Exception as e:
+                    errors[output_image] = e
+        return errors
+
+    def thread_init(self):
+        self._profile_dir()
+
+    def thread_exit(self):
+        profile = getattr(self._local, "profile", None)
+        if profile:
+            with self._lock:
+                self._profiles.discard(profile)
+            shutil.rmtree(profile, ignore_errors=True)
+            self._local.profile = None
+
+    def close(self):
+        with self._lock:
+            profiles, self._profiles = self._profiles, set()
+        for profile in profiles:
+            shutil.rmtree(profile, ignore_errors=True)
+
+    def _profile_dir(self):
+        """This thread's profile, made on first use and again after close() removed it."""
+        profile = getattr(self._local, "profile", None)
+        if not profile or not os.path.isdir(profile):
+            profile = self._local.profile = tempfile.mkdtemp(prefix="demoui-soffice-")
+            with self._lock:
+                self._profiles.add(profile)
+        return profile
+
+
+class PptxRenderer(SlideRenderer):
+    """Pure-Python stand-in that rasterises slide backgrounds, fills, pictures and text from python-pptx data.
+
+    Good enough to tell decks apart and to exercise the thumbnail pipeline on
+    machines without PowerPoint; it does not attempt to match PowerPoint's output.
+    """
+
+    name = "pptx"
+
+    def __init__(self):
+        _require("pptx")  # Imported on first render, on a worker thread
+        if not pygame.font.get_init():
+            pygame.font.init()
+        self._fonts = {}
+        self._font_lock = threading.Lock()
+
+    def render(self, pptx_path, output_image):
+        from pptx import Presentation
+        from pptx.enum.dml import MSO_FILL
+        presentation = Presentation(pptx_path)
+        if not len(presentation.slides):
+            raise RuntimeError(f"{pptx_path} has no slides")
+        slide = presentation.slides[0]
+        scale_x = THUMBNAIL_SIZE[0] / presentation.slide_width
+        scale_y = THUMBNAIL_SIZE[1] / presentation.slide_height
+        surface = pygame.Surface(THUMBNAIL_SIZE)
+        surface.fill(_solid_color(slide.background.fill, MSO_FILL) or (255, 255, 255))
+        for shape in slide.shapes:
+            try:
+                self._draw_shape(surface, shape, scale_x, scale_y, MSO_FILL)
+            except Exception:
+                continue  # Unsupported shape types are simply left out
+        pygame.image.save(surface, output_image)
+
+    def _draw_shape(self, surface, shape, scale_x, scale_y, MSO_FILL):
+        if shape.left is None or shape.width is None:
+            return
+        rect = pygame.Rect(
+            int(shape.left * scale_x), int(shape.top * scale_y),
+            max(1, int(shape.width * scale_x)), max(1, int(shape.height * scale_y)),
+        )
+        if hasattr(shape, "image"):
+            image = pygame.image.load(io.BytesIO(shape.image.blob), "image." + shape.image.ext)
+            surface.blit(scale_image(image, rect.size), rect)
+            return
+        if hasattr(shape, "fill"):
+            color = _solid_color(shape.fill, MSO_FILL)
+            if color:
+                pygame.draw.rect(surface, color, rect)
+        if shape.has_text_frame and shape.text_frame.text.strip():
+            self._draw_text(surface, shape.text_frame, rect, scale_y)
+
+    def _draw_text(self, surface, text_frame, rect, scale_y):
+        y = rect.y
+        for paragraph in text_frame.paragraphs:
+            size_pt = 24  # Placeholder sizes are inherited from the layout; assume body text
+            color = (0, 0, 0)
+            for run in paragraph.runs:
+                if run.font.size:
+                    size_pt = run.font.size.pt
+                try:
+                    if run.font.color and run.font.color.type is not None:
+                        color = tuple(run.font.color.rgb)
+                except AttributeError:
+                    pass  # Theme colours have no RGB value
+                break
+            # Points -> EMU -> thumbnail pixels
+            font = self._font(max(6, int(size_pt * 12700 * scale_y)))
+            text_surface = font.render(paragraph.text, True, color)
+            surface.blit(text_surface, (rect.x, y), pygame.Rect(0, 0, rect.width, rect.bottom - y))
+            y += font.get_linesize()
+            if y >= rect.bottom:
+                break
+
+    def _font(self, size):
+        with self._font_lock:
+            if size not in self._fonts:
+                self._fonts[size] = pygame.font.Font(None, size)
+            return self._fonts[size]
+
+
+def _solid_color(fill, MSO_FILL):
+    """RGB of a solid fill, or None for anything else (gradients, pictures, theme colours)."""
+    try:
+        if fill.type == MSO_FILL.SOLID:
+            return tuple(fill.fore_color.rgb)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return None
+
+
+def scale_image(image, size):
+    """Smooth-scale where the pixel format allows it (8-bit images fall back to plain scaling)."""
+    try:
+        return pygame.transform.smoothscale(image, size)
+    except ValueError:
+        return pygame.transform.scale(image, size)
+
+
+def _file_uri(path):
+    """file:// URI for a local directory, as LibreOffice expects for -env options."""
+    return "file:///" + os.path.abspath(path).replace("\\", "/").lstrip("/")
+
+
+def find_soffice():
+    for name in ("soffice", "libreoffice"):
+        path = shutil.which(name)
+        if path:
+            return path
+    for path in (
+        r"C:\Program Files\LibreOffice\program\soffice.exe",
+        r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+        "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+    ):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+RENDERERS = {
+    ComRenderer.name: ComRenderer,
+    LibreOfficeRenderer.name: LibreOfficeRenderer,
+    PptxRenderer.name: PptxRenderer,
+}
+
+
+def create_renderer(name=None):
+    """Build the named renderer, or the best one available on this machine.
+
+    The default order is PowerPoint COM on Windows, then LibreOffice, then the
+    python-pptx stand-in. DEMOUI_RENDERER overrides the choice.
+    """
+    name = name or os.environ.get("DEMOUI_RENDERER")
+    if name:
+        return RENDERERS[name]()
+    candidates = [ComRenderer] if sys.platform == "win32" else []
+    candidates += [LibreOfficeRenderer, PptxRenderer]
+    for renderer_class in candidates:
+        try:
+            return renderer_class()
+        except Exception as e:
+            print(f"Slide renderer '{renderer_class.name}' unavailable: {e}")
+    raise RuntimeError("No slide renderer available")
+
+
+def benchmark(renderer, deck_paths, out_dir):
+    """Render every deck once in batches and return (decks rendered, seconds, failures)."""
+    jobs = [
+        (path, os.path.join(out_dir, f"{i}_{os.path.splitext(os.path.basename(path))[0]}.jpg"))
+        for i, path in enumerate(deck_paths)
+    ]
+    failures = 0
+    start = time.perf_counter()
+    renderer.thread_init()
+    try:
+        for i in range(0, len(jobs), renderer.batch_size):
+            errors = renderer.render_many(jobs[i:i + renderer.batch_size])
+            failures += sum(1 for error in errors.values() if error)
+    finally:
+        renderer.thread_exit()
+    return len(jobs), time.perf_counter() - start, failures
+
+
+def main(argv=None):
+    """Measure thumbnail throughput: python slide_renderer.py [--backend NAME] DECK_DIR"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Measure slide thumbnail throughput")
+    parser.add_argument("deck_dir")
+    parser.add_argument("--backend", choices=sorted(RENDERERS))
+    args = parser.parse_args(argv)
+    deck_paths = sorted(
+        os.path.join(args.deck_dir, f) for f in os.listdir(args.deck_dir)
+        if f.endswith(".ppt") or f.endswith(".pptx")
+    )
+    pygame.init()
+    renderer = create_renderer(args.backend)
+    try:
+        with tempfile.TemporaryDirectory(prefix="demoui-bench-") as out_dir:
+            count, seconds, failures = benchmark(renderer, deck_paths, out_dir)
+    finally:
+        renderer.close()
+    rate = count / seconds if seconds else 0.0
+    print(f"{renderer.name}: {count} decks in {seconds:.2f}s ({rate:.1f} decks/s), {failures} failed")
+
+
+if __name__ == "__main__":
+    main()
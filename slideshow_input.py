@@ -0,0 +1,139 @@
+import subprocess
+import threading
+import time
+
+import psutil
+
+# Gamepad input (from the inputs package) -> key sent to the slideshow; "exit" closes it
+SLIDESHOW_BINDINGS = {
+    ("Key", "BTN_SOUTH", 1): "pagedown",  # A button
+    ("Key", "BTN_WEST", 1): "pagedown",  # X button: next slide
+    ("Key", "BTN_EAST", 1): "exit",  # B button: end the slideshow
+    ("Absolute", "ABS_HAT0Y", -1): "pageup",  # D-pad up
+    ("Absolute", "ABS_HAT0Y", 1): "pagedown",  # D-pad down
+}
+EXIT_GRACE_SECONDS = 1.0  # Time PowerPoint gets to leave the slideshow after Esc before it is killed
+RECONNECT_SECONDS = 1.0  # Retry interval while no gamepad is plugged in
+
+
+def close_ppt(pid=None):
+    """Kill the given PowerPoint process, or every PowerPoint if pid is None."""
+    if pid is not None:
+        try:
+            psutil.Process(pid).kill()
+        except psutil.NoSuchProcess:
+            pass
+    else:
+        subprocess.call("taskkill /f /im POWERPNT.EXE", shell=True)
+
+
+class InputLatency:
+    """Press-to-keystroke latency of slideshow input, in seconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.worst = max(self.worst, seconds)
+
+    def __str__(self):
+        if not self.count:
+            return "no keystrokes"
+        return f"{self.count} keystrokes, mean {self.total / self.count * 1000:.1f} ms, max {self.worst * 1000:.1f} ms"
+
+
+class SlideshowInputBridge:
+    """Long-lived thread that turns gamepad presses into slideshow keystrokes.
+
+    The thread blocks in inputs.get_gamepad(), so a press is forwarded as soon
+    as the device reports it. Input is only mapped while a slideshow is
+    active (between start_slideshow() and stop_slideshow()); otherwise the
+    pygame menus own the gamepad and events are discarded.
+    """
+
+    def __init__(self):
+        self.latency = InputLatency()
+        self._pyautogui = None  # Imported on the input thread; it is slow to import
+        self._pid = None
+        self._shared = False  # The slideshow runs in a PowerPoint that was already running (e.g. the renderer's)
+        self._active = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="slideshow-input", daemon=True)
+        self._thread.start()
+
+    def start_slideshow(self, pid=None):
+        """Map gamepad input to the slideshow of PowerPoint process pid (any PowerPoint if None)."""
+        self._pid = pid
+        self._shared = False
+        self.latency = InputLatency()
+        self._active.set()
+
+    def follow(self, pid):
+        """The slideshow now runs in PowerPoint process pid (the launcher handed it to a running instance).
+
+        That process is never killed on exit: it was running before the slideshow and may be exporting thumbnails.
+        """
+        self._pid = pid
+        self._shared = True
+
+    def stop_slideshow(self):
+        self._active.clear()
+
+    @property
+    def active(self):
+        return self._active.is_set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._active.clear()
+
+    def _run(self):
+        try:
+            from inputs import get_gamepad, UnpluggedError
+        except ImportError:
+            print("inputs package not installed; gamepad control of slideshows is disabled")
+            return
+        import pyautogui  # For sending keyboard commands to PowerPoint
+        self._pyautogui = pyautogui
+        while not self._stop_event.is_set():
+            try:
+                events = get_gamepad()
+            except UnpluggedError:
+                # Nothing to block on until a gamepad appears
+                self._stop_event.wait(RECONNECT_SECONDS)
+                continue
+            except OSError as e:
+                print(f"Gamepad read failed: {e}")
+                self._stop_event.wait(RECONNECT_SECONDS)
+                continue
+            received = time.time()
+            if not self._active.is_set():
+                continue
+            for event in events:
+                action = SLIDESHOW_BINDINGS.get((event.ev_type, event.code, event.state))
+                if action:
+                    self._perform(action, event, received)
+
+    def _perform(self, action, event, received):
+        if action == "exit":
+            self._pyautogui.press("esc")  # Exit slideshow
+            self._active.clear()
+            if not self._shared:
+                # Kill PowerPoint if it is still there once it has had time to close by itself
+                threading.Timer(EXIT_GRACE_SECONDS, self._close_if_running, args=(self._pid,)).start()
+        else:
+            self._pyautogui.press(action)
+        # Device timestamps are epoch seconds; fall back to when the read returned if one is unusable
+        pressed = getattr(event, "timestamp", 0) or received
+        if not 0 <= received - pressed < 10:
+            pressed = received
+        self.latency.add(time.time() - pressed)
+
+    def _close_if_running(self, pid):
+        if pid is not None and not psutil.pid_exists(pid):
+            return
+        close_ppt(pid)
@@ -0,0 +1,107 @@
+import importlib.util
+import threading
+import time
+
+import pygame
+
+# Posted when every watched slideshow process (and the children it started) has exited, or when a slideshow
+# handed to an already running PowerPoint has ended; carries pids.
+SLIDESHOW_ENDED = pygame.USEREVENT + 2
+
+CHILD_REFRESH_SECONDS = 2.0  # How often the watcher looks for newly started children
+HANDOFF_SECONDS = 1.5  # A launcher gone this soon passed the deck to a PowerPoint that was already running
+POWERPOINT_PROCESS_NAME = "powerpnt.exe"
+SHOW_START_SECONDS = 30.0  # Time a handed-off deck gets to open its slideshow window
+SHOW_POLL_SECONDS = 0.5  # How often a handed-off slideshow is checked through COM
+
+
+class SlideshowWatcher:
+    """Waits on the processes of one slideshow and posts SLIDESHOW_ENDED once they are all gone.
+
+    Only the given PIDs and their descendants are watched, so an unrelated
+    PowerPoint instance never keeps the menu in slideshow mode. The thread
+    blocks in psutil.wait_procs() instead of scanning the process table.
+
+    PowerPoint runs as a single instance: when one is already running (e.g.
+    the COM thumbnail renderer's), POWERPNT.EXE /s hands the deck to it and
+    exits at once. If every watched process is gone within HANDOFF_SECONDS,
+    the running PowerPoint is looked up once and on_handoff(pid) is called
+    with it from the watcher thread. That instance outlives the slideshow,
+    so its SlideShowWindows are polled through COM instead and the event is
+    posted once the show's window has closed (or never opened within
+    SHOW_START_SECONDS). Without pywin32 the instance's exit is waited for.
+    """
+
+    def __init__(self, pids, on_handoff=None):
+        import psutil  # Only needed once a slideshow starts
+        self._psutil = psutil
+        self.pids = list(pids)
+        self.on_handoff = on_handoff
+        self._processes = {}
+        for pid in self.pids:
+            try:
+                self._processes[pid] = psutil.Process(pid)
+            except psutil.NoSuchProcess:
+                pass  # Already gone; the thread posts the event straight away
+        self._thread = threading.Thread(target=self._run, name="slideshow-watcher", daemon=True)
+        self._thread.start()
+
+    def _add_children(self, processes):
+        for process in processes:
+            try:
+                for child in process.children(recursive=True):
+                    self._processes.setdefault(child.pid, child)
+            except self._psutil.Error:
+                pass  # Exited in the meantime
+
+    def _running_instance(self):
+        for process in self._psutil.process_iter(["name"]):
+            if (process.info["name"] or "").lower() == POWERPOINT_PROCESS_NAME and process.pid not in self.pids:
+                return process
+        return None
+
+    def _run(self):
+        self._add_children(list(self._processes.values()))
+        gone, _ = self._psutil.wait_procs(list(self._processes.values()), timeout=HANDOFF_SECONDS)
+        for process in gone:
+            self._processes.pop(process.pid, None)
+        if not self._processes:
+            instance = self._running_instance()
+            if instance is not None:
+                self.pids.append(instance.pid)
+                if self.on_handoff:
+                    self.on_handoff(instance.pid)
+                if importlib.util.find_spec("win32com") is not None:
+                    self._wait_for_show_end(instance)
+                else:
+                    self._processes[instance.pid] = instance
+        while self._processes:
+            self._add_children(list(self._processes.values()))
+            gone, _ = self._psutil.wait_procs(list(self._processes.values()), timeout=CHILD_REFRESH_SECONDS)
+            for process in gone:
+                self._processes.pop(process.pid, None)
+        pygame.event.post(pygame.event.Event(SLIDESHOW_ENDED, pids=self.pids))
+
+    def _wait_for_show_end(self, instance):
+        import pythoncom
+        import win32com.client
+        pythoncom.CoInitialize()
+        try:
+            shown = False
+            start_deadline = time.monotonic() + SHOW_START_SECONDS
+            while instance.is_running():
+                try:
+                    # GetActiveObject, unlike Dispatch, never starts a PowerPoint that has gone away
+                    count = win32com.client.GetActiveObject("PowerPoint.Application").SlideShowWindows.Count
+                except pythoncom.com_error:
+                    break
+                if count:
+                    shown = True
+                elif shown or time.monotonic() > start_deadline:
+                    break
+                time.sleep(SHOW_POLL_SECONDS)
+        finally:
+            pythoncom.CoUninitialize()
+
+    def is_alive(self):
+        return self._thread.is_alive()
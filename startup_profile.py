@@ -0,0 +1,26 @@
+import time
+
+
+class StartupTimer:
+    """Wall-clock duration of each startup phase, for --profile-startup.
+
+    mark(name) closes the phase that ran since the previous mark (or since
+    started, a time.perf_counter() value taken as early as possible).
+    """
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self.phases = []  # (name, seconds, seconds since start)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last, now - self.started))
+        self._last = now
+
+    def report(self):
+        width = max((len(name) for name, _, _ in self.phases), default=0)
+        lines = ["Startup profile (ms):"]
+        for name, seconds, elapsed in self.phases:
+            lines.append(f"  {name:<{width}}  {seconds * 1000:8.1f}  (at {elapsed * 1000:8.1f})")
+        return "\n".join(lines)
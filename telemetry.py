@@ -0,0 +1,195 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKET_BOUNDS_MS = (1, 2, 4, 8, 12, 16, 25, 33, 50, 75, 100, 150, 250, 500, 1000, 2500)
+WRITE_INTERVAL = 60.0  # Seconds between snapshots
+JSONL_MAX_BYTES = 5 * 1024 * 1024  # Rotate the JSONL file past this size
+JSONL_BACKUPS = 3
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations, cheap enough to update every frame."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile, capped at the largest value seen."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return round(min(BUCKET_BOUNDS_MS[index], self.max_ms) if index < len(BUCKET_BOUNDS_MS) else self.max_ms, 2)
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "p50_ms": self.quantile(0.5),
+            "p90_ms": self.quantile(0.9),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class Telemetry:
+    """Frame times, input latency, counters and gauges, written out every WRITE_INTERVAL seconds.
+
+    format is "jsonl" (one snapshot per line, rotated past JSONL_MAX_BYTES)
+    or "prometheus" (a textfile for node_exporter's textfile collector,
+    replaced atomically). With no path nothing is written, but the numbers
+    are still kept for the overlay. Histograms and counters are cumulative
+    since start; gauges are callables read at write time. Worker threads
+    may record timings too.
+    """
+
+    def __init__(self, path, format="jsonl", interval=WRITE_INTERVAL):
+        if format not in ("jsonl", "prometheus"):
+            raise ValueError(f"Unknown telemetry format {format!r}")
+        self.path = path
+        self.format = format
+        self.interval = interval
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms = {}  # (metric, label) -> Histogram
+        self._counters = {}  # name -> number
+        self._gauges = {}  # name -> callable returning a number or None
+        self._last_write = time.monotonic()
+
+    def frame(self, state, seconds):
+        """Main-thread time spent producing one displayed frame in state."""
+        self._add("frame", state, seconds)
+
+    def input_latency(self, state, seconds):
+        """Time from an input event being read to the first frame that showed its effect."""
+        self._add("input_latency", state, seconds)
+
+    def timing(self, name, seconds):
+        self._add("timing", name, seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def gauge(self, name, read):
+        self._gauges[name] = read
+
+    def histogram(self, metric, label):
+        return self._histograms.get((metric, label))
+
+    def maybe_write(self):
+        if time.monotonic() - self._last_write >= self.interval:
+            self.write()
+
+    def write(self):
+        self._last_write = time.monotonic()
+        if self.path is None:
+            return
+        try:
+            if self.format == "jsonl":
+                self._write_jsonl()
+            else:
+                self._write_prometheus()
+        except OSError as e:
+            print(f"Cannot write telemetry to {self.path}: {e}")
+
+    def snapshot(self):
+        with self._lock:
+            histograms = {}
+            for (metric, label), histogram in self._histograms.items():
+                histograms.setdefault(metric, {})[label] = histogram.summary()
+            counters = dict(self._counters)
+        gauges = {}
+        for name, read in self._gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception:
+                gauges[name] = None  # The object behind it is not there (yet)
+        return {"time": round(time.time(), 3), "uptime": round(time.time() - self.started, 1),
+                "histograms": histograms, "counters": counters, "gauges": gauges}
+
+    def _add(self, metric, label, seconds):
+        with self._lock:
+            histogram = self._histograms.get((metric, label))
+            if histogram is None:
+                histogram = self._histograms[(metric, label)] = Histogram()
+            histogram.add(seconds * 1000)
+
+    def _write_jsonl(self):
+        line = json.dumps(self.snapshot()) + "\n"
+        if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > JSONL_MAX_BYTES:
+            for n in range(JSONL_BACKUPS - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{n}"):
+                    os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def _write_prometheus(self):
+        snapshot = self.snapshot()
+        lines = [f"demoui_uptime_seconds {snapshot['uptime']}"]
+        with self._lock:
+            by_metric = {}
+            for (metric, label), histogram in self._histograms.items():
+                by_metric.setdefault(metric, []).append((label, list(histogram.buckets), histogram.count, histogram.total_ms))
+        label_names = {"frame": "state", "input_latency": "state", "timing": "name"}
+        for metric, series in sorted(by_metric.items()):
+            name = f"demoui_{metric}_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            for label, buckets, count, total_ms in series:
+                label_text = f'{label_names[metric]}="{label}"'
+                cumulative = 0
+                for bound, n in zip(BUCKET_BOUNDS_MS, buckets):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{label_text},le="{bound / 1000:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {count}')
+                lines.append(f"{name}_sum{{{label_text}}} {total_ms / 1000:.6f}")
+                lines.append(f"{name}_count{{{label_text}}} {count}")
+        for counter, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE demoui_{counter}_total counter")
+            lines.append(f"demoui_{counter}_total {value}")
+        for gauge, value in sorted(snapshot["gauges"].items()):
+            if value is not None:
+                lines.append(f"# TYPE demoui_{gauge} gauge")
+                lines.append(f"demoui_{gauge} {value}")
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.path)
+
+    def overlay_lines(self, state):
+        """Short live summary for the on-screen overlay."""
+        snapshot = self.snapshot()
+        frames = snapshot["histograms"].get("frame", {}).get(state)
+        latency = snapshot["histograms"].get("input_latency", {}).get(state)
+        counters = snapshot["counters"]
+        lines = [f"state {state}, up {snapshot['uptime']:.0f}s"]
+        if frames:
+            lines.append(f"frame p50 {frames['p50_ms']} p99 {frames['p99_ms']} max {frames['max_ms']} ms ({frames['count']})")
+        if latency:
+            lines.append(f"input p50 {latency['p50_ms']} p99 {latency['p99_ms']} max {latency['max_ms']} ms ({latency['count']})")
+        lines.append(
+            f"video {counters.get('video_frames_shown', 0)} shown, {counters.get('video_frames_dropped', 0)} dropped, "
+            f"{counters.get('video_frames_decoded', 0)} decoded"
+        )
+        for name, value in sorted(snapshot["gauges"].items()):
+            if value is not None:
+                lines.append(f"{name} {value:.3g}" if isinstance(value, float) else f"{name} {value}")
+        return lines
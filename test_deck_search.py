@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from deck_search import DeckIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = DeckIndex(str(tmp_path / "search.sqlite"))
+    index.update("plain.pptx", "d1", "Quarterly review", "Sales went up")
+    index.update("percent.pptx", "d2", "Growth 100%", "Margin 5_0 points")
+    index.update("quote.pptx", "d3", 'The "best" robot', "Demo day")
+    yield index
+    index.close()
+
+
+FILENAMES = ["plain.pptx", "percent.pptx", "quote.pptx"]
+
+
+def test_like_wildcards_match_literally(index):
+    # Short terms only look at titles, through LIKE
+    assert index.search("%", FILENAMES) == ["percent.pptx"]
+    assert index.search("_", FILENAMES) == []
+    assert index.search("5_0", FILENAMES) == ["percent.pptx"]
+    assert index.search("0%", FILENAMES) == ["percent.pptx"]
+
+
+def test_quotes_in_full_text_terms(index):
+    assert index.search('"best"', FILENAMES) == ["quote.pptx"]
+
+
+def test_every_term_must_match(index):
+    assert index.search("review sales", FILENAMES) == ["plain.pptx"]
+    assert index.search("review demo", FILENAMES) == []
+    assert index.search("  ", FILENAMES) == FILENAMES
+
+
+def test_names_match_without_extension(index):
+    assert index.search("ppt", FILENAMES) == []
+    assert index.search("PERC", FILENAMES) == ["percent.pptx"]
+
+
+def test_folder_keys(tmp_path):
+    index = DeckIndex(str(tmp_path / "search.sqlite"))
+    folder = os.path.join(os.sep, "decks")
+    index.update(os.path.join(folder, "a.pptx"), "d1", "Robot arm", "")
+    index.update("a.pptx", "d2", "Robot leg", "")
+    assert index.search("arm", ["a.pptx"], folder) == ["a.pptx"]
+    assert index.search("arm", ["a.pptx"]) == []
+    assert index.digests(folder) == {"a.pptx": "d1"}
+    assert index.prune([], folder) == 1
+    assert index.digests() == {"a.pptx": "d2"}
+    index.close()
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from deck_watcher import IN_CLOSE_WRITE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO, IN_Q_OVERFLOW, DeckWatcher
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    (tmp_path / "a.pptx").write_bytes(b"a")
+    (tmp_path / "b.ppt").write_bytes(b"bb")
+    (tmp_path / "notes.txt").write_bytes(b"not a deck")
+    watcher = DeckWatcher(str(tmp_path), poll_interval=3600)
+    watcher.close()  # The tests feed scans and events in themselves
+    watcher.posted = []
+    watcher._post = lambda added, removed, renamed, changed: watcher.posted.append((added, removed, renamed, changed))
+    return watcher
+
+
+def test_snapshot_lists_decks_only(watcher):
+    assert watcher.snapshot() == ["a.pptx", "b.ppt"]
+
+
+def test_scan_reports_new_deck_once_settled(watcher):
+    scan = dict(watcher._known, **{"c.pptx": (10, 1)})
+    watcher._apply_scan(dict(scan, **{"c.pptx": (5, 1)}))
+    watcher._apply_scan(scan)  # Still growing
+    assert watcher.posted == [([], [], [], []), ([], [], [], [])]
+    watcher._apply_scan(scan)
+    assert watcher.posted[-1] == (["c.pptx"], [], [], [])
+    assert "c.pptx" in watcher._known
+
+
+def test_scan_reports_rename_removal_and_change(watcher):
+    a, b = watcher._known["a.pptx"], watcher._known["b.ppt"]
+    changed = (b[0] + 1, b[1] + 1)
+    watcher._apply_scan({"renamed.pptx": a, "b.ppt": changed})
+    assert watcher.posted[-1] == ([], [], [("a.pptx", "renamed.pptx")], [])
+    watcher._apply_scan({"renamed.pptx": a, "b.ppt": changed})
+    assert watcher.posted[-1] == ([], [], [], ["b.ppt"])
+    watcher._apply_scan({"b.ppt": changed})
+    assert watcher.posted[-1] == ([], ["renamed.pptx"], [], [])
+    assert watcher.snapshot() == ["b.ppt"]
+
+
+def test_events_report_rename_by_cookie(watcher, tmp_path):
+    os.rename(tmp_path / "a.pptx", tmp_path / "c.pptx")
+    watcher._apply_events([(IN_MOVED_FROM, 7, "a.pptx"), (IN_MOVED_TO, 7, "c.pptx")])
+    assert watcher.posted == [([], [], [("a.pptx", "c.pptx")], [])]
+    assert watcher.snapshot() == ["b.ppt", "c.pptx"]
+
+
+def test_events_recheck_only_named_decks(watcher, tmp_path):
+    (tmp_path / "b.ppt").unlink()
+    (tmp_path / "a.pptx").write_bytes(b"a, edited")
+    (tmp_path / "d.pptx").write_bytes(b"d")
+    (tmp_path / "~$d.pptx").write_bytes(b"lock file")
+    watcher._apply_events([
+        (IN_DELETE, 0, "b.ppt"), (IN_CLOSE_WRITE, 0, "a.pptx"), (IN_CLOSE_WRITE, 0, "d.pptx"),
+        (IN_CLOSE_WRITE, 0, "~$d.pptx"), (IN_CLOSE_WRITE, 0, "notes.txt"),
+    ])
+    assert watcher.posted == [(["d.pptx"], ["b.ppt"], [], ["a.pptx"])]
+
+
+def test_event_overflow_falls_back_to_a_scan(watcher, tmp_path):
+    (tmp_path / "b.ppt").unlink()
+    (tmp_path / "d.pptx").write_bytes(b"d")
+    watcher._apply_events([(IN_Q_OVERFLOW, 0, "")])
+    assert watcher.posted == [(["d.pptx"], ["b.ppt"], [], [])]
@@ -0,0 +1,32 @@
+from telemetry import BUCKET_BOUNDS_MS, Histogram
+
+
+def histogram(*values):
+    h = Histogram()
+    for ms in values:
+        h.add(ms)
+    return h
+
+
+def test_empty_histogram_has_no_quantiles():
+    assert Histogram().quantile(0.5) is None
+    assert Histogram().summary()["mean_ms"] is None
+
+
+def test_quantile_is_the_bucket_upper_bound():
+    h = histogram(*[3.0] * 90, *[20.0] * 9, 40.0)
+    assert h.quantile(0.5) == 4
+    assert h.quantile(0.9) == 4
+    assert h.quantile(0.99) == 25
+    assert h.quantile(1.0) == 40.0
+
+
+def test_quantile_is_capped_at_the_largest_value():
+    assert histogram(0.4, 0.5).quantile(0.99) == 0.5
+    assert histogram(*[9.5] * 10).quantile(0.5) == 9.5
+
+
+def test_open_ended_bucket_reports_the_largest_value():
+    h = histogram(1.0, BUCKET_BOUNDS_MS[-1] + 500, BUCKET_BOUNDS_MS[-1] + 1000)
+    assert h.quantile(0.9) == BUCKET_BOUNDS_MS[-1] + 1000
+    assert h.summary()["max_ms"] == BUCKET_BOUNDS_MS[-1] + 1000
@@ -0,0 +1,39 @@
+import pygame
+import pytest
+
+from text_cache import TextCache
+
+
+@pytest.fixture(autouse=True)
+def fonts():
+    pygame.font.init()
+    yield
+
+
+def test_render_is_cached_per_text_size_and_colour():
+    cache = TextCache()
+    first = cache.render("Hello", 20, (255, 255, 255))
+    assert cache.render("Hello", 20, [255, 255, 255]) is first
+    assert cache.render("Hello", 20, (0, 0, 0)) is not first
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.font(None, 20) is cache.font(None, 20)
+
+
+def test_least_recently_used_surface_is_evicted_past_max_bytes():
+    probe = TextCache().render("AAAA", 20, (255, 255, 255))
+    cache = TextCache(max_bytes=probe.get_pitch() * probe.get_height() * 2)
+    a = cache.render("AAAA", 20, (255, 255, 255))
+    cache.render("BBBB", 20, (255, 255, 255))
+    assert cache.render("AAAA", 20, (255, 255, 255)) is a  # B is now the least recently used
+    cache.render("CCCC", 20, (255, 255, 255))
+    assert cache.bytes <= cache.max_bytes
+    assert cache.render("AAAA", 20, (255, 255, 255)) is a
+    misses = cache.misses
+    cache.render("BBBB", 20, (255, 255, 255))
+    assert cache.misses == misses + 1
+
+
+def test_one_surface_is_kept_even_past_max_bytes():
+    cache = TextCache(max_bytes=1)
+    surface = cache.render("Too big", 20, (255, 255, 255))
+    assert cache.render("Too big", 20, (255, 255, 255)) is surface
@@ -0,0 +1,42 @@
+import pygame
+
+from thumbnail_lru import ThumbnailLRU
+
+SIZE = (10, 10)
+SURFACE_BYTES = pygame.Surface(SIZE).get_pitch() * SIZE[1]
+
+
+def test_least_recently_used_is_evicted_past_max_bytes():
+    lru = ThumbnailLRU(SURFACE_BYTES * 2)
+    lru.put("a", pygame.Surface(SIZE))
+    lru.put("b", pygame.Surface(SIZE))
+    assert lru.get("a") is not None  # b is now the least recently used
+    lru.put("c", pygame.Surface(SIZE))
+    assert "b" not in lru and "a" in lru and "c" in lru
+    assert (lru.bytes, lru.evictions) == (SURFACE_BYTES * 2, 1)
+    assert lru.get("b") is None
+    assert (lru.hits, lru.misses) == (1, 1)
+
+
+def test_put_replaces_and_discard_frees_bytes():
+    lru = ThumbnailLRU(SURFACE_BYTES * 4)
+    lru.put("a", pygame.Surface(SIZE))
+    lru.put("a", pygame.Surface(SIZE))
+    assert (len(lru), lru.bytes) == (1, SURFACE_BYTES)
+    lru.discard("a")
+    lru.discard("missing")
+    assert (len(lru), lru.bytes) == (0, 0)
+
+
+def test_rename_keeps_the_surface():
+    lru = ThumbnailLRU(SURFACE_BYTES * 4)
+    surface = pygame.Surface(SIZE)
+    lru.put("old", surface)
+    lru.rename("old", "new")
+    assert lru.get("new") is surface and "old" not in lru
+
+
+def test_one_thumbnail_is_kept_even_past_max_bytes():
+    lru = ThumbnailLRU(1)
+    lru.put("a", pygame.Surface(SIZE))
+    assert "a" in lru and lru.evictions == 0
@@ -0,0 +1,108 @@
+import json
+import os
+import time
+
+from thumbnail_store import STALE_STAGING_SECONDS, ThumbnailStore, _md5
+
+
+def stage(store, digest, data=b"jpg"):
+    path = store.staging_path(digest)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_commit_then_lookup(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    path = store.commit("a.pptx", "aa11", stage(store, "aa11"))
+    assert path == store.blob_path("aa11")
+    assert store.lookup("a.pptx", "aa11") == path
+    assert store.lookup("a.pptx", "bb22") is None
+    assert not os.path.exists(store.staging_path("aa11"))
+    store.close()
+    reopened = ThumbnailStore(str(tmp_path))
+    assert reopened.lookup("a.pptx", "aa11") == path
+
+
+def test_prune_drops_removed_decks_and_orphans(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    store.commit("a.pptx", "aa11", stage(store, "aa11"))
+    store.commit("b.pptx", "bb22", stage(store, "bb22"))
+    fresh = stage(store, "cc33")
+    stale = stage(store, "dd44")
+    old = time.time() - STALE_STAGING_SECONDS - 60
+    os.utime(stale, (old, old))
+    assert store.prune(["a.pptx"]) == 1
+    assert store.lookup("b.pptx", "bb22") is None
+    assert not os.path.exists(store.blob_path("bb22"))
+    assert os.path.exists(store.blob_path("aa11"))
+    assert os.path.exists(fresh)  # A render in progress keeps its staged file
+    assert not os.path.exists(stale)
+
+
+def test_prune_without_sweep_keeps_files(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    store.commit("a.pptx", "aa11", stage(store, "aa11"))
+    store.prune([], sweep=False)
+    assert store.lookup("a.pptx", "aa11") is None
+    assert os.path.exists(store.blob_path("aa11"))
+
+
+def test_prune_only_looks_in_its_folder(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    one, other = os.path.join("/decks", "one", "a.pptx"), os.path.join("/decks", "other", "a.pptx")
+    store.commit(one, "aa11", stage(store, "aa11"))
+    store.commit(other, "bb22", stage(store, "bb22"))
+    store.commit("a.pptx", "cc33", stage(store, "cc33"))
+    store.prune([], folder=os.path.dirname(one))
+    assert store.lookup(one, "aa11") is None
+    assert store.lookup(other, "bb22") == store.blob_path("bb22")
+    assert store.lookup("a.pptx", "cc33") == store.blob_path("cc33")
+
+
+def test_prune_evicts_least_recently_used_past_max_bytes(tmp_path):
+    store = ThumbnailStore(str(tmp_path), max_bytes=250)
+    for name, digest in (("a.pptx", "aa11"), ("b.pptx", "bb22"), ("c.pptx", "cc33")):
+        store.commit(name, digest, stage(store, digest, b"x" * 100))
+    store.lookup("a.pptx", "aa11")  # b is now the least recently used
+    assert store.prune(["a.pptx", "b.pptx", "c.pptx"]) == 1
+    assert store.lookup("b.pptx", "bb22") is None
+    assert store.lookup("a.pptx", "aa11") and store.lookup("c.pptx", "cc33")
+
+
+def test_rename_carries_thumbnail_over(tmp_path):
+    store = ThumbnailStore(str(tmp_path))
+    store.commit("old.pptx", "aa11", stage(store, "aa11"))
+    store.commit("new.pptx", "bb22", stage(store, "bb22"))
+    store.rename("old.pptx", "new.pptx")
+    assert store.lookup("old.pptx", "aa11") is None
+    assert store.lookup("new.pptx", "aa11") == store.blob_path("aa11")
+    store.close()
+    assert ThumbnailStore(str(tmp_path)).lookup("new.pptx", "aa11") == store.blob_path("aa11")
+
+
+def test_import_legacy(tmp_path):
+    decks = tmp_path / "decks"
+    decks.mkdir()
+    (decks / "a.pptx").write_bytes(b"deck a")
+    (decks / "b.pptx").write_bytes(b"deck b, edited since")
+    a_md5 = _md5(str(decks / "a.pptx"))
+    (decks / f"a_thumbnail_{a_md5}.jpg").write_bytes(b"a thumbnail")
+    (decks / f"b_thumbnail_{'0' * 32}.jpg").write_bytes(b"outdated")
+    (decks / f"c_thumbnail_{'1' * 32}.jpg").write_bytes(b"unreferenced")
+    cache_file = decks / "thumbnail_cache.json"
+    cache_file.write_text(json.dumps({"a.pptx": a_md5, "b.pptx": "0" * 32}))
+    store = ThumbnailStore(str(tmp_path / "store"))
+    steps = store.import_legacy(str(cache_file), str(decks), lambda path: "d1" + os.path.basename(path)[0])
+    imported = None
+    while imported is None:
+        try:
+            next(steps)
+        except StopIteration as e:
+            imported = e.value
+    assert imported == 1
+    assert store.lookup("a.pptx", "d1a") == store.blob_path("d1a")
+    with open(store.blob_path("d1a"), "rb") as f:
+        assert f.read() == b"a thumbnail"
+    assert sorted(os.listdir(decks)) == ["a.pptx", "b.pptx"]
+    assert list(store.import_legacy(str(cache_file), str(decks), None)) == []  # Imported once only
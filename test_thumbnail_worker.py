@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pygame
+import pytest
+
+from thumbnail_worker import THUMBNAIL_READY, ThumbnailWorkerPool
+
+
+class GatedJobs:
+    """job_func that records the order jobs run in and holds the first one until released."""
+
+    def __init__(self):
+        self.ran = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self, batch):
+        self.started.set()
+        self.gate.wait(5)
+        self.ran.extend(filename for filename, _ in batch)
+        return [(filename, args, None) for filename, args in batch]
+
+
+@pytest.fixture
+def jobs(pygame_events):
+    jobs = GatedJobs()
+    pool = ThumbnailWorkerPool(jobs, workers=1, queue_size=1)
+    jobs.pool = pool
+    yield jobs
+    jobs.gate.set()
+    pool.close()
+
+
+def drain(pool, count):
+    """Pump the pool like the main loop until count THUMBNAIL_READY events arrived."""
+    events = []
+    deadline = time.monotonic() + 5
+    while len(events) < count and time.monotonic() < deadline:
+        pool.pump()
+        events += pygame.event.get(THUMBNAIL_READY)
+        time.sleep(0.01)
+    return events
+
+
+def block_worker(jobs):
+    jobs.pool.submit("busy")
+    jobs.pool.pump()
+    assert jobs.started.wait(5)
+
+
+def test_focus_runs_the_shown_page_first(jobs):
+    block_worker(jobs)
+    for name in ("a", "b", "c"):
+        jobs.pool.submit(name)
+    jobs.pool.pump()  # Queues a
+    jobs.pool.focus(["c", "b"])
+    jobs.gate.set()
+    drain(jobs.pool, 4)
+    assert jobs.ran == ["busy", "c", "b", "a"]
+
+
+def test_cancel_drops_pending_job(jobs):
+    block_worker(jobs)
+    jobs.pool.submit("a", 1)
+    jobs.pool.submit("b", 2)
+    assert jobs.pool.pending() == 3
+    jobs.pool.cancel("b")
+    assert jobs.pool.pending() == 2
+    jobs.gate.set()
+    events = drain(jobs.pool, 2)
+    assert jobs.ran == ["busy", "a"]
+    assert [(e.filename, e.result) for e in events] == [("busy", ()), ("a", (1,))]
+    assert jobs.pool.pending() == 0
+
+
+def test_exactly_one_event_reports_the_backlog_drained(jobs):
+    block_worker(jobs)
+    jobs.pool.submit("a")
+    jobs.pool.submit("b")
+    jobs.gate.set()
+    events = drain(jobs.pool, 3)
+    assert [e.pending for e in events] == [2, 1, 0]
+
+
+def test_failed_batch_reports_an_error_per_job(pygame_events):
+    def fail(batch):
+        raise RuntimeError("renderer gone")
+
+    pool = ThumbnailWorkerPool(fail, workers=1, batch_size=2)
+    pool.submit("a")
+    pool.submit("b")
+    events = drain(pool, 2)
+    pool.close()
+    assert sorted(e.filename for e in events) == ["a", "b"]
+    assert all(isinstance(e.error, RuntimeError) and e.result is None for e in events)
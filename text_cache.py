@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """Shared font registry plus an LRU of rendered text surfaces.
+
+    Fonts are opened once per (name, size); name is a font file path, or None
+    for pygame's default font. render() returns a cached surface for each
+    (font, size, text, colour, antialias) and evicts the least recently used
+    ones once their pixel data exceeds max_bytes. The surfaces are shared, so
+    callers must only blit them, never draw on them.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._fonts = {}  # (name, size) -> Font
+        self._surfaces = OrderedDict()  # (name, size, text, color, antialias) -> Surface
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, name, size):
+        key = (name, size)
+        font = self._fonts.get(key)
+        if font is None:
+            font = self._fonts[key] = pygame.font.Font(name, size)
+        return font
+
+    def render(self, text, size, color, name=None, antialias=True):
+        key = (name, size, text, tuple(color), antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.font(name, size).render(text, antialias, color)
+        self._surfaces[key] = surface
+        self.bytes += _surface_bytes(surface)
+        while self.bytes > self.max_bytes and len(self._surfaces) > 1:
+            _, evicted = self._surfaces.popitem(last=False)
+            self.bytes -= _surface_bytes(evicted)
+        return surface
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self):
+        return (
+            f"Text cache: {len(self._surfaces)} surfaces, {self.bytes / 1024:.0f} KB of {self.max_bytes / 1024:.0f} KB, "
+            f"{len(self._fonts)} fonts, hit rate {self.hit_rate * 100:.1f}% ({self.hits} hits, {self.misses} misses)"
+        )
+
+    def clear(self):
+        self._surfaces.clear()
+        self.bytes = 0
+
+
+def _surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
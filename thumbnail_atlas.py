@@ -0,0 +1,224 @@
+import mmap
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+
+import pygame
+
+MAGIC = b"DMUIATL1"
+HEADER = struct.Struct("<8sII")  # magic, width, height
+
+
+class ThumbnailAtlas:
+    """All thumbnails, pre-scaled to one tile size, packed as raw RGB slots in a single file.
+
+    The pixel file is memory-mapped, so loading a thumbnail is a slice of
+    the map instead of opening and decoding a JPEG. A small SQLite index
+    maps each deck to its digest and slot. put() writes a changed deck into a
+    free slot before repointing the index, so a crash never leaves a deck
+    pointing at half-written pixels; slots of replaced or removed decks are
+    reused. One atlas exists per tile size.
+    """
+
+    def __init__(self, directory, size):
+        self.size = tuple(size)
+        self.slot_bytes = self.size[0] * self.size[1] * 3
+        os.makedirs(directory, exist_ok=True)
+        name = f"{self.size[0]}x{self.size[1]}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, name + ".sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS slots (filename TEXT PRIMARY KEY, digest TEXT NOT NULL, slot INTEGER NOT NULL)")
+        self._db.commit()
+        path = os.path.join(directory, name + ".pixels")
+        self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        header = self._file.read(HEADER.size)
+        if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, *self.size):
+            # New or unreadable: start over
+            self._file.seek(0)
+            self._file.truncate()
+            self._file.write(HEADER.pack(MAGIC, *self.size))
+            self._file.flush()
+            with self._db:
+                self._db.execute("DELETE FROM slots")
+        self._file.seek(0, os.SEEK_END)
+        self.slot_count = (self._file.tell() - HEADER.size) // self.slot_bytes
+        self._entries = {
+            filename: (digest, slot)
+            for filename, digest, slot in self._db.execute("SELECT filename, digest, slot FROM slots")
+            if slot < self.slot_count
+        }
+        used = {slot for _, slot in self._entries.values()}
+        self._free = sorted(set(range(self.slot_count)) - used)
+        self._map = None
+        self._remap()
+        self.reads = 0
+        self.writes = 0
+
+    def has(self, filename, digest):
+        with self._lock:
+            entry = self._entries.get(filename)
+            return entry is not None and entry[0] == digest
+
+    def get(self, filename, digest):
+        """Surface for filename at this digest, sliced from the map; None if the atlas does not have it."""
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is None or entry[0] != digest:
+                return None
+            offset = HEADER.size + entry[1] * self.slot_bytes
+            if offset + self.slot_bytes > len(self._map):
+                self._remap()
+            pixels = self._map[offset:offset + self.slot_bytes]
+            self.reads += 1
+        return pygame.image.frombuffer(pixels, self.size, "RGB")
+
+    def put(self, filename, digest, image):
+        """Scale image to the atlas size, store it for filename at digest and return the scaled surface."""
+        if image.get_size() != self.size:
+            image = pygame.transform.smoothscale(image, self.size)
+        pixels = pygame.image.tostring(image, "RGB")
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is not None and entry[0] == digest:
+                return image
+            if self._free:
+                slot = self._free.pop(0)
+            else:
+                slot = self.slot_count
+                self.slot_count += 1
+            self._file.seek(HEADER.size + slot * self.slot_bytes)
+            self._file.write(pixels)
+            self._file.flush()
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO slots (filename, digest, slot) VALUES (?, ?, ?)", (filename, digest, slot)
+                )
+            self._entries[filename] = (digest, slot)
+            if entry is not None:
+                self._free.append(entry[1])
+                self._free.sort()
+            self.writes += 1
+        return image
+
+    def rename(self, old_filename, new_filename):
+        with self._lock:
+            entry = self._entries.pop(old_filename, None)
+            if entry is None:
+                return
+            old_new = self._entries.pop(new_filename, None)
+            if old_new is not None:
+                self._free.append(old_new[1])
+                self._free.sort()
+            self._entries[new_filename] = entry
+            with self._db:
+                self._db.execute("DELETE FROM slots WHERE filename = ?", (new_filename,))
+                self._db.execute("UPDATE slots SET filename = ? WHERE filename = ?", (new_filename, old_filename))
+
+    def prune(self, live_filenames):
+        """Free the slots of decks that are gone."""
+        live_filenames = set(live_filenames)
+        with self._lock:
+            removed = [name for name in self._entries if name not in live_filenames]
+            with self._db:
+                self._db.executemany("DELETE FROM slots WHERE filename = ?", [(name,) for name in removed])
+            for name in removed:
+                self._free.append(self._entries.pop(name)[1])
+            self._free.sort()
+        return len(removed)
+
+    def report(self):
+        return (
+            f"Thumbnail atlas {self.size[0]}x{self.size[1]}: {len(self._entries)} decks in {self.slot_count} slots "
+            f"({self.slot_count * self.slot_bytes / 1048576:.1f} MB), {self.reads} reads, {self.writes} writes"
+        )
+
+    def close(self):
+        with self._lock:
+            self._map.close()
+            self._file.close()
+            self._db.close()
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _drop_from_page_cache(path):
+    """Ask the OS to forget a file's cached pages, so the next read comes from disk (Linux only)."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def benchmark(count, size, thumbnail_size=(640, 360)):
+    """Time loading count thumbnails at size from per-deck JPEGs versus the atlas.
+
+    Returns {path name: {"cold": seconds or None, "warm": seconds}}. Cold runs
+    drop the files from the page cache first where the OS allows it.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="demoui-atlas-bench-") as work_dir:
+        jpeg_paths = []
+        for i in range(count):
+            surface = pygame.Surface(thumbnail_size)
+            surface.fill(((i * 37) % 256, (i * 91) % 256, (i * 53) % 256))
+            pygame.draw.circle(surface, (255, 255, 255), (thumbnail_size[0] // 2, thumbnail_size[1] // 2), 50 + i % 100)
+            path = os.path.join(work_dir, f"deck{i}.jpg")
+            pygame.image.save(surface, path)
+            jpeg_paths.append(path)
+        atlas_dir = os.path.join(work_dir, "atlas")
+        atlas = ThumbnailAtlas(atlas_dir, size)
+        for i, path in enumerate(jpeg_paths):
+            atlas.put(f"deck{i}.pptx", str(i), pygame.image.load(path))
+        atlas.close()
+        pixels_path = os.path.join(atlas_dir, f"{size[0]}x{size[1]}.pixels")
+
+        def load_jpegs():
+            for path in jpeg_paths:
+                pygame.transform.smoothscale(pygame.image.load(path), size)
+
+        def load_atlas():
+            atlas = ThumbnailAtlas(atlas_dir, size)
+            for i in range(count):
+                atlas.get(f"deck{i}.pptx", str(i))
+            atlas.close()
+
+        for name, load, paths in (("jpeg", load_jpegs, jpeg_paths), ("atlas", load_atlas, [pixels_path])):
+            cold = None
+            if all([_drop_from_page_cache(path) for path in paths]):
+                start = time.perf_counter()
+                load()
+                cold = time.perf_counter() - start
+            start = time.perf_counter()
+            load()
+            results[name] = {"cold": cold, "warm": time.perf_counter() - start}
+    return results
+
+
+def main(argv=None):
+    """Compare thumbnail load paths: python thumbnail_atlas.py [--decks N] [--size WxH]"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark per-JPEG thumbnail loading against the atlas")
+    parser.add_argument("--decks", type=int, default=500)
+    parser.add_argument("--size", default="460x258", help="tile thumbnail size (default: 1920-wide grid)")
+    args = parser.parse_args(argv)
+    size = tuple(int(n) for n in args.size.split("x"))
+    pygame.init()
+    for name, timing in benchmark(args.decks, size).items():
+        cold = f"{timing['cold']:.3f}s" if timing["cold"] is not None else "n/a"
+        print(f"{name}: {args.decks} thumbnails cold {cold}, warm {timing['warm']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+
+class ThumbnailLRU:
+    """Decoded thumbnails kept in memory, least recently used first out past max_bytes.
+
+    Only the decks near the page on screen are meant to be loaded into it;
+    everything else stays on disk in the ThumbnailStore. Counters: hits and
+    misses of get(), evictions, and the resident bytes.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._surfaces = OrderedDict()  # filename -> Surface
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, filename):
+        return filename in self._surfaces
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def get(self, filename):
+        surface = self._surfaces.get(filename)
+        if surface is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._surfaces.move_to_end(filename)
+        return surface
+
+    def put(self, filename, surface):
+        self.discard(filename)
+        self._surfaces[filename] = surface
+        self.bytes += _surface_bytes(surface)
+        while self.bytes > self.max_bytes and len(self._surfaces) > 1:
+            _, evicted = self._surfaces.popitem(last=False)
+            self.bytes -= _surface_bytes(evicted)
+            self.evictions += 1
+
+    def discard(self, filename):
+        surface = self._surfaces.pop(filename, None)
+        if surface is not None:
+            self.bytes -= _surface_bytes(surface)
+
+    def rename(self, old_filename, new_filename):
+        surface = self._surfaces.pop(old_filename, None)
+        if surface is not None:
+            self._surfaces[new_filename] = surface
+
+    def report(self):
+        return (
+            f"Thumbnails in memory: {len(self._surfaces)} ({self.bytes / 1048576:.1f} MB of {self.max_bytes / 1048576:.1f} MB), "
+            f"{self.hits} hits, {self.misses} misses, {self.evictions} evicted"
+        )
+
+
+def _surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
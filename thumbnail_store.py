@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+STALE_STAGING_SECONDS = 3600.0  # A staged thumbnail this old was left by a crash, not a render in progress
+LEGACY_READERS = 2  # Threads reading decks for the one-off import of the old thumbnail cache
+LEGACY_POLL_SECONDS = 0.01  # How long import_legacy() waits on a deck before yielding to its caller
+# <deck name>_thumbnail_<md5>.jpg, as written into the deck folder by older versions
+LEGACY_THUMBNAIL_RE = re.compile(r"_thumbnail_[0-9a-f]{32}\.jpg$")
+
+
+class ThumbnailStore:
+    """Thumbnail cache: a SQLite index plus JPG blobs sharded by digest.
+
+    The whole index is read into memory when the store is opened, so lookups
+    are dict hits. Each commit() moves a finished blob into place with
+    os.replace() and writes its index row in the same step, so a crash loses
+    at most the thumbnail that was being written. prune() deletes entries for
+    decks that are gone, orphaned blobs and, past max_bytes, the least
+    recently used thumbnails.
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._blob_dir = os.path.join(root, "blobs")
+        os.makedirs(self._blob_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            "filename TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.commit()
+        # filename -> [digest, size, last_used]
+        self._entries = {
+            filename: [digest, size, last_used]
+            for filename, digest, size, last_used in self._db.execute("SELECT filename, digest, size, last_used FROM thumbnails")
+        }
+        self._touched = set()
+
+    def blob_path(self, digest):
+        return os.path.join(self._blob_dir, digest[:2], digest + ".jpg")
+
+    def staging_path(self, digest):
+        """Where a renderer should write a new thumbnail before commit() moves it into place."""
+        path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Keep the .jpg extension last: renderers pick the image format from it
+        return f"{path[:-len('.jpg')]}.{threading.get_ident()}.tmp.jpg"
+
+    def lookup(self, filename, digest):
+        """Path of the cached thumbnail for filename at this digest, or None."""
+        with self._lock:
+            entry = self._entries.get(filename)
+            if not entry or entry[0] != digest:
+                return None
+            entry[2] = time.time()
+            self._touched.add(filename)
+        path = self.blob_path(digest)
+        return path if os.path.exists(path) else None
+
+    def commit(self, filename, digest, staged_path):
+        """Atomically publish a staged thumbnail and record it in the index."""
+        path = self.blob_path(digest)
+        os.replace(staged_path, path)
+        size = os.path.getsize(path)
+        now = time.time()
+        with self._lock:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO thumbnails (filename, digest, size, last_used) VALUES (?, ?, ?, ?)",
+                    (filename, digest, size, now),
+                )
+            self._entries[filename] = [digest, size, now]
+        return path
+
+    def rename(self, old_filename, new_filename):
+        """Carry the thumbnail of a renamed deck over to its new name (blobs are keyed by content)."""
+        with self._lock:
+            entry = self._entries.pop(old_filename, None)
+            if entry is None:
+                return
+            self._entries[new_filename] = entry
+            self._touched.discard(old_filename)
+            with self._db:
+                self._db.execute("DELETE FROM thumbnails WHERE filename = ?", (new_filename,))
+                self._db.execute("UPDATE thumbnails SET filename = ? WHERE filename = ?", (new_filename, old_filename))
+
+    def prune(self, live_filenames, sweep=True, folder=""):
+        """Drop entries for removed decks, evict down to max_bytes and, with sweep, delete orphaned blobs.
+
+        Entries are keyed by bare filename, or by deck path where decks of
+        several folders share the store (the cache service); only entries in
+        folder ("" for bare filenames) are checked against live_filenames.
+        Eviction takes the least recently used thumbnails of any folder.
+        Staged thumbnails are only swept once STALE_STAGING_SECONDS old, so a
+        render in progress in another thread or process keeps its file.
+        """
+        live_filenames = set(live_filenames)
+        with self._lock:
+            removed = [name for name in self._entries if os.path.dirname(name) == folder and name not in live_filenames]
+            gone = set(removed)
+            by_age = sorted(
+                (entry[2], name) for name, entry in self._entries.items() if name not in gone
+            )
+            total = sum(self._entries[name][1] for _, name in by_age)
+            for _, name in by_age:
+                if total <= self.max_bytes:
+                    break
+                total -= self._entries[name][1]
+                removed.append(name)
+            with self._db:
+                self._db.executemany("DELETE FROM thumbnails WHERE filename = ?", [(name,) for name in removed])
+                self._db.executemany(
+                    "UPDATE thumbnails SET last_used = ? WHERE filename = ?",
+                    [(self._entries[name][2], name) for name in self._touched if name in self._entries],
+                )
+            for name in removed:
+                del self._entries[name]
+            self._touched.clear()
+            referenced = {entry[0] + ".jpg" for entry in self._entries.values()}
+        if not sweep:
+            return len(removed)
+        # Anything on disk that the index no longer points at is an orphan (stale blobs, crashed .tmp files)
+        stale_before = time.time() - STALE_STAGING_SECONDS
+        for shard in os.listdir(self._blob_dir):
+            shard_dir = os.path.join(self._blob_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for blob in os.listdir(shard_dir):
+                if blob not in referenced:
+                    path = os.path.join(shard_dir, blob)
+                    try:
+                        if ".tmp." not in blob or os.path.getmtime(path) < stale_before:
+                            os.remove(path)
+                    except OSError:
+                        pass  # Still being written by a worker; the next prune gets it
+        return len(removed)
+
+    def import_legacy(self, cache_file, thumbnail_dir, digest_func):
+        """Move thumbnails from the old thumbnail_cache.json layout into the store, once.
+
+        The old layout keyed thumbnails by the deck's MD5; each one whose deck
+        still has that MD5 is stored under digest_func(deck path), the digest
+        lookups use now. The rest, and legacy thumbnails that the JSON no
+        longer referenced, are deleted. Decks are read on background threads;
+        this is a generator that yields while it waits on them, so a caller
+        can keep drawing frames, and returns the number imported.
+        """
+        if not os.path.exists(cache_file):
+            return 0
+        with open(cache_file, "r") as f:
+            legacy_cache = json.load(f)
+
+        def current_digest(deck_path, file_md5):
+            return digest_func(deck_path) if _md5(deck_path) == file_md5 else None
+
+        imported = 0
+        with ThreadPoolExecutor(max_workers=LEGACY_READERS, thread_name_prefix="legacy-import") as executor:
+            checks = []
+            for filename, file_md5 in legacy_cache.items():
+                legacy_image = os.path.join(thumbnail_dir, f"{os.path.splitext(filename)[0]}_thumbnail_{file_md5}.jpg")
+                if os.path.exists(legacy_image):
+                    check = executor.submit(current_digest, os.path.join(thumbnail_dir, filename), file_md5)
+                    checks.append((filename, legacy_image, check))
+            for filename, legacy_image, check in checks:
+                while wait([check], timeout=LEGACY_POLL_SECONDS).not_done:
+                    yield
+                try:
+                    file_digest = check.result()
+                except OSError:
+                    continue  # Deck gone or unreadable; its legacy thumbnail is deleted below
+                if file_digest is None:
+                    continue
+                staged_path = self.staging_path(file_digest)
+                shutil.move(legacy_image, staged_path)
+                self.commit(filename, file_digest, staged_path)
+                imported += 1
+        for name in os.listdir(thumbnail_dir):
+            if LEGACY_THUMBNAIL_RE.search(name):
+                os.remove(os.path.join(thumbnail_dir, name))
+        os.remove(cache_file)
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _md5(path):
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
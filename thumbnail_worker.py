@@ -0,0 +1,128 @@
+import queue
+import threading
+
+import pygame
+
+# Posted once per finished job; carries filename, result, error and pending attributes.
+# Exactly one event per drained backlog has pending == 0.
+THUMBNAIL_READY = pygame.USEREVENT + 1
+
+
+class ThumbnailWorkerPool:
+    """Runs thumbnail jobs on background threads and posts results to the pygame event queue.
+
+    Jobs wait in an unbounded backlog and are fed into a small bounded queue by
+    pump(), which the main loop calls once per frame. focus() re-ranks the
+    backlog and pulls queued-but-unstarted jobs back out, so the page that is
+    on screen is always rendered next.
+
+    job_func receives a list of up to batch_size (filename, args) pairs and
+    returns a list of (filename, result, error) triples, one per job.
+    """
+
+    def __init__(self, job_func, workers=2, queue_size=4, batch_size=1, thread_init=None, thread_exit=None):
+        self._job_func = job_func
+        self._batch_size = batch_size
+        self._thread_init = thread_init
+        self._thread_exit = thread_exit
+        self._jobs = queue.Queue(maxsize=max(queue_size, batch_size))
+        self._lock = threading.Lock()
+        self._backlog = {}  # filename -> job args, in submission order
+        self._priority = {}  # filename -> rank, lower runs first
+        self._cancelled = set()
+        self._outstanding = set()  # submitted jobs that have not posted a result
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"thumbnail-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, filename, *args):
+        """Queue a job for filename; args are passed through to job_func."""
+        with self._lock:
+            self._cancelled.discard(filename)
+            self._outstanding.add(filename)
+            self._backlog[filename] = args
+
+    def cancel(self, filename):
+        """Drop a pending job. A job that is already running still posts its result."""
+        with self._lock:
+            self._backlog.pop(filename, None)
+            self._outstanding.discard(filename)
+            self._cancelled.add(filename)
+
+    def focus(self, filenames):
+        """Rank pending work by the order of filenames (on-screen page first)."""
+        with self._lock:
+            self._priority = {name: rank for rank, name in enumerate(filenames)}
+            # Pull back jobs that were queued for a page that is no longer shown
+            while True:
+                try:
+                    item = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    filename, args = item
+                    self._backlog.setdefault(filename, args)
+        self.pump()
+
+    def pump(self):
+        """Move the highest-priority backlog jobs into the bounded worker queue."""
+        with self._lock:
+            default_rank = len(self._priority)
+            while self._backlog and not self._jobs.full():
+                filename = min(self._backlog, key=lambda name: self._priority.get(name, default_rank))
+                self._jobs.put_nowait((filename, self._backlog.pop(filename)))
+
+    def pending(self):
+        """Number of jobs that have not posted a result yet."""
+        with self._lock:
+            return len(self._outstanding)
+
+    def close(self):
+        """Discard pending work and stop the worker threads."""
+        with self._lock:
+            self._backlog.clear()
+            self._outstanding.clear()
+            while True:
+                try:
+                    self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def _worker(self):
+        if self._thread_init:
+            self._thread_init()
+        try:
+            while True:
+                batch = [self._jobs.get()]
+                # Take whatever else is already queued, up to a full batch
+                while len(batch) < self._batch_size and batch[-1] is not None:
+                    try:
+                        batch.append(self._jobs.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is None
+                with self._lock:
+                    batch = [item for item in batch if item is not None and item[0] not in self._cancelled]
+                if batch:
+                    try:
+                        results = self._job_func(batch)
+                    except Exception as e:
+                        results = [(filename, None, e) for filename, _ in batch]
+                    for filename, result, error in results:
+                        with self._lock:
+                            self._outstanding.discard(filename)
+                            pending = len(self._outstanding)
+                        pygame.event.post(pygame.event.Event(
+                            THUMBNAIL_READY, filename=filename, result=result, error=error, pending=pending,
+                        ))
+                if stop:
+                    break
+        finally:
+            if self._thread_exit:
+                self._thread_exit()
@@ -0,0 +1,118 @@
+import os
+from collections import OrderedDict
+
+import pygame
+
+TILE_GAP = 20  # Space between tiles (half of it is used as the outer margin)
+TEXT_HEIGHT = 40  # Space under each thumbnail for the file name
+
+
+class GridLayout:
+    """Tile geometry for the PPT menu, computed once per screen size.
+
+    scale multiplies the gaps and the name strip, to match the font size on
+    screens larger or smaller than the 1080p design.
+    """
+
+    def __init__(self, screen_size, tiles_per_row, rows_per_page, scale=1.0):
+        self.screen_size = screen_size
+        gap = round(TILE_GAP * scale)
+        self.tile_width = screen_size[0] // tiles_per_row - gap
+        self.thumbnail_size = (self.tile_width, self.tile_width * 9 // 16)  # 16:9 thumbnails
+        self.tile_height = self.thumbnail_size[1] + round(TEXT_HEIGHT * scale)
+        # Rect of each slot on a page, left to right then top to bottom
+        self.tile_rects = [
+            pygame.Rect(
+                (slot % tiles_per_row) * (self.tile_width + gap) + gap // 2,
+                (slot // tiles_per_row) * (self.tile_height + gap) + gap // 2,
+                self.tile_width,
+                self.tile_height,
+            )
+            for slot in range(tiles_per_row * rows_per_page)
+        ]
+
+    @property
+    def tile_size(self):
+        return (self.tile_width, self.tile_height)
+
+
+class TileCache:
+    """Fully composed PPT menu tiles, so drawing a tile is a single blit.
+
+    Each deck's thumbnail is scaled to the layout's thumbnail size and
+    convert()ed once; selected and unselected tiles (background, thumbnail
+    or placeholder, clipped name) are composed on first use and kept in an
+    LRU keyed by deck, tile size and variant.
+    """
+
+    def __init__(self, text_cache, font_name, font_size, colors, max_tiles=64):
+        self.text_cache = text_cache  # text_cache.TextCache shared with the rest of the UI
+        self.font_name = font_name
+        self.font_size = font_size
+        self.colors = colors  # dict with selected, normal, placeholder and text colours
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()  # (filename, tile_size, selected, has_thumbnail) -> Surface
+        self._scaled = {}  # filename -> (thumbnail_size, scaled and converted Surface)
+
+    def get(self, filename, thumbnail, layout, selected):
+        key = (filename, layout.tile_size, selected, thumbnail is not None)
+        tile = self._tiles.get(key)
+        if tile is None:
+            tile = self._compose(filename, thumbnail, layout, selected)
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_tiles:
+                evicted_key, _ = self._tiles.popitem(last=False)
+                if not any(key[0] == evicted_key[0] for key in self._tiles):
+                    self._scaled.pop(evicted_key[0], None)
+        else:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def cached(self, filename, layout, selected):
+        """The composed tile with a thumbnail for filename, if one is cached; the thumbnail itself is then not needed."""
+        key = (filename, layout.tile_size, selected, True)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def invalidate(self, filename):
+        """Forget every tile for filename, e.g. when its thumbnail arrives or changes."""
+        for key in [key for key in self._tiles if key[0] == filename]:
+            del self._tiles[key]
+        self._scaled.pop(filename, None)
+
+    def clear(self):
+        self._tiles.clear()
+        self._scaled.clear()
+
+    def _compose(self, filename, thumbnail, layout, selected):
+        tile = pygame.Surface(layout.tile_size).convert()
+        tile.fill(self.colors["selected"] if selected else self.colors["normal"])
+        thumbnail_rect = pygame.Rect((0, 0), layout.thumbnail_size)
+        if thumbnail is not None:
+            tile.blit(self._scaled_thumbnail(filename, thumbnail, layout.thumbnail_size), thumbnail_rect)
+        else:
+            # Placeholder until the background workers deliver the thumbnail
+            pygame.draw.rect(tile, self.colors["placeholder"], thumbnail_rect)
+            placeholder_text = self._render_text("Loading...")
+            tile.blit(placeholder_text, placeholder_text.get_rect(center=thumbnail_rect.center))
+        display_name = os.path.splitext(filename)[0]  # Remove extension for display
+        text_surface = self._render_text(display_name)
+        # File name below the thumbnail, clipped to the tile width
+        clip = pygame.Rect(0, 0, min(layout.tile_width - 20, text_surface.get_width()), text_surface.get_height())
+        tile.blit(text_surface, (10, layout.thumbnail_size[1] + 10), clip)
+        return tile
+
+    def _render_text(self, text):
+        return self.text_cache.render(text, self.font_size, self.colors["text"], self.font_name)
+
+    def _scaled_thumbnail(self, filename, thumbnail, size):
+        cached = self._scaled.get(filename)
+        if cached is None or cached[0] != size:
+            thumbnail = thumbnail.convert()
+            if thumbnail.get_size() != size:  # Atlas thumbnails come pre-scaled
+                thumbnail = pygame.transform.smoothscale(thumbnail, size)
+            cached = (size, thumbnail)
+            self._scaled[filename] = cached
+        return cached[1]
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+import time
+
+HALF_LIFE_DAYS = 14.0  # A use counts half as much after this long, so rankings follow what visitors pick now
+HOUR_WINDOW = 1  # Uses within this many hours of the current time of day count double when ranking
+READ_CHUNK = 1024 * 1024
+
+
+class UsageStats:
+    """Local counts of deck opens, video plays and PPT menu page visits by hour of day, persisted in SQLite.
+
+    Each (kind, item, hour of day) row keeps a use count and a score that
+    halves every HALF_LIFE_DAYS. The table is read into memory when opened,
+    so rank() is dict work; record() writes its row through at once.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            "kind TEXT NOT NULL, item TEXT NOT NULL, hour INTEGER NOT NULL, uses INTEGER NOT NULL, "
+            "score REAL NOT NULL, updated REAL NOT NULL, PRIMARY KEY (kind, item, hour))"
+        )
+        self._db.commit()
+        # (kind, item, hour) -> [uses, score, updated]
+        self._rows = {
+            (kind, item, hour): [uses, score, updated]
+            for kind, item, hour, uses, score, updated in self._db.execute(
+                "SELECT kind, item, hour, uses, score, updated FROM usage"
+            )
+        }
+        self.recorded = 0
+
+    def record(self, kind, item):
+        """Count one use of item ("deck", "video" or "page") now."""
+        now = time.time()
+        key = (kind, item, time.localtime(now).tm_hour)
+        with self._lock:
+            uses, score, updated = self._rows.get(key, (0, 0.0, now))
+            row = self._rows[key] = [uses + 1, _decayed(score, updated, now) + 1.0, now]
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO usage (kind, item, hour, uses, score, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, *row),
+                )
+            self.recorded += 1
+
+    def rank(self, kind):
+        """{item: score} for kind, decayed to now, with uses around this hour of day counting double."""
+        now = time.time()
+        hour = time.localtime(now).tm_hour
+        scores = {}
+        with self._lock:
+            for (row_kind, item, row_hour), (_, score, updated) in self._rows.items():
+                if row_kind != kind:
+                    continue
+                distance = abs(row_hour - hour) % 24
+                weight = 2.0 if min(distance, 24 - distance) <= HOUR_WINDOW else 1.0
+                scores[item] = scores.get(item, 0.0) + weight * _decayed(score, updated, now)
+        return scores
+
+    def rename(self, kind, old, new):
+        """Carry old's history over to new (a deck renamed on disk is still the same deck)."""
+        with self._lock:
+            moved = {key: row for key, row in self._rows.items() if key[0] == kind and key[1] == old}
+            if not moved:
+                return
+            with self._db:
+                for key in [key for key in self._rows if key[0] == kind and key[1] in (old, new)]:
+                    del self._rows[key]
+                for (_, _, hour), row in moved.items():
+                    self._rows[(kind, new, hour)] = row
+                self._db.execute("DELETE FROM usage WHERE kind = ? AND item = ?", (kind, new))
+                self._db.execute("UPDATE usage SET item = ? WHERE kind = ? AND item = ?", (new, kind, old))
+
+    def report(self):
+        with self._lock:
+            totals = {}
+            for (kind, item, _), (uses, _, _) in self._rows.items():
+                items, count = totals.get(kind, (set(), 0))
+                items.add(item)
+                totals[kind] = (items, count + uses)
+        parts = [f"{kind} {count} uses of {len(items)}" for kind, (items, count) in sorted(totals.items())]
+        return f"Usage: {', '.join(parts) if parts else 'nothing recorded yet'}; {self.recorded} this run"
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _decayed(score, updated, now):
+    return score * 0.5 ** (max(0.0, now - updated) / (HALF_LIFE_DAYS * 86400))
+
+
+class PageCacheWarmer:
+    """Reads files on a background thread so the OS keeps them in its file cache for the next open.
+
+    warm() reads the given files in order until budget_bytes is used up;
+    opened() tells whether a file was warmed by the last completed warm()
+    and keeps the hit rate. A warm() while one is running is skipped.
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.warmed = frozenset()
+        self.warmed_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._thread = None
+
+    def warm(self, paths):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._warm, args=(list(paths),), name="page-cache-warmer", daemon=True)
+        self._thread.start()
+
+    def opened(self, path):
+        """Count an open of path; True if it had been warmed."""
+        hit = path in self.warmed
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return hit
+
+    @property
+    def hit_rate(self):
+        return self.hits / max(1, self.hits + self.misses)
+
+    def report(self):
+        return (
+            f"Page cache warming: {len(self.warmed)} files ({self.warmed_bytes / 1048576:.1f} MB) warm, "
+            f"{self.hits} of {self.hits + self.misses} opens hit ({self.hit_rate * 100:.0f}%)"
+        )
+
+    def _warm(self, paths):
+        warmed = set()
+        total = 0
+        buffer = bytearray(READ_CHUNK)
+        for path in paths:
+            try:
+                size = os.path.getsize(path)
+                if total + size > self.budget_bytes:
+                    continue  # A smaller, less popular file may still fit
+                with open(path, "rb", buffering=0) as f:
+                    while f.readinto(buffer):
+                        pass
+            except OSError:
+                continue  # Removed or locked; the deck watcher reports it
+            total += size
+            warmed.add(path)
+        self.warmed = frozenset(warmed)
+        self.warmed_bytes = total
@@ -0,0 +1,273 @@
+import mmap
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+import time
+import zlib
+
+from video_player import find_ffmpeg
+
+try:
+    import lz4.block  # Optional; decompresses a 1080p frame several times faster than zlib
+except ImportError:
+    lz4 = None
+
+MAGIC = b"DMUIFRM1"
+# magic, width, height, fps, codec, frame count, index offset
+HEADER = struct.Struct("<8sIIIIIQ")
+INDEX_ENTRY = struct.Struct("<QI")  # offset, length of one stored frame
+
+# Frame codecs: raw RGB is fastest but huge at display resolution, so frames are lightly compressed
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_LZ4 = 2
+DEFAULT_CODEC = CODEC_LZ4 if lz4 else CODEC_ZLIB
+
+# A 44 s clip is about 1.5 GB at 1080p and four times that at 4K, so stores are capped; a video whose store
+# would not fit is played with ffmpeg instead
+DEFAULT_MAX_BYTES = 3 * 1024 * 1024 * 1024
+MIN_FREE_BYTES = 2 * 1024 * 1024 * 1024  # Disk space always left free
+TOO_LARGE_SUFFIX = ".toolarge"  # Marker holding the room a store did not fit in, so it is retried only with more
+UNUSED_SIZE_DAYS = 30  # A size's directory no cache was opened on for this long is from an old screen and is removed
+
+
+class FrameStoreTooLarge(RuntimeError):
+    pass
+
+
+def _compress(frame, codec):
+    if codec == CODEC_LZ4:
+        return lz4.block.compress(frame, store_size=True)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(frame, 1)
+    return frame
+
+
+def _decompress(data, codec):
+    if codec == CODEC_LZ4:
+        return lz4.block.decompress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    return data
+
+
+class FrameStore:
+    """Read-only, memory-mapped file of display-size RGB frames."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, width, height, self.fps, self.codec, self.frame_count, index_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or (self.codec == CODEC_LZ4 and not lz4):
+            self._map.close()
+            raise ValueError(f"{path} is not a readable frame store")
+        self.size = (width, height)
+        self._index = [
+            INDEX_ENTRY.unpack_from(self._map, index_offset + i * INDEX_ENTRY.size)
+            for i in range(self.frame_count)
+        ]
+
+    def read_frame(self, frame_number, buffer):
+        """Copy frame frame_number into buffer (a bytearray of width * height * 3 bytes)."""
+        offset, length = self._index[frame_number]
+        data = memoryview(self._map)[offset:offset + length]
+        try:
+            buffer[:] = _decompress(data, self.codec)
+        finally:
+            data.release()
+
+    def close(self):
+        self._map.close()
+
+
+def build_frame_store(video_path, out_path, size, fps, codec=DEFAULT_CODEC, max_bytes=None):
+    """Transcode video_path once into a frame store at size/fps; written atomically via a temp file.
+
+    Raises FrameStoreTooLarge as soon as the store grows past max_bytes.
+    """
+    width, height = size
+    frame_bytes = width * height * 3
+    command = [
+        find_ffmpeg() or "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", video_path, "-an",
+        "-vf", f"scale={width}:{height}", "-r", str(fps),
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-",
+    ]
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    temp_path = out_path + ".tmp"
+    index = []
+    too_large = False
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, creationflags=creationflags)
+    try:
+        with open(temp_path, "wb") as out:
+            out.write(b"\0" * HEADER.size)  # Filled in once the frame count is known
+            offset = HEADER.size
+            while True:
+                frame = process.stdout.read(frame_bytes)
+                if len(frame) < frame_bytes:
+                    break
+                data = _compress(frame, codec)
+                if max_bytes is not None and offset + len(data) > max_bytes:
+                    too_large = True
+                    process.kill()
+                    break
+                out.write(data)
+                index.append((offset, len(data)))
+                offset += len(data)
+            for entry in index:
+                out.write(INDEX_ENTRY.pack(*entry))
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, width, height, fps, codec, len(index), offset))
+    finally:
+        process.stdout.close()
+        failed = process.wait() != 0 or not index
+        if failed and os.path.exists(temp_path):
+            os.remove(temp_path)
+    if too_large:
+        raise FrameStoreTooLarge(f"{video_path} needs more than {max_bytes / 1048576:.0f} MB at {width}x{height}")
+    if failed:
+        raise RuntimeError(f"ffmpeg could not transcode {video_path}")
+    os.replace(temp_path, out_path)
+
+
+def _too_large_room(path):
+    """Room a store for path was last found not to fit in, or -1."""
+    try:
+        with open(path + TOO_LARGE_SUFFIX, "r") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return -1
+
+
+class VideoFrameCache:
+    """Display-resolution frame stores for looping videos, keyed by content digest and size.
+
+    warm() builds missing stores on a background thread. A store is found
+    again only while both the source digest and the target size/fps match,
+    so a changed video or screen resolution simply produces a new store and
+    the outdated one for that video is deleted. Each size and fps has its
+    own subdirectory, so screens of different sizes sharing cache_dir never
+    remove or evict each other's stores. The stores of one size stay under
+    max_bytes and leave MIN_FREE_BYTES of the disk free: stores of videos no
+    longer being warmed are evicted first, and a video that still does not
+    fit is marked too large and left to ffmpeg.
+    """
+
+    def __init__(self, cache_dir, size, fps, digest_func, max_bytes=DEFAULT_MAX_BYTES):
+        self._root = cache_dir
+        self.cache_dir = os.path.join(cache_dir, f"{size[0]}x{size[1]}_{fps}")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        os.utime(self.cache_dir)  # In use: keeps _remove_unused_sizes() of other screens off it
+        self.size = size
+        self.fps = fps
+        self.max_bytes = max_bytes
+        self._digest = digest_func
+        self._open = {}  # store path -> FrameStore
+        self._lock = threading.Lock()
+
+    def store_path(self, video_path):
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        width, height = self.size
+        return os.path.join(self.cache_dir, f"{name}_{self._digest(video_path)}_{width}x{height}_{self.fps}.frames")
+
+    def lookup(self, video_path):
+        """Open FrameStore for video_path, or None if it has not been built yet."""
+        try:
+            path = self.store_path(video_path)
+        except OSError:
+            return None
+        with self._lock:
+            store = self._open.get(path)
+            if store is None and os.path.exists(path):
+                try:
+                    store = self._open[path] = FrameStore(path)
+                except (OSError, ValueError, struct.error) as e:
+                    print(f"Discarding unreadable frame store {path}: {e}")
+                    os.remove(path)
+            return store
+
+    def warm(self, video_paths):
+        """Build any missing frame stores in the background."""
+        thread = threading.Thread(target=self._build_missing, args=(list(video_paths),), name="video-cache", daemon=True)
+        thread.start()
+        return thread
+
+    def _build_missing(self, video_paths):
+        self._remove_unused_sizes()
+        for video_path in video_paths:
+            try:
+                path = self.store_path(video_path)
+                self._remove_outdated(video_path, path)
+                if not os.path.exists(path):
+                    self._evict_unwanted(video_paths)
+                    room = self._room()
+                    if room <= _too_large_room(path):
+                        continue
+                    build_frame_store(video_path, path, self.size, self.fps, max_bytes=room)
+                    print(f"Cached {os.path.basename(video_path)} frames at {self.size[0]}x{self.size[1]}")
+                    if os.path.exists(path + TOO_LARGE_SUFFIX):
+                        os.remove(path + TOO_LARGE_SUFFIX)
+            except FrameStoreTooLarge as e:
+                print(f"Not caching frames, playing with ffmpeg instead: {e}")
+                with open(path + TOO_LARGE_SUFFIX, "w") as f:
+                    f.write(str(room))
+            except (OSError, RuntimeError) as e:
+                print(f"Failed to cache frames for {video_path}: {e}")
+
+    def _room(self):
+        """Bytes a new store may take: what is left of max_bytes and of the disk above MIN_FREE_BYTES."""
+        used = sum(
+            os.path.getsize(os.path.join(self.cache_dir, name))
+            for name in os.listdir(self.cache_dir) if not name.endswith(TOO_LARGE_SUFFIX)
+        )
+        free = shutil.disk_usage(self.cache_dir).free - MIN_FREE_BYTES
+        return max(0, min(self.max_bytes - used, free))
+
+    def _evict_unwanted(self, video_paths):
+        """Delete the stores of videos not being warmed any more (e.g. one no longer played often)."""
+        prefixes = tuple(os.path.splitext(os.path.basename(v))[0] + "_" for v in video_paths)
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".frames") and not name.startswith(prefixes):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def _remove_outdated(self, video_path, current_path):
+        prefix = os.path.splitext(os.path.basename(video_path))[0] + "_"
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if (name.startswith(prefix) and path not in (current_path, current_path + TOO_LARGE_SUFFIX)
+                    and name.count("_") == prefix.count("_") + 2):
+                self._remove(path)
+
+    def _remove_unused_sizes(self):
+        """Delete the directories of sizes not opened for UNUSED_SIZE_DAYS, and stores of the old flat layout."""
+        unused_before = time.time() - UNUSED_SIZE_DAYS * 86400
+        for name in os.listdir(self._root):
+            path = os.path.join(self._root, name)
+            try:
+                if os.path.isdir(path):
+                    if path != self.cache_dir and os.path.getmtime(path) < unused_before:
+                        shutil.rmtree(path, ignore_errors=True)
+                elif name.endswith((".frames", TOO_LARGE_SUFFIX)):
+                    os.remove(path)
+            except OSError:
+                pass  # Still mapped by another process (Windows); tried again on the next warm()
+
+    def _remove(self, path):
+        with self._lock:
+            store = self._open.pop(path, None)
+        if store:
+            store.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Still mapped (Windows); removed on a later run
+
+    def close(self):
+        with self._lock:
+            for store in self._open.values():
+                store.close()
+            self._open.clear()
@@ -0,0 +1,314 @@
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import pygame
+
+PREBUFFER_MAX_BYTES = 32 * 1024 * 1024  # Per prepared video: five 1080p frames, two at 4K
+
+
+def find_ffmpeg():
+    """ffmpeg binary bundled with imageio-ffmpeg (installed with moviepy), else the one on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return shutil.which("ffmpeg")
+
+
+class PlaybackStats:
+    """Frame counters for one playback."""
+
+    def __init__(self):
+        self.decoded = 0
+        self.shown = 0
+        self.dropped = 0
+        self.first_frame_latency = None  # Seconds from the request to the first flip
+        self.prepared = False  # Started from a PreparedVideo's buffered frames
+        self.interrupted_at = None  # perf_counter() when the interrupting input arrived
+
+    def __str__(self):
+        text = f"{self.decoded} decoded, {self.shown} shown, {self.dropped} dropped"
+        if self.first_frame_latency is not None:
+            text += f", first frame after {self.first_frame_latency * 1000:.1f} ms"
+            if self.prepared:
+                text += " (prepared)"
+        return text
+
+
+class FrameRing:
+    """Fixed set of frame buffers, each wrapped once in a pygame surface that shares its memory.
+
+    The decoder fills free slots straight from the ffmpeg pipe and the player
+    blits the slot's surface, so a frame is never copied between the two.
+    """
+
+    def __init__(self, size, slots):
+        self.size = size
+        self.frame_bytes = size[0] * size[1] * 3
+        self.buffers = [bytearray(self.frame_bytes) for _ in range(slots)]
+        self.surfaces = [pygame.image.frombuffer(buffer, size, "RGB") for buffer in self.buffers]
+        self.free = queue.Queue()
+        self.filled = queue.Queue()  # (slot, frame number); None marks the end of the stream
+        for slot in range(slots):
+            self.free.put(slot)
+
+
+class FrameSource(threading.Thread):
+    """Base for the threads that fill a FrameRing; ends the stream with None."""
+
+    def __init__(self, ring, stats):
+        super().__init__(name="video-decoder", daemon=True)
+        self.ring = ring
+        self.stats = stats
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _next_free_slot(self):
+        while not self._stop_event.is_set():
+            try:
+                return self.ring.free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+
+class VideoDecoder(FrameSource):
+    """Decodes a video with ffmpeg, scaled to the target size, into a FrameRing."""
+
+    def __init__(self, video_path, ring, fps, stats):
+        super().__init__(ring, stats)
+        self.video_path = video_path
+        self.fps = fps
+        self._process = None
+
+    def run(self):
+        width, height = self.ring.size
+        command = [
+            find_ffmpeg() or "ffmpeg", "-nostdin", "-loglevel", "error",
+            "-i", self.video_path, "-an",
+            "-vf", f"scale={width}:{height}", "-r", str(self.fps),
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-",
+        ]
+        creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+        try:
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=0, creationflags=creationflags)
+            frame_number = 0
+            while not self._stop_event.is_set():
+                slot = self._next_free_slot()
+                if slot is None:
+                    break
+                if not self._read_frame(self.ring.buffers[slot]):
+                    self.ring.free.put(slot)
+                    break
+                self.stats.decoded += 1
+                self.ring.filled.put((slot, frame_number))
+                frame_number += 1
+        except OSError as e:
+            print(f"Failed to start video decoder for {self.video_path}: {e}")
+        finally:
+            if self._process:
+                self._process.kill()
+                self._process.wait()
+            self.ring.filled.put(None)
+
+    def stop(self):
+        super().stop()
+        if self._process:
+            self._process.kill()
+
+    def _read_frame(self, buffer):
+        view = memoryview(buffer)
+        filled = 0
+        while filled < len(buffer):
+            n = self._process.stdout.readinto(view[filled:])
+            if not n:
+                return False
+            filled += n
+        return True
+
+
+class FrameStoreReader(FrameSource):
+    """Feeds a FrameRing from a pre-transcoded, memory-mapped frame store (see video_cache)."""
+
+    def __init__(self, frame_store, ring, stats):
+        super().__init__(ring, stats)
+        self.frame_store = frame_store
+
+    def run(self):
+        try:
+            for frame_number in range(self.frame_store.frame_count):
+                slot = self._next_free_slot()
+                if slot is None:
+                    break
+                self.frame_store.read_frame(frame_number, self.ring.buffers[slot])
+                self.stats.decoded += 1
+                self.ring.filled.put((slot, frame_number))
+        finally:
+            self.ring.filled.put(None)
+
+
+class PreparedVideo:
+    """A started frame source whose ring already holds the opening frames of a video.
+
+    The source fills every slot and then blocks, so the video waits at frame
+    zero with its opening frames in memory until play_video() takes it.
+    """
+
+    def __init__(self, size, video_path, fps, buffer_frames, frame_store=None):
+        self.video_path = video_path
+        self.stats = PlaybackStats()
+        self.stats.prepared = True
+        self.ring = FrameRing(size, buffer_frames)
+        if frame_store:
+            self.source = FrameStoreReader(frame_store, self.ring, self.stats)
+        else:
+            self.source = VideoDecoder(video_path, self.ring, fps, self.stats)
+        self.frame_store = frame_store
+        self.source.start()
+
+    def close(self):
+        self.source.stop()
+        self.source.join(timeout=1)
+
+
+class DecoderPool:
+    """Keeps one PreparedVideo per video so playback starts without opening or decoding anything.
+
+    Each one holds its ring for as long as the process runs, so the ring is
+    prebuffer_seconds of frames, at most max_bytes, and never under two frames.
+    """
+
+    def __init__(self, size, fps, prebuffer_seconds=0.1, max_bytes=PREBUFFER_MAX_BYTES):
+        self.size = size
+        self.fps = fps
+        frame_bytes = size[0] * size[1] * 3
+        self.buffer_frames = max(2, min(int(fps * prebuffer_seconds), max_bytes // frame_bytes))
+        self._prepared = {}  # video path -> PreparedVideo
+
+    def prepare(self, video_path, frame_store=None):
+        """Open video_path and buffer its opening frames, unless that is already done with the same source."""
+        prepared = self._prepared.get(video_path)
+        if prepared and prepared.frame_store is frame_store:
+            return
+        if prepared:
+            prepared.close()  # Switch to the frame store once it has been built
+        self._prepared[video_path] = PreparedVideo(self.size, video_path, self.fps, self.buffer_frames, frame_store)
+
+    def take(self, video_path):
+        """Hand over the prepared decoder for video_path (None if there is none); call prepare() again afterwards."""
+        return self._prepared.pop(video_path, None)
+
+    def close(self):
+        for prepared in self._prepared.values():
+            prepared.close()
+        self._prepared.clear()
+
+
+def play_video(screen, video_path, fps, audio_path=None, overlay=None, interrupt_types=(), buffer_frames=8, frame_store=None,
+               prepared=None, requested_at=None):
+    """Play a video full screen, synchronised to the mixer's audio clock.
+
+    A decoder thread keeps up to buffer_frames display-size frames ready.
+    Frames whose time has already passed on the audio clock are dropped
+    rather than shown late. overlay is an optional (surface, rect) drawn on
+    every frame. Returns (PlaybackStats, interrupted); custom and QUIT
+    events that arrive during playback are put back on the queue.
+
+    If frame_store (a video_cache.FrameStore at the screen size) is given,
+    frames are read from it instead of being decoded. A PreparedVideo from a
+    DecoderPool is used as-is when it matches the screen size, so the first
+    frame is already waiting. requested_at (a time.perf_counter() value) is
+    the moment playback was asked for; the delay until the first frame is
+    shown is recorded in stats.first_frame_latency.
+    """
+    if requested_at is None:
+        requested_at = time.perf_counter()
+    if prepared and prepared.ring.size != screen.get_size():
+        prepared.close()
+        prepared = None
+    if prepared:
+        stats, ring, decoder = prepared.stats, prepared.ring, prepared.source
+    else:
+        stats = PlaybackStats()
+        ring = FrameRing(screen.get_size(), buffer_frames)
+        if frame_store:
+            decoder = FrameStoreReader(frame_store, ring, stats)
+        else:
+            decoder = VideoDecoder(video_path, ring, fps, stats)
+        decoder.start()
+    deferred_events = []
+    interrupted = False
+    shown_slot = None
+    frame_interval = 1.0 / fps
+
+    # Wait for the first frame before starting the audio so both clocks start together
+    first = ring.filled.get()
+    if first is not None:
+        if audio_path:
+            pygame.mixer.music.load(audio_path)
+            pygame.mixer.music.play()
+        start_time = time.perf_counter()
+        pending = first
+        while pending is not None:
+            # The audio position is the master clock; fall back to wall time once the audio has ended
+            audio_ms = pygame.mixer.music.get_pos() if audio_path else -1
+            now = audio_ms / 1000.0 if audio_ms >= 0 else time.perf_counter() - start_time
+
+            # Skip every frame that is already late, keeping the newest one that is due
+            slot, frame_number = pending
+            while frame_number * frame_interval + frame_interval <= now:
+                try:
+                    following = ring.filled.get_nowait()
+                except queue.Empty:
+                    break
+                if following is None:
+                    ring.filled.put(None)  # Keep the end-of-stream marker for the next get()
+                    break
+                ring.free.put(slot)
+                stats.dropped += 1
+                slot, frame_number = following
+            pending = (slot, frame_number)
+
+            if frame_number * frame_interval <= now:
+                screen.blit(ring.surfaces[slot], (0, 0))
+                if overlay:
+                    screen.blit(*overlay)
+                pygame.display.flip()
+                if stats.shown == 0:
+                    stats.first_frame_latency = time.perf_counter() - requested_at
+                stats.shown += 1
+                if shown_slot is not None:
+                    ring.free.put(shown_slot)
+                shown_slot = slot
+                pending = ring.filled.get()
+                if pending is None:
+                    break
+                events = []
+            else:
+                # Wait for the frame to fall due; an input event ends the wait at once
+                wait_ms = max(1, int(min(frame_interval, frame_number * frame_interval - now) * 1000))
+                events = [pygame.event.wait(wait_ms)]
+
+            for event in events + pygame.event.get():
+                if event.type in interrupt_types:
+                    interrupted = True
+                    if stats.interrupted_at is None:
+                        stats.interrupted_at = time.perf_counter()
+                elif event.type == pygame.QUIT or event.type >= pygame.USEREVENT:
+                    deferred_events.append(event)
+            if interrupted:
+                break
+
+    decoder.stop()
+    if audio_path:
+        pygame.mixer.music.stop()
+    decoder.join(timeout=1)
+    for event in deferred_events:
+        pygame.event.post(event)
+    return stats, interrupted